@@ -0,0 +1,62 @@
+"""
+Process-local read-through cache with a time to live.
+
+Each worker process keeps its own copy, so a write made through another worker
+is only seen here once the entry expires; writes made through this process
+invalidate explicitly (see app.services.reference_data_service). Values are
+shared between requests and must be treated as read-only.
+"""
+import threading
+import time
+from typing import Callable, Hashable
+
+# every cache created, for the /metrics collector
+registry = []
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float, max_entries: int = 10000):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        # bumped by invalidate(), so a load that raced with a write is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        registry.append(self)
+
+    def get(self, key: Hashable, load: Callable):
+        """Return the cached value for `key`, calling `load()` on a miss. None is not cached."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        # load outside the lock: a slow query must not block hits on other keys
+        value = load()
+        if value is None or self.ttl <= 0:
+            return value
+        with self._lock:
+            if generation == self._generation:
+                if key not in self._entries and len(self._entries) >= self.max_entries:
+                    # dicts keep insertion order, drop the oldest entry
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, key: Hashable = None):
+        """Drop `key`, or every entry when no key is given."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
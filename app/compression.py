@@ -0,0 +1,155 @@
+"""
+Response compression.
+
+Bodies of at least MMS_COMPRESS_MIN_BYTES (default 1024) with a textual
+content type are compressed with brotli when the client accepts it and the
+`brotli` package is installed, with gzip otherwise. Excel files (already zip
+archives), responses that carry a Content-Encoding and small bodies go out
+untouched. Streamed bodies (the CSV downloads) are compressed chunk by chunk.
+
+Unlike starlette's GZipMiddleware this uses a moderate compression level:
+level 9 costs several times the CPU of 5-6 for a few percent smaller bodies.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.database import _env_int
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+MINIMUM_SIZE = _env_int("MMS_COMPRESS_MIN_BYTES", 1024)
+GZIP_LEVEL = _env_int("MMS_GZIP_LEVEL", 6)
+BROTLI_QUALITY = _env_int("MMS_BROTLI_QUALITY", 5)
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+
+def accepted_encodings(accept_encoding: str):
+    """Codings named in an Accept-Encoding header, minus those sent with q=0."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(coding.strip())
+    return accepted
+
+
+def choose_encoding(accept_encoding: str):
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _GzipCompressor:
+    def __init__(self):
+        # wbits 16+ writes the gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(
+            GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+COMPRESSORS = {"gzip": _GzipCompressor, "br": _BrotliCompressor}
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    compressor = COMPRESSORS[encoding]()
+    return compressor.compress(data) + compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # hold the headers back until the first body chunk shows the size
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = Headers(raw=start["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (len(body) < self.minimum_size and not more_body)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = COMPRESSORS[encoding]()
+                start["headers"] = list(start["headers"])
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    # the compressed length is unknown until the stream ends
+                    del headers["Content-Length"]
+                    await send(start)
+                else:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+            # no flush per chunk: CSV rows are tiny and would ruin the ratio
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+
+        await self.app(scope, receive, send_wrapper)
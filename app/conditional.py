@@ -0,0 +1,163 @@
+"""
+Conditional GET for master-data lists.
+
+Every table has a version number, bumped once a transaction that wrote to it
+(ORM flushes and bulk insert()/update()/delete() statements alike) commits.
+A list endpoint declares the tables its response is built from, along with
+the schema it responds with:
+
+    @router.get(
+        "/",
+        dependencies=[Depends(conditional(models.Employee, schema=schemas.Employee))],
+    )
+
+and answers with an ETag derived from their versions. A request whose
+If-None-Match still matches gets a bare 304 before the endpoint runs, so no
+query is issued and nothing is serialized. Tell the browser to revalidate
+every time with Cache-Control: no-cache; it then sends If-None-Match itself.
+The schema is walked along the first model's relationships when the route is
+declared, and leaving out a table it reaches is an error: a write to that
+table would otherwise keep answering 304 with stale data.
+
+Versions live in this process and restart from zero, so the ETag also carries
+a per-process token. This relies on every write going through this one
+uvicorn process (start.sh); with several workers a write seen by one of them
+would not change the ETags handed out by the others.
+"""
+import threading
+import uuid
+from collections import defaultdict
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy import Table, event, inspect
+from sqlalchemy.sql.util import find_tables
+
+from app.database import SessionLocal
+
+WRITTEN_TABLES = "written_tables"
+_process_token = uuid.uuid4().hex[:8]
+_lock = threading.Lock()
+_versions = defaultdict(int)
+
+
+def bump(tables):
+    with _lock:
+        for table in tables:
+            _versions[table] += 1
+
+
+def etag_for(tables) -> str:
+    with _lock:
+        versions = ".".join(str(_versions[t]) for t in tables)
+    # weak: the same version may go out gzip-compressed or not
+    return f'W/"{_process_token}.{versions}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, W/ prefixes do not matter
+    return _opaque(etag) in (_opaque(tag) for tag in if_none_match.split(","))
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+async def not_modified_handler(request: Request, exc: NotModified):
+    return Response(
+        status_code=304, headers={"ETag": exc.etag, "Cache-Control": "no-cache"}
+    )
+
+
+def schema_tables(model, schema) -> set:
+    """Tables a response of `schema` built from `model` rows is read from."""
+    mapper = inspect(model)
+    tables = {model.__tablename__}
+    for name, field in schema.__fields__.items():
+        if name in mapper.column_attrs:
+            # column_property subqueries read other tables too
+            for column in mapper.column_attrs[name].columns:
+                tables.update(
+                    t.name
+                    for t in find_tables(column, include_selects=True)
+                    if isinstance(t, Table)
+                )
+        elif name in mapper.relationships:
+            nested = field.type_
+            if isinstance(nested, type) and issubclass(nested, BaseModel):
+                target = mapper.relationships[name].mapper.class_
+                tables |= schema_tables(target, nested)
+    return tables
+
+
+def conditional(*models, schema):
+    """
+    Dependency answering 304 while none of the models' tables changed. The
+    first model is the one the response rows are, `schema` what they are
+    serialized as; every table the schema reaches must be among the models.
+    """
+    tables = tuple(model.__tablename__ for model in models)
+    missing = schema_tables(models[0], schema) - set(tables)
+    if missing:
+        raise ValueError(
+            f"{schema.__name__} responses also read {', '.join(sorted(missing))}: "
+            "list their models in conditional()"
+        )
+
+    async def check(request: Request, response: Response):
+        # taken before the endpoint reads, so a write that commits in between
+        # only makes this ETag outdated, never pairs it with stale data
+        etag = etag_for(tables)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise NotModified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
+    return check
+
+
+def _written(session, tables):
+    session.info.setdefault(WRITTEN_TABLES, set()).update(tables)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    _written(
+        session,
+        (
+            obj.__table__.name
+            for obj in (*session.new, *session.dirty, *session.deleted)
+            if hasattr(obj, "__table__")
+        ),
+    )
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _record_bulk_write(orm_execute_state):
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _written(orm_execute_state.session, (table.name,))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_committed_tables(session):
+    bump(session.info.pop(WRITTEN_TABLES, ()))
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_rolled_back_tables(session):
+    session.info.pop(WRITTEN_TABLES, None)
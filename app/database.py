@@ -1,10 +1,242 @@
-from sqlalchemy import create_engine
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.environment import mysql_local, aliyun, aliyun_test
 from sqlalchemy.ext.declarative import declarative_base
 
+load_dotenv()
+
+
+def _env_int(name: str, default: int):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class PoolStatistics:
+    """Running counters of connection checkouts and how long callers waited for them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.waits = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.timeouts = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+                "timeouts": self.timeouts,
+            }
+
+
+pool_stats = PoolStatistics()
+
+
+class _WaitTimingMixin:
+    # QueuePool blocks inside _do_get when the pool and its overflow are exhausted.
+    # Only those checkouts are timed: the others return at once or open a new
+    # overflow connection, which is connect time rather than queueing.
+    def _exhausted(self) -> bool:
+        return (
+            self._max_overflow > -1
+            and self.checkedout() >= self.size() + self._max_overflow
+        )
+
+    def _do_get(self):
+        if not self._exhausted():
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_database_url():
+    # MMS_DB_URL lets tests and local runs point at a SQLite/MySQL stand-in
+    # without touching the credentials kept in environment.py
+    return os.getenv("MMS_DB_URL", aliyun.url)
+
+
+def get_async_database_url(url: str = None):
+    url = make_url(url or get_database_url())
+    drivers = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+    backend = url.get_backend_name()
+    if backend in drivers and url.drivername != drivers[backend]:
+        url = url.set(drivername=drivers[backend])
+    return url.render_as_string(hide_password=False)
+
+
+def _engine_options(url: str, poolclass):
+    options = {"echo": _env_bool("MMS_DB_ECHO", False)}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            poolclass=poolclass,
+            pool_size=_env_int("MMS_DB_POOL_SIZE", 10),
+            max_overflow=_env_int("MMS_DB_MAX_OVERFLOW", 20),
+            pool_recycle=_env_int("MMS_DB_POOL_RECYCLE", 1800),
+            pool_pre_ping=_env_bool("MMS_DB_POOL_PRE_PING", True),
+            pool_timeout=_env_int("MMS_DB_POOL_TIMEOUT", 30),
+        )
+    return options
+
+
+def create_db_engine(url: str = None, **overrides):
+    url = url or get_database_url()
+    options = _engine_options(url, InstrumentedQueuePool)
+    options.update(overrides)
+    engine = create_engine(url, **options)
+    _instrument_engine(engine, statement_timeout=_env_int("MMS_DB_STATEMENT_TIMEOUT_MS", 0))
+    return engine
+
+
+def create_async_db_engine(url: str = None, **overrides):
+    url = get_async_database_url(url)
+    options = _engine_options(url, InstrumentedAsyncQueuePool)
+    options.update(overrides)
+    engine = create_async_engine(url, **options)
+    _instrument_engine(
+        engine.sync_engine,
+        statement_timeout=_env_int("MMS_DB_STATEMENT_TIMEOUT_MS", 0),
+    )
+    return engine
+
+
+def _instrument_engine(engine, statement_timeout: int = 0):
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        pool_stats.incr("connects")
+        if statement_timeout and engine.dialect.name == "mysql":
+            cursor = dbapi_connection.cursor()
+            # max_execution_time only bounds SELECTs, which is where runaway queries come from
+            cursor.execute(f"SET SESSION max_execution_time = {int(statement_timeout)}")
+            cursor.close()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_stats.incr("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        pool_stats.incr("checkins")
+
+
+def pool_statistics(engine=None):
+    engine = engine or mysql_engine
+    stats = pool_stats.as_dict()
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        stats.update(
+            pool_size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    return stats
+
+
 # mysql_engine = create_engine(mysql_local.url, echo=True)
-mysql_engine = create_engine(aliyun.url, echo=False)
+mysql_engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=mysql_engine)
 
+
+# Several endpoints leave their writes to a later commit in the same request, so
+# track whether a session has uncommitted writes, ORM flushes and bulk
+# update()/delete()/insert() statements alike.
+@event.listens_for(SessionLocal, "after_flush")
+def _after_flush(session, flush_context):
+    session.info["pending_writes"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _on_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["pending_writes"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+@event.listens_for(SessionLocal, "after_rollback")
+def _after_transaction_end(session):
+    session.info.pop("pending_writes", None)
+
+
+def has_pending_writes(session) -> bool:
+    return bool(
+        session.new or session.dirty or session.deleted or session.info.get("pending_writes")
+    )
+
+# Async counterpart for read-heavy endpoints, so a single worker can overlap RDS round-trips
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+def use_engine(engine):
+    """Rebind the session factory, e.g. to an in-memory SQLite engine in tests."""
+    global mysql_engine
+    mysql_engine = engine
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def use_async_engine(engine):
+    global async_engine
+    async_engine = engine
+    AsyncSessionLocal.configure(bind=engine)
+    return engine
+
+
 Base = declarative_base()
@@ -1,16 +1,35 @@
-from app.database import SessionLocal
+from app.database import SessionLocal, AsyncSessionLocal
+from app import unit_of_work
 from passlib.context import CryptContext
+from fastapi import Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    # services only flush, UnitOfWorkMiddleware commits once before the response
+    db = unit_of_work.begin(SessionLocal())
+    request.state.db = db
     try:
         yield db
     finally:
         db.close()
 
 
+def get_autocommit_db(request: Request):
+    # for endpoints that need their intermediate commits to stick
+    db = unit_of_work.begin(SessionLocal(), unit_of_work=False)
+    request.state.db = db
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
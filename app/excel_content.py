@@ -2,6 +2,7 @@ import glob
 import os
 from datetime import datetime, timedelta
 
+from openpyxl import Workbook
 from openpyxl.styles import Alignment
 from openpyxl.styles.borders import Border, Side
 
@@ -181,3 +182,54 @@ def wipe_old_files(working_directory=os.getcwd()):
         if time_created <= one_day_ago:
             print(f"Deleting {file_path}")
             os.remove(file_path)
+
+
+# fixed layout of the instock record export: (header, key in the enriched record)
+INSTOCK_RECORD_COLUMNS = [
+    ("记录编号", "id"),
+    ("采购内容序列号", "instock_item_id"),
+    ("供应商", "display.company"),
+    ("物料编号", "display.specification_id"),
+    ("物料名称", "display.component_name"),
+    ("物料型号", "display.model"),
+    ("本次入库数量", "amount_in"),
+    ("记录后总入库数量", "balance"),
+    ("入库时间", "record_time"),
+    ("采购单编号", "display.form_id"),
+    ("入库价值金额", "display.total_value"),
+    ("采购备注", "display.notice"),
+    ("是否付款", "display.paid"),
+    ("使用税前价", "display.use_net"),
+    ("操作员", "operator"),
+    ("入库备注", "note"),
+]
+
+
+def _instock_record_row(record: dict):
+    row = []
+    for _, key in INSTOCK_RECORD_COLUMNS:
+        if key.startswith("display."):
+            value = record["display"].get(key[len("display."):])
+        else:
+            value = record.get(key)
+        if key in ("display.paid", "display.use_net"):
+            value = bool(value)
+        row.append(value)
+    return row
+
+
+def write_instock_records(record_pages, fileobj):
+    """
+    Write enriched instock records into `fileobj` as an .xlsx workbook.
+
+    `record_pages` yields lists of enriched records; the write-only workbook
+    keeps only the current page in memory, so peak usage does not grow with
+    the size of the date range.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([header for header, _ in INSTOCK_RECORD_COLUMNS])
+    for page in record_pages:
+        for record in page:
+            sheet.append(_instock_record_row(record))
+    workbook.save(fileobj)
@@ -23,7 +23,14 @@ from app.routers import (
     user,
     product_category,
     instock, business,
+    stock_ledger,
 )
+from app import metrics, operation_log
+from app.conditional import NotModified, not_modified_handler
+from app.compression import CompressionMiddleware
+from app.metrics import MetricsMiddleware
+from app.query_counter import QueryCounterMiddleware
+from app.unit_of_work import UnitOfWorkMiddleware
 from app.security import token
 
 app = FastAPI(
@@ -51,6 +58,7 @@ controllers = [
     process,
     process_component,
     instock,
+    stock_ledger,
     operation,
     business,
     token,
@@ -59,6 +67,23 @@ controllers = [
 
 for controller in controllers:
     app.include_router(controller.router)
+app.include_router(metrics.router)
+app.add_exception_handler(NotModified, not_modified_handler)
+
+
+@app.on_event("startup")
+def start_operation_log_sink():
+    operation_log.sink.start()
+
+
+@app.on_event("startup")
+async def install_threadpool_metrics():
+    metrics.install_threadpool_executor()
+
+
+@app.on_event("shutdown")
+def stop_operation_log_sink():
+    operation_log.sink.stop()
 
 
 origins = [
@@ -75,12 +100,24 @@ origins = [
     "http://47.96.104.221:4200",
 ]
 
+app.add_middleware(UnitOfWorkMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(QueryCounterMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-DB-Query-Count",
+        "X-DB-Time-Ms",
+        "X-DB-Commit-Count",
+        "X-Next-Cursor",
+        "ETag",
+    ],
 )
 
 
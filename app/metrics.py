@@ -0,0 +1,251 @@
+"""
+Prometheus metrics, served at /metrics.
+
+* HTTP: latency histogram per route template, in-flight requests;
+* threadpool: size, busy workers, queued calls and queueing time of the
+  executor that runs sync endpoints and dependencies;
+* database: pool checkouts/waits/timeouts, queries and query time per request,
+  commits per request;
+* exports: duration and failures of the Excel/CSV export endpoints;
+* caches: hits, misses and size of every app.cache.TTLCache.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from fastapi import APIRouter, HTTPException
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.responses import Response
+
+from app import cache, database, unit_of_work
+from app.query_counter import current_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+EXPORT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_LATENCY = Histogram(
+    "mms_http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "mms_http_requests_in_flight", "Requests currently being served"
+)
+DB_QUERIES = Histogram(
+    "mms_db_queries_per_request",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+DB_TIME = Histogram(
+    "mms_db_time_per_request_seconds",
+    "Total SQL execution time per request",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+THREADPOOL_QUEUE_WAIT = Histogram(
+    "mms_threadpool_queue_wait_seconds",
+    "Time a sync endpoint/dependency call waited for a free worker thread",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+THREADPOOL_BUSY = Gauge("mms_threadpool_busy_workers", "Worker threads running a call")
+THREADPOOL_QUEUED = Gauge(
+    "mms_threadpool_queued_calls", "Calls waiting for a worker thread"
+)
+THREADPOOL_SIZE = Gauge("mms_threadpool_max_workers", "Worker threads available")
+EXPORT_DURATION = Histogram(
+    "mms_export_duration_seconds",
+    "Time spent building a file export",
+    ["export"],
+    buckets=EXPORT_BUCKETS,
+)
+EXPORT_FAILURES = Counter(
+    "mms_export_failures_total", "Exports that raised an error", ["export"]
+)
+
+
+@contextmanager
+def time_export(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except HTTPException as e:
+        # a 404 for an unknown batch is an answer, not a failed export
+        if e.status_code >= 500:
+            EXPORT_FAILURES.labels(name).inc()
+        raise
+    except Exception:
+        EXPORT_FAILURES.labels(name).inc()
+        raise
+    finally:
+        EXPORT_DURATION.labels(name).observe(time.perf_counter() - started)
+
+
+class InstrumentedThreadPoolExecutor(ThreadPoolExecutor):
+    """Default executor of the event loop, which run_in_threadpool submits to."""
+
+    def submit(self, fn, *args, **kwargs):
+        queued_at = time.perf_counter()
+        THREADPOOL_QUEUED.inc()
+
+        def run():
+            THREADPOOL_QUEUED.dec()
+            THREADPOOL_QUEUE_WAIT.observe(time.perf_counter() - queued_at)
+            THREADPOOL_BUSY.inc()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                THREADPOOL_BUSY.dec()
+
+        return super().submit(run)
+
+
+def install_threadpool_executor(max_workers: int = None):
+    # same default size as asyncio's own default executor
+    max_workers = max_workers or database._env_int(
+        "MMS_THREADPOOL_WORKERS", min(32, (os.cpu_count() or 1) + 4)
+    )
+    executor = InstrumentedThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="mms-worker"
+    )
+    asyncio.get_event_loop().set_default_executor(executor)
+    THREADPOOL_SIZE.set(max_workers)
+    return executor
+
+
+class DatabaseCollector:
+    """Reads the pool and commit counters kept by app.database and app.unit_of_work."""
+
+    def collect(self):
+        stats = database.pool_statistics()
+        for name, doc in (
+            ("checkouts", "Connections checked out of the pool"),
+            ("connects", "New DBAPI connections opened"),
+            ("waits", "Checkouts that queued for a connection of an exhausted pool"),
+            ("timeouts", "Checkouts that timed out waiting for a connection"),
+        ):
+            yield CounterMetricFamily(f"mms_db_pool_{name}", doc, value=stats[name])
+        yield CounterMetricFamily(
+            "mms_db_pool_wait_seconds",
+            "Total time spent waiting for a pooled connection",
+            value=stats["wait_seconds"],
+        )
+        yield GaugeMetricFamily(
+            "mms_db_pool_max_wait_seconds",
+            "Longest wait for a pooled connection",
+            value=stats["max_wait_seconds"],
+        )
+        for name in ("pool_size", "checked_out", "checked_in", "overflow"):
+            if name in stats:
+                yield GaugeMetricFamily(
+                    f"mms_db_pool_{name}", f"Connection pool {name}", value=stats[name]
+                )
+        commits = unit_of_work.commit_stats.as_dict()
+        yield CounterMetricFamily(
+            "mms_db_commits",
+            "Transactions committed by requests",
+            value=commits["commits"],
+        )
+        yield CounterMetricFamily(
+            "mms_db_request_rollbacks",
+            "Requests whose unit of work was rolled back",
+            value=commits["rollbacks"],
+        )
+        yield GaugeMetricFamily(
+            "mms_db_max_commits_per_request",
+            "Most commits issued by a single request",
+            value=commits["max_commits"],
+        )
+
+
+REGISTRY.register(DatabaseCollector())
+
+
+class CacheCollector:
+    """Reads the hit/miss counters kept by each app.cache.TTLCache."""
+
+    def collect(self):
+        hits = CounterMetricFamily(
+            "mms_cache_hits", "Lookups answered from the cache", labels=["cache"]
+        )
+        misses = CounterMetricFamily(
+            "mms_cache_misses", "Lookups that went to the database", labels=["cache"]
+        )
+        entries = GaugeMetricFamily(
+            "mms_cache_entries", "Entries currently cached", labels=["cache"]
+        )
+        for c in cache.registry:
+            hits.add_metric([c.name], c.hits)
+            misses.add_metric([c.name], c.misses)
+            entries.add_metric([c.name], len(c))
+        yield hits
+        yield misses
+        yield entries
+
+
+REGISTRY.register(CacheCollector())
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+        self._lock = threading.Lock()
+
+    def _route_template(self, scope) -> str:
+        # label by path template, not the raw path, to keep label cardinality bounded
+        if self._routes is None:
+            with self._lock:
+                self._routes = {
+                    getattr(r, "endpoint", None): r.path for r in scope["app"].routes
+                }
+        return self._routes.get(scope.get("endpoint"), UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = self._route_template(scope)
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(
+                time.perf_counter() - started
+            )
+            stats = current_stats()
+            if stats is not None:
+                DB_QUERIES.labels(route).observe(stats.count)
+                DB_TIME.labels(route).observe(stats.seconds)
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
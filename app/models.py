@@ -8,6 +8,7 @@ from sqlalchemy import (
     String,
     Float,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.orm import relationship, column_property
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -176,11 +177,11 @@ class BatchProcess(Base):
     end_amount = Column(Integer)
     unit_pay = Column(Float)
     warehouse_record = relationship("WarehouseRecord", backref="batch_process")
-    process = relationship("Process", backref="batch_process", lazy="joined")
+    process = relationship("Process", backref="batch_process", lazy="selectin")
 
 
 Batch.batch_process = relationship(
-    "BatchProcess", order_by=BatchProcess.id, backref="batch", lazy="joined"
+    "BatchProcess", order_by=BatchProcess.id, backref="batch", lazy="selectin"
 )
 
 # Process.batch_process = relationship("BatchProcess",
@@ -255,7 +256,7 @@ class Salary(Base):
     notice = Column(String)
     check_date = Column(DateTime)
     day_invoice = relationship("DayInvoice", backref="salary")
-    work = relationship("Work", backref="salary", lazy="joined")
+    work = relationship("Work", backref="salary", lazy="selectin")
 
 
 class Work(Base):
@@ -265,7 +266,7 @@ class Work(Base):
     batch_process_id = Column(Integer, ForeignKey("batch_process.id"))
     employee_id = Column(Integer, ForeignKey("employee.id"))
     employee_name = Column(String, ForeignKey("employee.name"))
-    work_date = Column(Date)
+    work_date = Column(DateTime)
     unit_pay = Column(Float)
     complete_unit = Column(Integer)
     hour_pay = Column(Float)
@@ -278,7 +279,7 @@ class Work(Base):
 
 
 BatchProcess.work = relationship(
-    "Work", order_by=Work.id, backref="batch_process", lazy="joined"
+    "Work", order_by=Work.id, backref="batch_process", lazy="selectin"
 )
 
 
@@ -403,3 +404,67 @@ class InstockRecord(Base):
     operator = Column(String)
     record_time = Column(DateTime, nullable=False)
     note = Column(String)
+
+
+class BatchCostRollup(Base):
+    # one row per batch process plus a total row per batch (batch_process_id is null),
+    # maintained by cost_rollup_service whenever the underlying figures change.
+    # Derived data only, so no foreign keys that would get in the way of deletes.
+    __tablename__ = "batch_cost_rollup"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    batch_id = Column(Integer, index=True, nullable=False)
+    batch_process_id = Column(Integer)
+    position = Column(Integer, nullable=False)  # row order within the batch
+    item = Column(String(255), nullable=False)
+    planned = Column(Integer)
+    completed = Column(Integer)
+    completion_rate = Column(Float)
+    component_cost_total_standard = Column(Float)
+    component_cost_total_actual = Column(Float)
+    labor_cost_total_standard = Column(Float)
+    labor_cost_total_actual = Column(Float)
+    component_cost_unit_standard = Column(Float)
+    component_cost_unit_actual = Column(Float)
+    labor_cost_unit_standard = Column(Float)
+    labor_cost_unit_actual = Column(Float)
+    refreshed_at = Column(DateTime)
+
+
+class StockMovement(Base):
+    # append-only ledger of every change to Product.inventory / Specification.stock,
+    # written by inventory_service alongside the UPDATE it describes
+    __tablename__ = "stock_movement"
+    __table_args__ = (Index("ix_stock_movement_item", "item_type", "item_id", "id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    item_type = Column(String(16), nullable=False)  # product / specification
+    item_id = Column(String(64), nullable=False)
+    delta = Column(Integer, nullable=False)
+    balance = Column(Integer)  # stock right after this movement
+    reason = Column(String(32), nullable=False)
+    reference = Column(String(255))
+    created_at = Column(DateTime, nullable=False, index=True)
+
+
+class StockSnapshot(Base):
+    # stock of one item at `taken_at`, covering the ledger up to last_movement_id
+    __tablename__ = "stock_snapshot"
+    __table_args__ = (Index("ix_stock_snapshot_item", "item_type", "item_id", "taken_at"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    item_type = Column(String(16), nullable=False)
+    item_id = Column(String(64), nullable=False)
+    balance = Column(Integer)
+    last_movement_id = Column(Integer, nullable=False, default=0)
+    taken_at = Column(DateTime, nullable=False)
+
+
+class IdSequence(Base):
+    # last number handed out per counter, e.g. batch:2405 (batches started in
+    # May 2024) or instock_form:7:2024 (vendor 7's purchase orders of 2024);
+    # advanced by sequence_service inside the transaction that uses the number
+    __tablename__ = "id_sequence"
+
+    name = Column(String(64), primary_key=True)
+    value = Column(Integer, nullable=False)
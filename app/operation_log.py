@@ -0,0 +1,180 @@
+"""
+Background writer for the operation (audit) log.
+
+Endpoints hand their operation rows to `sink.submit()`; a worker thread drains
+the queue and writes them with one bulk INSERT + COMMIT per batch, flushing
+when MMS_OPLOG_BATCH_SIZE rows are queued or MMS_OPLOG_FLUSH_INTERVAL_MS has
+passed. MMS_OPLOG_MODE selects how a request waits for its row:
+
+* ``background`` (default): return immediately, the row is written with the
+  next batch;
+* ``durable``: block until the batch holding the row has committed, so a
+  crash never loses an acknowledged operation. A batch holding such a row is
+  written after at most MMS_OPLOG_DURABLE_LINGER_MS (default 2) instead of the
+  flush interval: the request waits for it with its transaction still open;
+* ``sync``: write the row inside the request, as before the sink existed.
+
+Whenever the worker is not running, the queue is full or a batch cannot be
+written, rows are written synchronously instead of being dropped.
+"""
+import os
+import queue
+import threading
+import time
+from typing import List
+
+from loguru import logger
+from sqlalchemy import insert
+
+from app import models
+from app.database import SessionLocal, _env_int
+
+BACKGROUND = "background"
+DURABLE = "durable"
+SYNC = "sync"
+MODES = (BACKGROUND, DURABLE, SYNC)
+
+
+class _Entry:
+    __slots__ = ("row", "done", "error")
+
+    def __init__(self, row: dict, wait: bool):
+        self.row = row
+        self.done = threading.Event() if wait else None
+        self.error = None
+
+
+class OperationLogSink:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        mode: str = BACKGROUND,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        max_queue: int = 10000,
+        durable_linger: float = 0.002,
+    ):
+        if mode not in MODES:
+            raise ValueError(
+                f"Unknown operation log mode {mode!r}, expected one of {MODES}"
+            )
+        self.session_factory = session_factory
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durable_linger = durable_linger
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stopping = threading.Event()
+        self.written = 0
+        self.fallbacks = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.mode == SYNC or self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="operation-log-sink", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the worker."""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        # anything submitted while shutting down
+        self._write(self._drain())
+
+    def submit(self, row: dict):
+        if self.mode == SYNC or not self.running:
+            self._insert([row])
+            return
+        entry = _Entry(row, wait=self.mode == DURABLE)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.fallbacks += 1
+            self._insert([row])
+            return
+        if entry.done is not None:
+            entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+
+    def _drain(self) -> List[_Entry]:
+        entries = []
+        while True:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return entries
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            started = time.monotonic()
+            deadline = started + self._linger(first)
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(entry)
+                # someone is waiting on this batch now, only pick up stragglers
+                deadline = min(deadline, started + self._linger(entry))
+            self._write(batch)
+
+    def _linger(self, entry: _Entry) -> float:
+        return self.flush_interval if entry.done is None else self.durable_linger
+
+    def _write(self, entries: List[_Entry]):
+        if not entries:
+            return
+        try:
+            self._insert([e.row for e in entries])
+        except Exception:
+            logger.exception(f"Bulk write of {len(entries)} operation log rows failed")
+            # write row by row so one bad row does not lose the whole batch
+            for entry in entries:
+                try:
+                    self._insert([entry.row])
+                    self.fallbacks += 1
+                except Exception as row_error:
+                    entry.error = row_error
+        finally:
+            for entry in entries:
+                if entry.done is not None:
+                    entry.done.set()
+
+    def _insert(self, rows: List[dict]):
+        db = self.session_factory()
+        try:
+            db.execute(insert(models.Operation), rows)
+            db.commit()
+            self.written += len(rows)
+        finally:
+            db.close()
+
+
+sink = OperationLogSink(
+    mode=os.getenv("MMS_OPLOG_MODE", BACKGROUND).strip().lower(),
+    batch_size=_env_int("MMS_OPLOG_BATCH_SIZE", 100),
+    flush_interval=_env_int("MMS_OPLOG_FLUSH_INTERVAL_MS", 500) / 1000,
+    max_queue=_env_int("MMS_OPLOG_QUEUE_SIZE", 10000),
+    durable_linger=_env_int("MMS_OPLOG_DURABLE_LINGER_MS", 2) / 1000,
+)
@@ -0,0 +1,121 @@
+"""
+Per-request SQL statistics.
+
+Every statement executed on any engine is counted (with its time) against the
+request being served, tracked through a context variable so statements run from
+the threadpool or the async engine are attributed correctly. The totals go out
+as X-DB-Query-Count / X-DB-Time-Ms response headers, and a warning is logged
+when one statement shape repeats MMS_N_PLUS_ONE_THRESHOLD times or more within
+a request, which is what an N+1 query pattern looks like.
+
+MMS_DB_QUERY_LOG=1 additionally logs a summary line for every request.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.database import _env_bool, _env_int
+
+N_PLUS_ONE_THRESHOLD = _env_int("MMS_N_PLUS_ONE_THRESHOLD", 10)
+LOG_EVERY_REQUEST = _env_bool("MMS_DB_QUERY_LOG", False)
+
+# "IN (?, ?, ?)" / "VALUES (%s, %s), (%s, %s)" differ only by list length
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _WHITESPACE.sub(" ", _PARAM_LIST.sub("(?)", statement)).strip()
+
+
+class QueryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, seconds: float):
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.shapes[shape] += 1
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        with self._lock:
+            return [(s, n) for s, n in self.shapes.most_common() if n >= threshold]
+
+
+_current = ContextVar("mms_query_stats", default=None)
+
+
+def current_stats():
+    return _current.get()
+
+
+# the start time lives on the statement's execution context, which is dropped
+# with it when the statement fails (after_cursor_execute never fires then)
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._mms_query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_mms_query_started", None)
+    stats = _current.get()
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+class QueryCounterMiddleware:
+    def __init__(self, app, threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-query-count", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{stats.seconds * 1000:.1f}".encode()),
+                ]
+                self._report(scope, message["status"], stats)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+
+    def _report(self, scope, status: int, stats: QueryStats):
+        route = f"{scope['method']} {scope['path']}"
+        log = logger.bind(
+            route=route,
+            status=status,
+            db_queries=stats.count,
+            db_time_ms=round(stats.seconds * 1000, 1),
+        )
+        for shape, n in stats.repeated(self.threshold):
+            log.bind(repeated=n, statement=shape).warning(
+                f"Possible N+1 in {route}: statement ran {n} times: {shape[:200]}"
+            )
+        if LOG_EVERY_REQUEST:
+            log.info(
+                f"{route} {status} {stats.count} queries {stats.seconds * 1000:.1f} ms"
+            )
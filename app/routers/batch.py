@@ -3,24 +3,26 @@
 from fastapi import APIRouter, Depends, Header
 from typing import List, Union
 
-from app import models, schemas
-from app.routers.product import adjust_inventory
+from app import models, schemas, serializers
+from app.routers.product import apply_inventory_adjustment
 from app.services import (
     batch_service,
     process_service,
-    product_service,
     operation_service,
-    batch_process_service,
+    cost_rollup_service,
+    cost_summary_service,
+    inventory_service,
 )
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi import HTTPException
-from collections import defaultdict
-import pandas as pd
 import io
 
-from app.dependencies import get_db
+from app.dependencies import get_db, get_async_db
+from app.pagination import PageParams, paginate
+from app.metrics import time_export
 
 from datetime import datetime, timedelta
 from enum import Enum
@@ -43,52 +45,101 @@ class BatchStatus(str, Enum):
     cancelled = "cancelled"
 
 
-@router.get("/", response_model=List[schemas.Batch])
-def read_batches(db: Session = Depends(get_db)):
-    batches = batch_service.get_batches(db=db)
-    return batches
+class BatchView(str, Enum):
+    # summary: batch columns only (batch_process comes back null); detail: the full tree
+    summary = batch_service.SUMMARY
+    detail = batch_service.DETAIL
+
+
+@router.get(
+    "/",
+    response_model=List[schemas.Batch],
+    response_class=ORJSONResponse,
+)
+def read_batches(
+    view: BatchView = BatchView.detail,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+):
+    paged = paginate(
+        batch_service.query_batches(db, view.value), models.Batch, schemas.Batch, page
+    )
+    if paged is not None:
+        return paged
+    batches = batch_service.get_batches(db=db, view=view.value)
+    return serializers.respond(schemas.Batch, batches)
 
 
-@router.get("/meta_info", response_model=List[schemas.Batch])
+@router.get(
+    "/meta_info",
+    response_model=List[schemas.Batch],
+    response_class=ORJSONResponse,
+)
 def read_batches_meta_info(db: Session = Depends(get_db)):
     batches = batch_service.get_batches_meta_info(db=db)
-    return batches
+    return serializers.respond(schemas.Batch, batches)
 
 
-@router.get("/unfinished", response_model=List[schemas.Batch])
-def read_unfinished_batches(db: Session = Depends(get_db)):
-    ongoing_batches = batch_service.get_batches_by_status("ongoing", db=db)
-    urgent_batches = batch_service.get_batches_by_status("urgent", db=db)
-    unstarted_batches = batch_service.get_batches_by_status("unstarted", db=db)
-    total_display = ongoing_batches + urgent_batches + unstarted_batches
-    return total_display if len(total_display) > 0 else []
+@router.get(
+    "/unfinished",
+    response_model=List[schemas.Batch],
+    response_class=ORJSONResponse,
+)
+async def read_unfinished_batches(db: AsyncSession = Depends(get_async_db)):
+    batches = await batch_service.get_batches_by_statuses_async(
+        ["ongoing", "urgent", "unstarted"], db=db
+    )
+    return serializers.respond(schemas.Batch, batches)
 
 
-@router.get("/working", response_model=List[schemas.Batch])
-def read_working_batches(db: Session = Depends(get_db)):
-    ongoing_batches = batch_service.get_batches_by_status("ongoing", db=db)
-    urgent_batches = batch_service.get_batches_by_status("urgent", db=db)
-    return ongoing_batches + urgent_batches
+@router.get(
+    "/working",
+    response_model=List[schemas.Batch],
+    response_class=ORJSONResponse,
+)
+def read_working_batches(
+    view: BatchView = BatchView.detail, db: Session = Depends(get_db)
+):
+    batches = batch_service.get_batches_by_statuses(
+        ["ongoing", "urgent"], db=db, view=view.value
+    )
+    return serializers.respond(schemas.Batch, batches)
 
 
-@router.get("/collected", response_model=List[schemas.Batch])
-def read_collected_batches(db: Session = Depends(get_db)):
-    finished_batches = batch_service.get_batches_by_status("finished", db=db)
-    shipped_batches = batch_service.get_batches_by_status("shipped", db=db)
-    return finished_batches + shipped_batches
+@router.get(
+    "/collected",
+    response_model=List[schemas.Batch],
+    response_class=ORJSONResponse,
+)
+def read_collected_batches(
+    view: BatchView = BatchView.detail, db: Session = Depends(get_db)
+):
+    batches = batch_service.get_batches_by_statuses(
+        ["finished", "shipped"], db=db, view=view.value
+    )
+    return serializers.respond(schemas.Batch, batches)
 
 
-@router.get("/recent", response_model=List[schemas.Batch])
-def read_recent_ended_batches(db: Session = Depends(get_db)):
+@router.get(
+    "/recent",
+    response_model=List[schemas.Batch],
+    response_class=ORJSONResponse,
+)
+def read_recent_ended_batches(
+    view: BatchView = BatchView.detail, db: Session = Depends(get_db)
+):
     tod = datetime.now()
     week = timedelta(days=7)
     target = tod - week
-    return batch_service.get_batches_end_after(target, db=db)
+    batches = batch_service.get_batches_end_after(target, db=db, view=view.value)
+    return serializers.respond(schemas.Batch, batches)
 
 
 @router.get("/{batch_id}", response_model=schemas.Batch)
 def read_batch(batch_id: int, db: Session = Depends(get_db)):
-    batch = batch_service.get_batch(batch_id=batch_id, db=db)
+    batch = batch_service.get_batch(
+        batch_id=batch_id, db=db, view=batch_service.DETAIL
+    )
     if batch is None:
         raise HTTPException(status_code=404, detail="Batch not found")
     return batch
@@ -117,12 +168,20 @@ def read_batches_by_product_id_and_status(
     return batches
 
 
-@router.get("/status/{status}", response_model=List[schemas.Batch])
-def read_batch_by_status(status: BatchStatus, db: Session = Depends(get_db)):
-    batch = batch_service.get_batches_by_status(status=status, db=db)
+@router.get(
+    "/status/{status}",
+    response_model=List[schemas.Batch],
+    response_class=ORJSONResponse,
+)
+def read_batch_by_status(
+    status: BatchStatus,
+    view: BatchView = BatchView.summary,
+    db: Session = Depends(get_db),
+):
+    batch = batch_service.get_batches_by_status(status=status, db=db, view=view.value)
     if batch is None:
         raise HTTPException(status_code=404, detail="Batch not found")
-    return batch
+    return serializers.respond(schemas.Batch, batch)
 
 
 @router.get("/plan_amount_over/{amount}")
@@ -161,114 +220,45 @@ def read_batch_start_before(date: datetime, db: Session = Depends(get_db)):
 
 
 @router.get("/batch-summary/download/{batch_id}.csv")
-async def download_batch_summary_csv(batch_id: int, db: Session = Depends(get_db)):
-    db_batch = batch_service.get_batch(batch_id=batch_id, db=db)
-    columns = [
-        "排产",
-        "达产",
-        "交付率",
-        "总计配件成本（标准）",
-        "总计配件成本（实际）",
-        "总计人力成本（标准）",
-        "总计人力成本（实际）",
-        "单位配件成本（标准）",
-        "单位配件成本（实际）",
-        "单位人力成本（标准）",
-        "单位人力成本（实际）",
-    ]
-    records = {}
-    b_spec_ta, b_spec_ti, b_emp_ta, b_emp_ti = 0, 0, 0, 0
-    b_spec_ua, b_spec_ui, b_emp_ua, b_emp_ui = 0, 0, 0, 0
-    consumption, ideal_unit_consumption = defaultdict(int), defaultdict(int)
-    for bp in db_batch.batch_process:
-        bp_spec_ta, bp_spec_ti, bp_emp_ta, bp_emp_ti = 0, 0, 0, 0
-        bp_spec_ua, bp_spec_ui, bp_emp_ua, bp_emp_ui = 0, 0, 0, 0
-        # 标准消耗量是batch层面的数据，计划略复杂，不能以work数据算
-        # （某道工艺未100%达产会导致后面的 work plan 都不是标准用量）
-        # 所以用 warehouse record 去计算单位产品的标准用量，最后乘 batch plan
-        for wr in bp.warehouse_record:
-            ideal_unit_consumption[wr.component_name] += wr.consumption
-            # 记录【bp 标准单位】
-            bp_spec_ui += wr.specification_gross_price * wr.consumption
-        for w in bp.work:
-            w_spec_ta, w_spec_ti, w_emp_ta, w_emp_ti = 0, 0, 0, 0
-            w_spec_ua, w_spec_ui, w_emp_ua, w_emp_ui = 0, 0, 0, 0
-            # 配件成本 = 配件价格 * （标准|实际用量）
-            # 逐个配件来加总
-            for ws in w.work_specification:
-                w_spec_ta += ws.specification_gross_price * ws.actual_amount
-                w_spec_ti += ws.specification_gross_price * ws.plan_amount
-                # 同时记录实际消耗量
-                consumption[ws.component_name] += ws.actual_amount
-            # 人力成本
-            w_emp_ta = w.complete_hour * w.hour_pay + w.complete_unit * w.unit_pay
-            w_emp_ti = bp.unit_pay * w.plan_unit
-            w_emp_ua = w_emp_ta / (w.complete_unit or w.plan_unit)
-            w_emp_ui = bp.unit_pay
-            w_spec_ua = w_spec_ta / (w.complete_unit or w.plan_unit)
-            w_spec_ui = w_spec_ui / w.plan_unit
-            # 将 work 数据处理进 【bp 实际总】
-            bp_spec_ta += w_spec_ta
-            bp_emp_ta += w_emp_ta
-        # 【bp 标准总】 需要 【bp 开始数量】
-        # 【bp 实际单位】 需要 【bp 结束数量】
-        bp_spec_ti = bp_spec_ui * bp.start_amount
-        bp_spec_ua = bp_spec_ta / bp.end_amount
-        bp_emp_ti = bp.start_amount * bp.unit_pay
-        bp_emp_ua = bp_emp_ta / bp.end_amount
-        bp_emp_ui = bp.unit_pay
-        # 记录本条 bp
-        bp_record_index = (
-            str(bp.process.process_order) + " - " + bp.process.process_name
-        )
-        records[bp_record_index] = [
-            bp.start_amount,
-            bp.end_amount,
-            bp.end_amount / bp.start_amount,
-            bp_spec_ti,
-            bp_spec_ta,
-            bp_emp_ti,
-            bp_emp_ta,
-            bp_spec_ui,
-            bp_spec_ua,
-            bp_emp_ui,
-            bp_emp_ua,
-        ]
-        # 将 bp 数据处理进 【batch 实际总】
-        b_spec_ta += bp_spec_ta
-        b_spec_ti += bp_spec_ti
-        b_emp_ta += bp_emp_ta
-        b_emp_ti += bp_emp_ti
-
-    # 计算【bp 单位】
-    b_spec_ua = b_spec_ta / db_batch.actual_amount
-    b_spec_ui = b_spec_ti / db_batch.plan_amount
-    b_emp_ua = b_emp_ta / db_batch.actual_amount
-    b_emp_ui = b_emp_ti / db_batch.plan_amount
-    # 记录本条 batch
-    batch_record_index = "批次" + str(batch_id) + "总计"
-    records[batch_record_index] = [
-        db_batch.plan_amount,
-        db_batch.actual_amount,
-        db_batch.actual_amount / db_batch.plan_amount,
-        b_spec_ti,
-        b_spec_ta,
-        b_emp_ti,
-        b_emp_ta,
-        b_spec_ui,
-        b_spec_ua,
-        b_emp_ui,
-        b_emp_ua,
-    ]
-
-    df = pd.DataFrame.from_dict(records, orient="index", columns=columns).reset_index()
+def download_batch_summary_csv(batch_id: int, db: Session = Depends(get_db)):
+    with time_export("batch_summary"):
+        summary = cost_rollup_service.get_rollup_summary([batch_id], db)
+        if summary.empty:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        return _summary_csv_response(summary, f"{batch_id}.csv")
+
+
+@router.get("/batch-summary/download/month/{year}/{month}.csv")
+def download_month_batch_summary_csv(
+    year: int, month: int, db: Session = Depends(get_db)
+):
+    with time_export("month_batch_summary"):
+        batch_ids = cost_summary_service.get_batch_ids_in_month(year, month, db)
+        summary = cost_rollup_service.get_rollup_summary(batch_ids, db)
+        return _summary_csv_response(summary, f"{year}-{month:02d}.csv")
+
+
+@router.get("/batch-summary/month/{year}/{month}")
+def read_month_batch_summary(year: int, month: int, db: Session = Depends(get_db)):
+    batch_ids = cost_summary_service.get_batch_ids_in_month(year, month, db)
+    summary = cost_rollup_service.get_rollup_summary(batch_ids, db)
+    return cost_summary_service.summary_as_records(summary)
+
+
+@router.get("/batch-summary/{batch_id}")
+def read_batch_summary(batch_id: int, db: Session = Depends(get_db)):
+    summary = cost_rollup_service.get_rollup_summary([batch_id], db)
+    if summary.empty:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return cost_summary_service.summary_as_records(summary)
+
+
+def _summary_csv_response(summary, filename: str):
     response = StreamingResponse(
-        io.StringIO("\ufeff" + df.to_csv(index=False, ncoding="utf-8-sig")),
+        io.StringIO(cost_summary_service.summary_as_csv(summary)),
         media_type="text/csv",
     )
-    response.headers[
-        "Content-Disposition"
-    ] = f"attachment; filename={str(db_batch.id)}.csv"
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
     return response
 
 
@@ -278,12 +268,7 @@ def create_batch(
     authorization: Union[str, None] = Header(default=None),
     db: Session = Depends(get_db),
 ):
-    month_db_existing = batch_service.get_batches_in_month(
-        batch.start.year, batch.start.month, db=db
-    )
-    prefix = ((batch.start.year - 2000) * 100 + batch.start.month) * 100
-    suffix = 1 if not month_db_existing else (1 + len(month_db_existing))
-    batch.id = prefix + suffix
+    batch.id = batch_service.allocate_batch_id(batch.start, db=db)
     batch_dict = batch.dict()
     batch_dict.pop("product_name", None)
     new_batch = models.Batch(**batch_dict)
@@ -366,11 +351,15 @@ def complete_batch(
     target_batch.actual_amount = actual_amount
     target_batch.end = datetime.now()
     completed_batch = batch_service.update_batch(batch=target_batch, db=db)
+    # writes only drop the rollup; a finished batch rarely changes, so store it now
+    cost_rollup_service.refresh_batch_rollups([batch_id], db)
     # update product inventory
     if update_inventory:
-        updated_product = adjust_inventory(
+        apply_inventory_adjustment(
             product_id=completed_batch.product_id,
             adjust_number=actual_amount,
+            reason=inventory_service.REASON_BATCH_COMPLETE,
+            reference=f"batch:{batch_id}",
             authorization=authorization,
             db=db,
         )
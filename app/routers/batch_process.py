@@ -8,7 +8,8 @@ from app import models, schemas
 from app.services import (
     batch_process_service,
     batch_service,
-    specification_service,
+    cost_rollup_service,
+    inventory_service,
     operation_service,
 )
 from sqlalchemy.orm import Session
@@ -17,6 +18,7 @@ from fastapi.responses import JSONResponse
 from fastapi import HTTPException
 
 from app.dependencies import get_db
+from app.unit_of_work import commit
 
 router = APIRouter(
     prefix="/batch_process",
@@ -151,15 +153,17 @@ def finish_batch_process(
             new_work = models.Work(**w.dict())
             db.add(new_work)
     # 更新配件库存
-    for wr in bp.warehouse_record:
-        spec_id = wr.specification_id
-        spec_consumption = wr.consumption * sum_amount
-        db_spec = specification_service.get_specification(
-            specification_id=spec_id, db=db
-        )
-        db_spec.stock -= spec_consumption
-        specification_service.update_specification(specification=db_spec, db=db)
-    db.commit()
+    inventory_service.adjust_specification_stock(
+        [
+            (wr.specification_id, -wr.consumption * sum_amount)
+            for wr in bp.warehouse_record
+        ],
+        db,
+        reason=inventory_service.REASON_CONSUMPTION,
+        reference=f"batch_process:{bp.id}",
+    )
+    cost_rollup_service.invalidate_batch_process_rollups([bp.id], db)
+    commit(db)
     # log operation
     operation_service.log_operation_with_authentication_token(
         authorization, f"更新生产工艺进度 {bp.id}", db
@@ -1,43 +1,103 @@
-import codecs
 import json
 import os
+import tempfile
+import threading
+import time
 
 from fastapi import APIRouter, Depends, Header, HTTPException
 
+from app.database import _env_int
+
 router = APIRouter(
     prefix="/business",
     tags=["business"],
     responses={404: {"description": "Not found"}},
 )
 
+# how long a cached file is trusted before its mtime is looked at again; writes
+# through this process refresh the cache immediately, so this only bounds how
+# late edits made by another worker or by hand are picked up
+RECHECK_SECONDS = _env_int("MMS_BUSINESS_INFO_RECHECK_MS", 5000) / 1000
+
+
+class CachedJsonFile:
+    """
+    A JSON file under app/ kept parsed in memory. Reloaded when its mtime changes,
+    replaced atomically (write a temp file, then rename over) on update so readers
+    never see a half-written file. The returned dict is shared: treat it as read-only.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._data = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(os.getcwd(), "app", self.filename)
+
+    def read(self) -> dict:
+        if (
+            self._data is not None
+            and time.monotonic() - self._checked_at < RECHECK_SECONDS
+        ):
+            return self._data
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            if self._data is None or mtime != self._mtime:
+                with open(self.path, encoding="utf8") as f:
+                    self._data = json.load(f)
+                self._mtime = mtime
+            self._checked_at = time.monotonic()
+            return self._data
+
+    def write(self, data: dict):
+        path = self.path
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=f".{self.filename}.", suffix=".tmp", dir=os.path.dirname(path)
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if os.path.exists(path):
+                    # mkstemp creates the file 0600, keep the original permissions
+                    os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._data = data
+            self._mtime = os.stat(path).st_mtime_ns
+            self._checked_at = time.monotonic()
+
+
+kaipiao_file = CachedJsonFile("kaipiao.json")
+company_file = CachedJsonFile("company.json")
+
 
 @router.get("/kaipiao-info")
 def get_kaipiao_info():
-    fp = os.path.join(os.getcwd(), "app", "kaipiao.json")
-    with open(fp) as f:
-        info = json.load(f)
-    return info
+    return kaipiao_file.read()
 
 
 @router.get("/company-info")
 def get_company_info():
-    fp = os.path.join(os.getcwd(), "app", "company.json")
-    with open(fp) as f:
-        info = json.load(f)
-    return info
+    return company_file.read()
 
 
 @router.put("/kaipiao-info")
 def update_kaipiao_info(data: dict):
-    fp = os.path.join(os.getcwd(), "app", "kaipiao.json")
-    with open(fp, "w", encoding="utf8") as f:
-        json.dump(data, f, ensure_ascii=False)
+    kaipiao_file.write(data)
     return
 
 
 @router.put("/company-info")
 def update_company_info(data: dict):
-    fp = os.path.join(os.getcwd(), "app", "company.json")
-    with open(fp, "w", encoding="utf8") as f:
-        json.dump(data, f, ensure_ascii=False)
-    return {"success": True}
\ No newline at end of file
+    company_file.write(data)
+    return {"success": True}
@@ -2,15 +2,23 @@
 
 from typing import List, Union
 
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends, Header, Response
 from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app import models, schemas
-from app.dependencies import get_db
-from app.services import specification_service, component_service, operation_service
+from app import models, schemas, serializers
+from app.conditional import conditional
+from app.dependencies import get_db, get_async_db
+from app.services import (
+    specification_service,
+    component_service,
+    operation_service,
+    reference_data_service,
+)
+from app.unit_of_work import commit
 
 from loguru import logger
 
@@ -21,12 +29,27 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[schemas.Component])
-def read_unhidden_components(
-    db: Session = Depends(get_db),
+@router.get(
+    "/",
+    response_model=List[schemas.Component],
+    response_class=ORJSONResponse,
+    dependencies=[
+        Depends(
+            conditional(
+                models.Component,
+                models.Specification,
+                models.Vendor,
+                schema=schemas.Component,
+            )
+        )
+    ],
+)
+async def read_unhidden_components(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    components = db.query(models.Component).filter(models.Component.hide == False).all()
-    return components
+    components = await component_service.get_components_async(db=db)
+    return serializers.respond(schemas.Component, components, response)
 
 
 @router.get("/hidden", response_model=List[schemas.Component])
@@ -35,7 +58,13 @@ def read_hidden_components(db: Session = Depends(get_db)):
     return components
 
 
-@router.get("/all_categories", response_model=List[schemas.CompoCategory])
+@router.get(
+    "/all_categories",
+    response_model=List[schemas.CompoCategory],
+    dependencies=[
+        Depends(conditional(models.CompoCategory, schema=schemas.CompoCategory))
+    ],
+)
 def read_component_categories(db: Session = Depends(get_db)):
     return component_service.get_compo_categories(db=db)
 
@@ -121,7 +150,8 @@ def hide_component(
     db.query(models.Component).filter(models.Component.id == component_id).update(
         {"hide": True}
     )
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     hidden_compo = (
         db.query(models.Component).filter(models.Component.id == component_id).first()
     )
@@ -141,7 +171,8 @@ def unhide_component(
     db.query(models.Component).filter(models.Component.id == component_id).update(
         {"hide": False}
     )
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     unhidden_compo = (
         db.query(models.Component).filter(models.Component.id == component_id).first()
     )
@@ -2,17 +2,18 @@
 from typing import List, Union
 
 from fastapi import APIRouter, Depends, Header
+from fastapi.responses import ORJSONResponse
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from starlette.responses import JSONResponse
 
-from app import schemas
-from app.dependencies import get_db
+from app import models, schemas, serializers
+from app.dependencies import get_db, get_async_db
+from app.pagination import PageParams, paginate
 from app.services import day_invoice_service, operation_service
 from datetime import datetime, timedelta
 
-from app.services.day_invoice_service import filter_out_day_invoice_in_cancelled_batch
-
 router = APIRouter(
     prefix="/day_invoice",
     tags=["day_invoice", "日产记录"],
@@ -20,10 +21,19 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[schemas.DayInvoice])
-def read_day_invoices(db: Session = Depends(get_db)):
+@router.get(
+    "/",
+    response_model=List[schemas.DayInvoice],
+    response_class=ORJSONResponse,
+)
+def read_day_invoices(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    paged = paginate(
+        db.query(models.DayInvoice), models.DayInvoice, schemas.DayInvoice, page
+    )
+    if paged is not None:
+        return paged
     day_invoices = day_invoice_service.get_day_invoices(db=db)
-    return day_invoices
+    return serializers.respond(schemas.DayInvoice, day_invoices)
 
 
 @router.get("/day_invoice_id/{day_invoice_id}", response_model=schemas.DayInvoice)
@@ -34,16 +44,28 @@ def read_day_invoice(day_invoice_id: int, db: Session = Depends(get_db)):
     return day_invoice
 
 
-@router.get("/checked", response_model=List[schemas.DayInvoice])
+@router.get(
+    "/checked",
+    response_model=List[schemas.DayInvoice],
+    response_class=ORJSONResponse,
+)
 def read_checked_day_invoices(db: Session = Depends(get_db)):
-    return day_invoice_service.get_day_invoices_by_check_status(True, db=db)
+    day_invoices = day_invoice_service.get_day_invoices_by_check_status(True, db=db)
+    return serializers.respond(schemas.DayInvoice, day_invoices)
 
 
-@router.get("/unchecked", response_model=List[schemas.DayInvoice])
-def read_unchecked_day_invoices(db: Session = Depends(get_db)):
-    all_DI = day_invoice_service.get_day_invoices_by_check_status(False, db=db)
-    valid_DI = filter_out_day_invoice_in_cancelled_batch(all_DI, db=db)
-    return valid_DI
+@router.get(
+    "/unchecked",
+    response_model=List[schemas.DayInvoice],
+    response_class=ORJSONResponse,
+)
+async def read_unchecked_day_invoices(db: AsyncSession = Depends(get_async_db)):
+    day_invoices = (
+        await day_invoice_service.get_valid_day_invoices_by_check_status_async(
+            False, db=db
+        )
+    )
+    return serializers.respond(schemas.DayInvoice, day_invoices)
 
 
 @router.get("/batch_id/{batch_id}")
@@ -66,22 +88,18 @@ def read_day_invoices_by_batch_process_id(
 
 @router.get("/employee_id/{employee_id}")
 def read_day_invoices_by_employee_id(employee_id: int, db: Session = Depends(get_db)):
-    day_invoices = day_invoice_service.get_day_invoices_by_employee_id(
-        employee_id=employee_id, db=db
+    return day_invoice_service.get_day_invoices_by_employee_id(
+        employee_id=employee_id, db=db, exclude_cancelled_batch=True
     )
-    valid_DI = filter_out_day_invoice_in_cancelled_batch(day_invoices, db=db)
-    return valid_DI
 
 
 @router.get("/work_date/{after}/{before}")
 def read_day_invoices_in_work_date_range(
     after: datetime, before: datetime, db: Session = Depends(get_db)
 ):
-    day_invoices = day_invoice_service.get_day_invoices_in_work_date_range(
-        after=after, before=before, db=db
+    return day_invoice_service.get_day_invoices_in_work_date_range(
+        after=after, before=before, db=db, exclude_cancelled_batch=True
     )
-    valid_DI = filter_out_day_invoice_in_cancelled_batch(day_invoices, db=db)
-    return valid_DI
 
 
 # All datetime passed by path params should be in format "YYYY-MM-DD"
@@ -89,24 +107,26 @@ def read_day_invoices_in_work_date_range(
 def read_day_invoices_by_employee_id_and_work_date_range(
     employee_id: int, after: datetime, before: datetime, db: Session = Depends(get_db)
 ):
-    day_invoices = (
-        day_invoice_service.get_day_invoices_by_employee_id_and_work_date_range(
-            employee_id=employee_id, after=after, before=before, db=db
-        )
+    return day_invoice_service.get_day_invoices_by_employee_id_and_work_date_range(
+        employee_id=employee_id,
+        after=after,
+        before=before,
+        db=db,
+        exclude_cancelled_batch=True,
     )
-    valid_DI = filter_out_day_invoice_in_cancelled_batch(day_invoices, db=db)
-    return valid_DI
 
 
 @router.get("/unchecked/employee_id_and_work_date/{employee_id}/{after}/{before}")
 def read_unchecked_day_invoices_by_employee_id_and_work_date_range(
     employee_id: int, after: datetime, before: datetime, db: Session = Depends(get_db)
 ):
-    day_invoices = day_invoice_service.get_unchecked_day_invoices_by_employee_id_and_work_date_range(
-        employee_id=employee_id, after=after, before=before, db=db
+    return day_invoice_service.get_unchecked_day_invoices_by_employee_id_and_work_date_range(
+        employee_id=employee_id,
+        after=after,
+        before=before,
+        db=db,
+        exclude_cancelled_batch=True,
     )
-    valid_DI = filter_out_day_invoice_in_cancelled_batch(day_invoices, db=db)
-    return valid_DI
 
 
 @router.get("/salary_id/{salary_id}")
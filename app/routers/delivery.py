@@ -5,12 +5,13 @@ from typing import List, Union
 
 from fastapi import APIRouter, Depends, Header
 from fastapi import HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from sqlalchemy.orm import Session
 
-from app import schemas, models
+from app import schemas, models, serializers
 from app.dependencies import get_db
-from app.services import delivery_service, operation_service, product_service
+from app.pagination import PageParams, paginate
+from app.services import delivery_service, operation_service, product_service, inventory_service
 
 router = APIRouter(
     prefix="/delivery",
@@ -19,10 +20,19 @@ router = APIRouter(
 )
 
 
-@router.get("/all", response_model=List[schemas.Delivery])
-def read_deliveries(db: Session = Depends(get_db)):
+@router.get(
+    "/all",
+    response_model=List[schemas.Delivery],
+    response_class=ORJSONResponse,
+)
+def read_deliveries(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    paged = paginate(
+        db.query(models.Delivery), models.Delivery, schemas.Delivery, page
+    )
+    if paged is not None:
+        return paged
     deliveries = delivery_service.get_deliveries(db=db)
-    return deliveries
+    return serializers.respond(schemas.Delivery, deliveries)
 
 
 @router.get("/", response_model=schemas.Delivery)
@@ -107,7 +117,11 @@ def create_delivery(
         db,
     )
     product_service.change_product_inventory(
-        product_id=delivery.product_id, adjust=-delivery.amount, db=db
+        product_id=delivery.product_id,
+        adjust=-delivery.amount,
+        db=db,
+        reason=inventory_service.REASON_DELIVERY,
+        reference=f"delivery:{new_delivery.id}",
     )
     return new_delivery
 
@@ -8,7 +8,9 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi import HTTPException
 
+from app.conditional import conditional
 from app.dependencies import get_db
+from app.unit_of_work import commit
 from datetime import datetime
 
 router = APIRouter(
@@ -18,7 +20,11 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[schemas.Employee])
+@router.get(
+    "/",
+    response_model=List[schemas.Employee],
+    dependencies=[Depends(conditional(models.Employee, schema=schemas.Employee))],
+)
 def read_all_employees(
     db: Session = Depends(get_db),
 ):
@@ -147,7 +153,7 @@ def update_employee(
     db.query(models.Employee).filter(models.Employee.id == employee.id).update(
         update_contents
     )
-    db.commit()
+    commit(db)
     # log operation
     operation_service.log_operation_with_authentication_token(
         authorization, f"更新员工信息 {employee.id} {employee.name}", db
@@ -1,26 +1,31 @@
 # coding=utf-8
 import os.path
+import tempfile
 from datetime import datetime, date
 from typing import List, Union
 from urllib.parse import quote
 
-import pandas as pd
 from fastapi import APIRouter, Depends, Header, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from openpyxl import Workbook
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app import schemas, models
-from app.dependencies import get_db
-from app.excel_content import generate_formatted_instock_form, wipe_old_files
+from app import schemas, models, serializers
+from app.dependencies import get_db, get_async_db
+from app.excel_content import generate_formatted_instock_form, wipe_old_files, write_instock_records
+from app.metrics import time_export
+from app.pagination import PageParams, paginate
 from app.routers import specification
 from app.routers.specification import (
     get_component_by_specification_id,
-    read_specification, check_if_spec_use_net_price,
+    read_specification,
 )
-from app.services import operation_service
+from app.services import operation_service, instock_service, inventory_service
 from app.services.operation_service import extract_user_from_authentication
+from app.unit_of_work import commit
 
 router = APIRouter(
     prefix="/instock",
@@ -28,12 +33,20 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# exports larger than this are spooled to disk instead of kept in memory
+EXPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
 
-@router.get("/form", response_model=List[schemas.InstockForm])
+
+@router.get(
+    "/form",
+    response_model=List[schemas.InstockForm],
+    response_class=ORJSONResponse,
+)
 def read_instock_forms(
         form_id: int = None,
         form_status: str = None,
         paid: bool = None,
+        page: PageParams = Depends(),
         db: Session = Depends(get_db),
 ):
     criteria = dict()
@@ -43,16 +56,25 @@ def read_instock_forms(
         criteria["form_status"] = form_status
     if paid is not None:
         criteria["paid"] = paid
-    return db.query(models.InstockForm).filter_by(**criteria).all()
+    query = db.query(models.InstockForm).filter_by(**criteria)
+    paged = paginate(query, models.InstockForm, schemas.InstockForm, page)
+    if paged is not None:
+        return paged
+    return serializers.respond(schemas.InstockForm, query.all())
 
 
-@router.get("/historical-form", response_model=List[schemas.InstockForm])
+@router.get(
+    "/historical-form",
+    response_model=List[schemas.InstockForm],
+    response_class=ORJSONResponse,
+)
 def read_historical_instock_forms(db: Session = Depends(get_db)):
-    return (
+    forms = (
         db.query(models.InstockForm)
             .filter(models.InstockForm.form_status != "ongoing")
             .all()
     )
+    return serializers.respond(schemas.InstockForm, forms)
 
 
 @router.post("/form")
@@ -65,16 +87,8 @@ def create_new_instock_form(
     if not form.create_time:
         form.create_time = datetime.now()
     # generate id for the form
-    year_begin = datetime(form.create_time.year, 1, 1)
-    existing_form_of_curr_year = db.query(models.InstockForm.display_form_id) \
-        .filter(models.InstockForm.create_time >= year_begin, models.InstockForm.vendor_id == form.vendor_id) \
-        .all()
-    print(existing_form_of_curr_year)
-    if len(existing_form_of_curr_year) == 0:
-        new_count = 1
-    else:
-        new_count = max([int(oid[0][-4:]) for oid in existing_form_of_curr_year]) + 1
-    new_display_id = f"{form.create_time.strftime('%Y%m%d')}-{str(form.vendor_id).rjust(3, '0')}-{str(new_count).rjust(4, '0')}"
+    (new_count,) = instock_service.allocate_form_numbers(form.vendor_id, form.create_time.year, db)
+    new_display_id = instock_service.display_form_id(form.create_time, form.vendor_id, new_count)
     # for new form object
     form_info_dict = form.dict()
     form_info_dict['display_form_id'] = new_display_id
@@ -114,53 +128,55 @@ def create_multiple_new_forms(
         authorization: Union[str, None] = Header(default=None),
         db: Session = Depends(get_db),
 ):
-    created_forms = []
+    if not forms:
+        return []
+    # 创建时间的缺省值为后台处理时间
+    now = datetime.now()
     for form in forms:
-        new_form_data = create_new_instock_form(form, authorization, db)
-        new_form_id = new_form_data.get('form_id', None)
-        new_form = db.query(models.InstockForm).filter(models.InstockForm.form_id == new_form_id).first()
-        created_forms.append(new_form.__dict__.copy())
+        if not form.create_time:
+            form.create_time = now
+    spec_ids = {item["specification_id"] for form in forms for item in form.instock_item or []}
+    notices = instock_service.get_specification_notices(spec_ids, db)
+    if spec_ids - notices.keys():
+        raise HTTPException(status_code=404, detail="Specification not found")
+    form_ids = instock_service.create_forms(forms, notices, db)
+    created = instock_service.get_forms_by_ids(form_ids, db)
+    # log operation, one entry for the whole batch
+    operation_service.log_operation_with_authentication_token(
+        authorization,
+        f"批量创建新采购单 {len(form_ids)} 张：" + "，".join(
+            f"{form_id}（供应商: {created[form_id].vendor.company}）" for form_id in form_ids
+        ),
+        db,
+    )
+    created_forms = []
+    for form_id in form_ids:
+        response = created[form_id].__dict__.copy()
+        response.pop('_sa_instance_state', None)
+        created_forms.append(response)
     return created_forms
 
 
 @router.get("/ongoing-item")
-def get_instock_items(db: Session = Depends(get_db)):
-    ongoing_forms = db.query(models.InstockForm).filter(
-        models.InstockForm.form_status == 'ongoing').all()
-    response = []
+async def get_instock_items(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(models.InstockForm).where(models.InstockForm.form_status == 'ongoing'))
+    ongoing_forms = result.unique().scalars().all()
+    pending, forms = [], {}
     for f in ongoing_forms:
+        forms[f.form_id] = f
         for item in f.instock_item:
             if item.warehouse_quantity < item.order_quantity:
                 item.display_form_id = f.display_form_id
-                item_obj = item.__dict__
-                item_obj = enrich_instock_item(item_obj, f, db=db)
-                response.append(item_obj)
-    return response
+                pending.append(item)
+    return await db.run_sync(
+        lambda session: instock_service.enrich_instock_items(pending, session, forms=forms)
+    )
 
 
 def enrich_instock_item(instock_item, instock_form=None, db: Session = Depends(get_db)):
-    # cast instock item
-    if isinstance(instock_item, models.InstockItem):
-        instock_item = instock_item.__dict__
-    elif isinstance(instock_item, schemas.InstockItem):
-        instock_item = instock_item.dict()
-    # get corresponding form if not given
-    if not instock_form:
-        instock_form = db.query(models.InstockForm).filter(
-            models.InstockForm.form_id == instock_item['form_id']).first()
-    # do enriching
-    compo = db.query(models.Specification).filter(
-        models.Specification.id == instock_item["specification_id"]).first().component
-    display = {
-        "form_id": instock_form.display_form_id,
-        "company": instock_form.vendor.company,
-        "create_time": instock_form.create_time,
-        "component_name": compo.name,
-        "model": compo.model,
-        "as_unit": compo.as_unit
-    }
-    instock_item['display'] = display
-    return instock_item
+    forms = {instock_form.form_id: instock_form} if instock_form else None
+    return instock_service.enrich_instock_items([instock_item], db, forms=forms)[0]
 
 
 @router.get("/enriched_item")
@@ -170,11 +186,7 @@ def get_enriched_item(form_id: int = None, instock_item_id: int = None, db: Sess
         print(items)
     else:
         items = db.query(models.InstockItem).filter(models.InstockItem.instock_item_id == instock_item_id).all()
-    response = []
-    for item in items:
-        response.append(enrich_instock_item(instock_item=item, instock_form=item.instock_form, db=db))
-    print(response)
-    return response
+    return instock_service.enrich_instock_items(items, db)
 
 
 @router.post("/item")
@@ -216,7 +228,7 @@ def update_instock_form(
     db.query(models.InstockForm).filter(
         models.InstockForm.form_id == form.form_id, models.InstockForm.vendor_id == form.vendor_id
     ).update(update_content)
-    db.commit()
+    commit(db)
     # logging
     operation_service.log_operation_with_authentication_token(
         authorization,
@@ -267,9 +279,11 @@ def update_instock_item(
     )
     stock_increase = item.warehouse_quantity - prev_item.warehouse_quantity
     # 如果有新入库，增加库存
-    specification.adjust_stock(
+    specification.apply_stock_adjustment(
         spec_id=item.specification_id,
         adjust_number=stock_increase,
+        reason=inventory_service.REASON_INSTOCK,
+        reference=f"instock_item:{item.instock_item_id}",
         authorization=authorization,
         db=db,
     )
@@ -279,7 +293,7 @@ def update_instock_item(
     db.query(models.InstockItem).filter(
         models.InstockItem.instock_item_id == item.instock_item_id
     ).update(update_contents)
-    db.commit()
+    commit(db)
     # logging
     operation_service.log_operation_with_authentication_token(
         authorization,
@@ -325,7 +339,7 @@ def new_instock_event(
     parent_item_filter.update(
         {"warehouse_quantity": new_balance, "last_time": instock_time}
     )
-    db.commit()
+    commit(db)
     return parent_item_filter.first()
 
 
@@ -342,7 +356,11 @@ def update_multiple_instock_items(
     return response
 
 
-@router.get("/record", response_model=List[schemas.InstockRecord])
+@router.get(
+    "/record",
+    response_model=List[schemas.InstockRecord],
+    response_class=ORJSONResponse,
+)
 def get_instock_record(
         instock_item_id: int = None,
         instock_form_id: int = None,
@@ -362,37 +380,14 @@ def get_instock_record(
             .filter(models.InstockRecord.instock_item_id.in_(instock_item_id_list))
             .all()
     )
-    return records
-
-
-def enrich_instock_record(instock_record: Union[models.InstockRecord, schemas.InstockRecord],
-                          db: Session = Depends(get_db)):
-    if isinstance(instock_record, models.InstockRecord):
-        instock_record = instock_record.__dict__
-    elif isinstance(instock_record, schemas.InstockRecord):
-        instock_record = instock_record.dict()
-    instock_item = db.query(models.InstockItem).filter(
-        models.InstockItem.instock_item_id == instock_record['instock_item_id']).first()
-    enriched_item = enrich_instock_item(instock_item=instock_item, instock_form=instock_item.instock_form, db=db)
-    # do enriching
-    if not enriched_item["unit_cost"]:
-        enriched_item["unit_cost"] = 0
-    display = {
-        "company": enriched_item["display"]["company"],
-        "specification_id": enriched_item["specification_id"],
-        "component_name": enriched_item["display"]["component_name"],
-        "model": enriched_item["display"]["model"],
-        "form_id": enriched_item["display"]["form_id"],
-        "total_value": enriched_item["unit_cost"] * instock_record["amount_in"],
-        "notice": enriched_item["notice"],
-        "paid": enriched_item["instock_form"].paid,
-        "use_net": check_if_spec_use_net_price(spec_id=enriched_item['specification_id'], db=db)['use_net'],
-    }
-    instock_record['display'] = display
-    return instock_record
+    return serializers.respond(schemas.InstockRecord, records)
 
 
-@router.get("/records-in-date-range", response_model=List[schemas.InstockRecord])
+@router.get(
+    "/records-in-date-range",
+    response_model=List[schemas.InstockRecord],
+    response_class=ORJSONResponse,
+)
 def get_instock_record_in_time_range(
         start: date = None,
         end: date = None,
@@ -406,59 +401,45 @@ def get_instock_record_in_time_range(
             .filter(models.InstockRecord.record_time.between(start, end))
             .all()
     )
-    response = []
-    for r in records:
-        response.append(enrich_instock_record(instock_record=r, db=db))
-    return response
+    return instock_service.enrich_instock_records(records, db)
 
 
 @router.get('/instock-record-in-excel')
-async def download_instock_record_excel(
+def download_instock_record_excel(
         start: date = None,
         end: date = None,
         db: Session = Depends(get_db),
 ):
-    instock_records = get_instock_record_in_time_range(start, end, db)
-
-    # clean up old files
-    pwd = os.getcwd()
-    wipe_old_files(pwd)
+    if not start or not end:
+        raise HTTPException(status_code=504, detail="No date range specified.")
 
     filename = f"入库记录 {start.strftime('%Y-%m-%d')}-{end.strftime('%Y-%m-%d')}.xlsx"
 
-    # data processing
-    data = pd.json_normalize(instock_records, sep='.')
-    data.drop(['_sa_instance_state'], axis=1, inplace=True)
-    data['display.paid'].fillna("FALSE", inplace=True)
-    data['display.use_net'].fillna("FALSE", inplace=True)
-    # data.replace(["TRUE", "FALSE"], ["是", "否"], inplace=True)
-    data.rename(
-        columns={'id': '记录编号',
-                 'instock_item_id': '采购内容序列号',
-                 'display.company': '供应商',
-                 'display.specification_id': '物料编号',
-                 'display.component_name': '物料名称',
-                 'display.model': '物料型号',
-                 'amount_in': '本次入库数量',
-                 'balance': '记录后总入库数量',
-                 'record_time': '入库时间',
-                 'display.form_id': '采购单编号',
-                 'display.total_value': '入库价值金额',
-                 'display.notice': '采购备注',
-                 'display.paid': '是否付款',
-                 'display.use_net': '使用税前价',
-                 'operator': '操作员',
-                 'note': '入库备注'
-                 },
-        inplace=True,
-    )
-    save_path = os.path.join(pwd, filename)
-    data.to_excel(save_path)
-    print("Saving worksheet to " + save_path)
+    # small exports stay in memory, large ones roll over to an anonymous temp file
+    buffer = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    with time_export("instock_records"):
+        write_instock_records(
+            instock_service.iter_enriched_records_in_range(start, end, db), buffer
+        )
+    buffer.seek(0)
+
     headers = {
         "Content-Disposition": "attachment; filename*=utf-8''{}".format(quote(filename))
     }
-    return FileResponse(save_path, headers=headers)
+    return StreamingResponse(
+        _iter_file(buffer),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers=headers,
+    )
+
+
+def _iter_file(fileobj, chunk_size: int = 64 * 1024):
+    with fileobj:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
 
 
 @router.get("/form-as-preview")
@@ -500,16 +481,17 @@ async def download_instock_form_excel(form_id: int, db: Session = Depends(get_db
     pwd = os.getcwd()
     wipe_old_files(pwd)
 
-    # create worksheet
-    workbook = Workbook()
-    sheet = workbook.active
+    with time_export("instock_form"):
+        # create worksheet
+        workbook = Workbook()
+        sheet = workbook.active
 
-    filename = generate_formatted_instock_form(sheet, form, db)
+        filename = generate_formatted_instock_form(sheet, form, db)
 
-    save_path = os.path.join(pwd, filename)
+        save_path = os.path.join(pwd, filename)
 
-    print("Saving worksheet to " + save_path)
-    workbook.save(save_path)
+        print("Saving worksheet to " + save_path)
+        workbook.save(save_path)
 
     headers = {
         "Content-Disposition": "attachment; filename*=utf-8''{}".format(quote(filename))
@@ -1,21 +1,24 @@
 # coding=utf-8
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends, Header, Response
 from typing import List, Union
 
-from app import schemas
+from app import models, schemas, serializers
 from app.services import (
     product_service,
+    inventory_service,
     process_service,
     process_component_service,
     operation_service,
 )
 from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi import HTTPException
 from datetime import datetime
 
+from app.conditional import conditional
 from app.dependencies import get_db
+from app.unit_of_work import commit
 
 router = APIRouter(
     prefix="/products",
@@ -24,22 +27,47 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[schemas.Product])
+@router.get(
+    "/",
+    response_model=List[schemas.Product],
+    response_class=ORJSONResponse,
+)
 def read_products(db: Session = Depends(get_db)):
     products = product_service.get_products(db=db)
-    return products
-
-
-@router.get("/valid", response_model=List[schemas.Product])
-def read_products(db: Session = Depends(get_db)):
+    return serializers.respond(schemas.Product, products)
+
+
+@router.get(
+    "/valid",
+    response_model=List[schemas.Product],
+    response_class=ORJSONResponse,
+    dependencies=[
+        Depends(
+            conditional(
+                models.Product,
+                models.Process,
+                models.ProcessComponent,
+                models.Component,
+                models.Specification,
+                models.Vendor,
+                schema=schemas.Product,
+            )
+        )
+    ],
+)
+def read_products(response: Response, db: Session = Depends(get_db)):
     products = product_service.get_valid_products(db=db)
-    return products
+    return serializers.respond(schemas.Product, products, response)
 
 
-@router.get("/invalid", response_model=List[schemas.Product])
+@router.get(
+    "/invalid",
+    response_model=List[schemas.Product],
+    response_class=ORJSONResponse,
+)
 def read_products(db: Session = Depends(get_db)):
     products = product_service.get_invalid_products(db=db)
-    return products
+    return serializers.respond(schemas.Product, products)
 
 
 @router.get("/only_name")
@@ -160,11 +188,31 @@ def adjust_inventory(
     authorization: Union[str, None] = Header(default=None),
     db: Session = Depends(get_db),
 ):
-    db_product_data = product_service.get_product(product_id, db=db)
-    if not db_product_data:
+    return apply_inventory_adjustment(
+        product_id,
+        adjust_number,
+        authorization,
+        db,
+        inventory_service.REASON_ADJUSTMENT,
+    )
+
+
+def apply_inventory_adjustment(
+    product_id: str,
+    adjust_number: int,
+    authorization: Union[str, None],
+    db: Session,
+    reason: str,
+    reference: str = None,
+):
+    """adjust_inventory for other endpoints, recording why stock moved in the ledger."""
+    inventory_service.adjust_product_inventory(
+        {product_id: adjust_number}, db, reason=reason, reference=reference
+    )
+    commit(db)
+    updated_product = product_service.get_product(product_id, db=db)
+    if not updated_product:
         raise HTTPException(status_code=400, detail="Matching product not found")
-    db_product_data.inventory += adjust_number
-    updated_product = product_service.update_product(product=db_product_data, db=db)
     # log operation
     operation_service.log_operation_with_authentication_token(
         authorization, f"修改产品库存 {updated_product.id} {updated_product.name}", db
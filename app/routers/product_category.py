@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
 
 from app.dependencies import get_db
+from app.unit_of_work import commit
 
 router = APIRouter(
     prefix="/product_category",
@@ -30,6 +31,6 @@ def create_product_category(
     data = jsonable_encoder(product_category)
     new = models.ProductCategory(**data)
     db.add(new)
-    db.commit()
+    commit(db)
     db.refresh(new)
     return new
@@ -4,16 +4,19 @@ import io
 from fastapi import APIRouter, Depends, Header
 from typing import List, Union
 
-from app import models, schemas
+from app import models, schemas, serializers
 from app.services import salary_service, operation_service
 from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi import HTTPException
 
 from app.dependencies import get_db
+from app.metrics import time_export
+from app.pagination import PageParams, paginate
 from datetime import datetime
 import pandas as pd
+from app.unit_of_work import commit
 
 router = APIRouter(
     prefix="/salary",
@@ -22,10 +25,17 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[schemas.Salary])
-def read_salaries(db: Session = Depends(get_db)):
+@router.get(
+    "/",
+    response_model=List[schemas.Salary],
+    response_class=ORJSONResponse,
+)
+def read_salaries(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    paged = paginate(db.query(models.Salary), models.Salary, schemas.Salary, page)
+    if paged is not None:
+        return paged
     salaries = salary_service.get_salaries(db=db)
-    return salaries
+    return serializers.respond(schemas.Salary, salaries)
 
 
 @router.get("/{salary_id}", response_model=schemas.Salary)
@@ -77,14 +87,18 @@ def read_salaries_of_month(
 
 
 @router.get("/salary-summary/download/{salary_id}.csv")
-async def download_salary_summary_csv(
+@time_export("salary_summary")
+def download_salary_summary_csv(
     salary_id: int,
     db: Session = Depends(get_db),
 ):
     columns = ["日期", "批次", "工艺", "员工", "计件", "单件报酬", "计时", "小时报酬", "单日小计"]
     records = {}
     target_salary = salary_service.get_salary(salary_id=salary_id, db=db)
+    if target_salary is None:
+        raise HTTPException(status_code=404, detail="Salary not found")
     works = target_salary.work
+    batch_ids = salary_service.get_work_batch_ids(salary_id, db=db)
     subtotal = 0
     for work in works:
         work_sum = work.unit_pay * (work.complete_unit or 0) + work.hour_pay * (
@@ -92,7 +106,7 @@ async def download_salary_summary_csv(
         )
         records[work.id] = [
             work.work_date.strftime("%Y-%m-%d"),
-            work.batch_id,
+            batch_ids.get(work.id),
             work.process_name,
             work.employee_name,
             work.complete_unit,
@@ -161,7 +175,7 @@ def update_salary(
     db.query(models.Salary).filter(models.Salary.id == salary.id).update(
         update_contents, synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
     # log operation
     operation_service.log_operation_with_authentication_token(
         authorization,
@@ -1,15 +1,23 @@
 # coding=utf-8
-from fastapi import APIRouter, Depends, Body, Header
+from fastapi import APIRouter, Depends, Body, Header, Response
 from typing import List, Union
 
-from app import models, schemas
-from app.services import specification_service, operation_service
+from app import models, schemas, serializers
+from app.services import (
+    specification_service,
+    operation_service,
+    inventory_service,
+    reference_data_service,
+)
 from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi import HTTPException
 
+from app.conditional import conditional
 from app.dependencies import get_db
+from app.pagination import PageParams, paginate
+from app.unit_of_work import commit
 
 router = APIRouter(
     prefix="/specifications",
@@ -18,42 +26,58 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[schemas.Specification])
-def read_specifications(db: Session = Depends(get_db)):
+@router.get(
+    "/",
+    response_model=List[schemas.Specification],
+    response_class=ORJSONResponse,
+    dependencies=[
+        Depends(
+            conditional(
+                models.Specification, models.Vendor, schema=schemas.Specification
+            )
+        )
+    ],
+)
+def read_specifications(
+    response: Response, page: PageParams = Depends(), db: Session = Depends(get_db)
+):
+    paged = paginate(
+        db.query(models.Specification),
+        models.Specification,
+        schemas.Specification,
+        page,
+        response,
+    )
+    if paged is not None:
+        return paged
     specifications = specification_service.get_specifications(db=db)
-    return specifications
+    return serializers.respond(schemas.Specification, specifications, response)
 
 
 @router.get("/component/{spec_id}", response_model=schemas.Component)
 def get_component_by_specification_id(spec_id: str, db: Session = Depends(get_db)):
-    compo_id = (
-        db.query(models.Specification.component_id)
-        .filter(models.Specification.id == spec_id)
-        .first()[0]
-    )
-    compo = db.query(models.Component).filter(models.Component.id == compo_id).first()
+    compo = reference_data_service.get_component_by_specification(spec_id, db=db)
+    if compo is None:
+        raise HTTPException(status_code=404, detail="Specification not found")
     return compo
 
 
 @router.get("/component-name/{spec_id}", response_model=str)
 def get_component_name_by_specification_id(spec_id: str, db: Session = Depends(get_db)):
-    compo_id = (
-        db.query(models.Specification.component_id)
-        .filter(models.Specification.id == spec_id)
-        .first()[0]
-    )
-    compo_name = (
-        db.query(models.Component.name)
-        .filter(models.Component.id == compo_id)
-        .first()[0]
-    )
-    return compo_name
+    compo = reference_data_service.get_component_by_specification(spec_id, db=db)
+    if compo is None:
+        raise HTTPException(status_code=404, detail="Specification not found")
+    return compo.name
 
 
-@router.get("/hidden", response_model=List[schemas.Specification])
+@router.get(
+    "/hidden",
+    response_model=List[schemas.Specification],
+    response_class=ORJSONResponse,
+)
 def read_hidden_specifications(db: Session = Depends(get_db)):
     specifications = specification_service.get_specifications(db=db)
-    return specifications
+    return serializers.respond(schemas.Specification, specifications)
 
 
 @router.get("/existing_ids", response_model=List[str])
@@ -82,13 +106,7 @@ def read_specification_gross_price(
 
 @router.get("/by_id/{specification_id}", response_model=schemas.Specification)
 def read_specification(specification_id: str, db: Session = Depends(get_db)):
-    specification = (
-        db.query(models.Specification)
-        .filter(
-            models.Specification.id == specification_id,
-        )
-        .first()
-    )
+    specification = reference_data_service.get_specification(specification_id, db=db)
     if specification is None:
         raise HTTPException(status_code=404, detail="Specification not found")
     return specification
@@ -170,9 +188,10 @@ def read_specification_under_price(
 
 @router.get("/if_use_net")
 def check_if_spec_use_net_price(spec_id: str, db: Session = Depends(get_db)):
-    result = db.query(models.Specification.use_net).filter(models.Specification.id == spec_id).first()[0]
-    print(result)
-    return {"use_net": result}
+    specification = reference_data_service.get_specification(spec_id, db=db)
+    if specification is None:
+        raise HTTPException(status_code=404, detail="Specification not found")
+    return {"use_net": specification.use_net}
 
 
 @router.post("/", response_model=schemas.Specification)
@@ -211,11 +230,29 @@ def adjust_stock(
     authorization: Union[str, None] = Header(default=None),
     db: Session = Depends(get_db),
 ):
-    db_spec = specification_service.get_specification(specification_id=spec_id, db=db)
-    db_spec.stock += adjust_number
-    updated_spec = specification_service.update_specification(
-        specification=db_spec, db=db
+    return apply_stock_adjustment(
+        spec_id, adjust_number, authorization, db, inventory_service.REASON_ADJUSTMENT
     )
+
+
+def apply_stock_adjustment(
+    spec_id: str,
+    adjust_number: int,
+    authorization: Union[str, None],
+    db: Session,
+    reason: str,
+    reference: str = None,
+):
+    """adjust_stock for other endpoints, recording why stock moved in the ledger."""
+    inventory_service.adjust_specification_stock(
+        {spec_id: adjust_number}, db, reason=reason, reference=reference
+    )
+    commit(db)
+    updated_spec = specification_service.get_specification(
+        specification_id=spec_id, db=db
+    )
+    if not updated_spec:
+        raise HTTPException(status_code=400, detail="Matching specification not found")
     # log operation
     operation_service.log_operation_with_authentication_token(
         authorization, f"修改配件子类库存 {updated_spec.id}", db
@@ -257,7 +294,8 @@ def hide_specification(
     db.query(models.Specification).filter(models.Specification.id == spec_id).update(
         {"hide": True}
     )
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     # log operation
     operation_service.log_operation_with_authentication_token(
         authorization, f"停用产品 {spec_id}", db
@@ -274,7 +312,8 @@ def unhide_specification(
     db.query(models.Specification).filter(models.Specification.id == spec_id).update(
         {"hide": False}
     )
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     revealed_spec = (
         db.query(models.Specification)
         .filter(models.Specification.id == spec_id)
@@ -0,0 +1,85 @@
+# coding=utf-8
+from datetime import datetime
+from enum import Enum
+from typing import List, Union
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.dependencies import get_db
+from app.services import operation_service, stock_ledger_service
+from app.services.inventory_service import PRODUCT, SPECIFICATION
+from app.unit_of_work import commit
+
+router = APIRouter(
+    prefix="/stock-ledger",
+    tags=["stock-ledger", "库存流水"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+class StockItemType(str, Enum):
+    product = PRODUCT
+    specification = SPECIFICATION
+
+
+@router.get("/{item_type}/{item_id}/balance", response_model=schemas.StockBalance)
+def read_balance_at(
+    item_type: StockItemType,
+    item_id: str,
+    at: datetime = None,
+    db: Session = Depends(get_db),
+):
+    at = at or datetime.now()
+    balance = stock_ledger_service.get_balance_at(item_type.value, item_id, at, db)
+    if balance is None:
+        raise HTTPException(status_code=404, detail=f"No {item_type.value} {item_id}")
+    return {
+        "item_type": item_type.value,
+        "item_id": item_id,
+        "at": at,
+        "balance": balance,
+    }
+
+
+@router.get("/{item_type}/{item_id}/range", response_model=schemas.StockBalanceRange)
+def read_balance_in_range(
+    item_type: StockItemType,
+    item_id: str,
+    start: datetime,
+    end: datetime = None,
+    db: Session = Depends(get_db),
+):
+    return stock_ledger_service.get_balance_in_range(
+        item_type.value, item_id, start, end or datetime.now(), db
+    )
+
+
+@router.get(
+    "/{item_type}/{item_id}/movements", response_model=List[schemas.StockMovement]
+)
+def read_movements(
+    item_type: StockItemType,
+    item_id: str,
+    start: datetime,
+    end: datetime = None,
+    db: Session = Depends(get_db),
+):
+    return stock_ledger_service.get_movements_in_range(
+        item_type.value, item_id, start, end or datetime.now(), db
+    )
+
+
+@router.post("/snapshots")
+def take_snapshots(
+    authorization: Union[str, None] = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    count = stock_ledger_service.take_snapshots(db)
+    commit(db)
+    # log operation
+    operation_service.log_operation_with_authentication_token(
+        authorization, f"记录库存快照 {count} 条", db
+    )
+    return {"success": True, "snapshots": count}
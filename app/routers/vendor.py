@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, Header
 from typing import List, Union
 
 
-from app.services import vendor_service, operation_service
+from app.services import vendor_service, operation_service, reference_data_service
 from sqlalchemy.orm import Session
 from fastapi.responses import JSONResponse
 from fastapi import HTTPException
@@ -11,6 +11,7 @@ from fastapi import HTTPException
 from app.dependencies import get_db
 
 from app import schemas, models
+from app.unit_of_work import commit
 
 router = APIRouter(
     prefix="/vendors",
@@ -80,7 +81,8 @@ def update_vendor(
     if not update_vendor_id:
         return HTTPException(status_code=400, detail="No vendor ID found in request")
     db.query(models.Vendor).filter(models.Vendor.id == update_vendor_id).update(vendor)
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     # log operation
     operation_service.log_operation_with_authentication_token(
         authorization, f"更新供应商信息 {update_vendor_id} {vendor.get('name', '')}", db
@@ -3,11 +3,11 @@ from fastapi import APIRouter, Depends, Header
 from typing import List, Union
 
 from app.routers import specification
-from app import schemas
-from app.services import warehouse_record_service, operation_service
+from app import schemas, serializers
+from app.services import warehouse_record_service, operation_service, inventory_service
 from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi import HTTPException
 
 from app.dependencies import get_db
@@ -19,10 +19,14 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[schemas.WarehouseRecord])
+@router.get(
+    "/",
+    response_model=List[schemas.WarehouseRecord],
+    response_class=ORJSONResponse,
+)
 def read_warehouse_records(db: Session = Depends(get_db)):
     warehouse_records = warehouse_record_service.get_warehouse_records(db=db)
-    return warehouse_records
+    return serializers.respond(schemas.WarehouseRecord, warehouse_records)
 
 
 @router.get("/{warehouse_record_id}", response_model=schemas.WarehouseRecord)
@@ -70,9 +74,11 @@ def create_warehouse_record(
     new_warehouse_record = warehouse_record_service.create_warehouse_record(
         warehouse_record=warehouse_record, db=db
     )
-    specification.adjust_stock(
+    specification.apply_stock_adjustment(
         spec_id=new_warehouse_record.specification_id,
         adjust_number=0 - new_warehouse_record.consumption,
+        reason=inventory_service.REASON_WAREHOUSE_RECORD,
+        reference=f"warehouse_record:{new_warehouse_record.id}",
         authorization=authorization,
         db=db,
     )
@@ -105,15 +111,19 @@ def update_warehouse_record(
     updated_wr = warehouse_record_service.update_warehouse_record(
         warehouse_record=db_warehouse_record_model.copy(update=update_data), db=db
     )
-    specification.adjust_stock(
+    specification.apply_stock_adjustment(
         spec_id=db_warehouse_record_data.specification_id,
         adjust_number=db_warehouse_record_data.consumption,
+        reason=inventory_service.REASON_WAREHOUSE_RECORD,
+        reference=f"warehouse_record:{db_warehouse_record_data.id}",
         authorization=authorization,
         db=db,
     )
-    specification.adjust_stock(
+    specification.apply_stock_adjustment(
         spec_id=warehouse_record.specification_id,
         adjust_number=0 - updated_wr.consumption,
+        reason=inventory_service.REASON_WAREHOUSE_RECORD,
+        reference=f"warehouse_record:{updated_wr.id}",
         authorization=authorization,
         db=db,
     )
@@ -2,14 +2,15 @@
 from fastapi import APIRouter, Depends, Header
 from typing import List, Union
 
-from app import models, schemas
+from app import models, schemas, serializers
 from app.services import work_service, operation_service
 from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi import HTTPException
 
 from app.dependencies import get_db
+from app.pagination import PageParams, paginate
 from datetime import datetime
 
 router = APIRouter(
@@ -19,10 +20,17 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[schemas.Work])
-def read_works(db: Session = Depends(get_db)):
+@router.get(
+    "/",
+    response_model=List[schemas.Work],
+    response_class=ORJSONResponse,
+)
+def read_works(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    paged = paginate(db.query(models.Work), models.Work, schemas.Work, page)
+    if paged is not None:
+        return paged
     works = work_service.get_works(db=db)
-    return works
+    return serializers.respond(schemas.Work, works)
 
 
 @router.get("/work_id/{work_id}", response_model=schemas.Work)
@@ -31,14 +39,24 @@ def read_work(work_id: int, db: Session = Depends(get_db)):
     return work
 
 
-@router.get("/checked", response_model=List[schemas.Work])
+@router.get(
+    "/checked",
+    response_model=List[schemas.Work],
+    response_class=ORJSONResponse,
+)
 def read_checked_works(db: Session = Depends(get_db)):
-    return work_service.get_works_by_check_status(True, db=db)
+    works = work_service.get_works_by_check_status(True, db=db)
+    return serializers.respond(schemas.Work, works)
 
 
-@router.get("/unchecked", response_model=List[schemas.Work])
+@router.get(
+    "/unchecked",
+    response_model=List[schemas.Work],
+    response_class=ORJSONResponse,
+)
 def read_unchecked_works(db: Session = Depends(get_db)):
-    return work_service.get_works_by_check_status(False, db=db)
+    works = work_service.get_works_by_check_status(False, db=db)
+    return serializers.respond(schemas.Work, works)
 
 
 @router.get("/batch_process_id/{batch_process_id}")
@@ -131,8 +149,6 @@ def delete_work(work_id: int, db: Session = Depends(get_db)):
     db.query(models.WorkSpecification).filter(
         models.WorkSpecification.work_id == work_id
     ).delete(synchronize_session="fetch")
-    db.query(models.Work).filter(models.Work.id == work_id).delete(
-        synchronize_session="fetch"
-    )
-    db.commit()
+    # deletes the work and refreshes its batch's cost rollup
+    work_service.delete_work(work=db_work_data, db=db)
     return JSONResponse(content={"success": True})
@@ -494,6 +494,37 @@ class InstockRecord(BaseModel):
         orm_mode = True
 
 
+class StockMovement(BaseModel):
+    id: int
+    item_type: str
+    item_id: str
+    delta: int
+    balance: Optional[int]
+    reason: str
+    reference: Optional[str]
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class StockBalance(BaseModel):
+    item_type: str
+    item_id: str
+    at: datetime
+    balance: Optional[int]
+
+
+class StockBalanceRange(BaseModel):
+    item_type: str
+    item_id: str
+    start: datetime
+    end: datetime
+    opening_balance: Optional[int]
+    closing_balance: Optional[int]
+    movements: List[StockMovement] = []
+
+
 class UserBase(BaseModel):
     username: str
     disabled: bool = False
@@ -0,0 +1,21 @@
+# coding=utf-8
+"""
+Create the id_sequence table used to number batches and purchase orders.
+
+    python -m app.scripts.create_id_sequence
+
+Run once before deploying the sequence-based id allocation. Counters need no
+backfill: each one starts from the highest number already in use the first
+time it is asked for one.
+"""
+from app import models
+from app.database import mysql_engine
+
+
+def main():
+    models.IdSequence.__table__.create(bind=mysql_engine, checkfirst=True)
+    print("id_sequence table ready")
+
+
+if __name__ == "__main__":
+    main()
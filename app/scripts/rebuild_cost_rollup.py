@@ -0,0 +1,53 @@
+# coding=utf-8
+"""
+Create the batch_cost_rollup table if needed and (re)compute it from the raw
+batch process, warehouse record, work and work specification rows.
+
+    python -m app.scripts.rebuild_cost_rollup              # every batch
+    python -m app.scripts.rebuild_cost_rollup 231001 231002
+    python -m app.scripts.rebuild_cost_rollup --month 2023-10
+"""
+import argparse
+
+from sqlalchemy import select
+
+from app import models
+from app.database import SessionLocal, mysql_engine
+from app.services import cost_rollup_service, cost_summary_service
+
+CHUNK_SIZE = 200
+
+
+def rebuild(batch_ids, db, chunk_size: int = CHUNK_SIZE):
+    for i in range(0, len(batch_ids), chunk_size):
+        chunk = batch_ids[i : i + chunk_size]
+        cost_rollup_service.refresh_batch_rollups(chunk, db)
+        db.commit()
+        print(f"rebuilt {min(i + chunk_size, len(batch_ids))}/{len(batch_ids)} batches")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("batch_ids", nargs="*", type=int)
+    parser.add_argument("--month", help="YYYY-MM, rebuild the batches of that month")
+    args = parser.parse_args()
+
+    models.BatchCostRollup.__table__.create(bind=mysql_engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        if args.batch_ids:
+            batch_ids = sorted(set(args.batch_ids))
+        elif args.month:
+            year, month = (int(part) for part in args.month.split("-"))
+            batch_ids = cost_summary_service.get_batch_ids_in_month(year, month, db)
+        else:
+            batch_ids = list(
+                db.execute(select(models.Batch.id).order_by(models.Batch.id)).scalars()
+            )
+        rebuild(batch_ids, db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# coding=utf-8
+"""
+Record the current stock of every product and specification in stock_snapshot.
+
+    python -m app.scripts.take_stock_snapshot
+
+Meant to run from cron (e.g. nightly); point-in-time balance queries start from
+the latest snapshot and only add up the ledger entries written after it.
+Creates the stock_movement and stock_snapshot tables if they are missing.
+"""
+from app import models
+from app.database import SessionLocal, mysql_engine
+from app.services import stock_ledger_service
+
+
+def main():
+    for model in (models.StockMovement, models.StockSnapshot):
+        model.__table__.create(bind=mysql_engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        count = stock_ledger_service.take_snapshots(db)
+        db.commit()
+        print(f"recorded {count} stock snapshots")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
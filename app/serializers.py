@@ -0,0 +1,181 @@
+"""
+Fast serialization of ORM rows for list endpoints.
+
+FastAPI turns a list endpoint's return value into JSON by validating every row
+against the route's response_model (pydantic orm_mode: one model instance per
+row and per nested row) and then walking those models again with
+jsonable_encoder. For a few hundred batches with their processes and works
+that is most of the request's CPU time.
+
+`dump_many(schema, rows)` builds the same JSON-ready dicts directly. For each
+schema of app.schemas a mapper is compiled once from its fields: it reads the
+attributes off the row and only hands a value to pydantic when its type does
+not already match the field, i.e. when pydantic would coerce it (an int read
+into a str field, an int into a float field). Rows that are not ORM objects
+(dicts, pydantic models) and rows the mapper cannot map exactly (a required
+attribute missing, a None in a non-optional field) go through pydantic as
+before, so the output is the same either way.
+
+A route opts in by returning `respond(schema, rows)`. MMS_FAST_SERIALIZERS=0
+sends every such route back through pydantic.
+"""
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
+
+from app.database import _env_bool
+
+enabled = _env_bool("MMS_FAST_SERIALIZERS", True)
+
+# field types whose values are used as read when they have exactly that type
+SCALARS = {
+    str: None,
+    int: None,
+    float: None,
+    bool: None,
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+}
+
+_MISSING = object()
+_mappers = {}
+
+
+class _Fallback(Exception):
+    """The mapper cannot tell what pydantic would make of this row."""
+
+
+def _none(field: ModelField):
+    if field.allow_none:
+        return None
+    raise _Fallback
+
+
+def _validating_converter(field: ModelField):
+    def convert(value):
+        if value is None:
+            return _none(field)
+        validated, errors = field.validate(value, {}, loc=field.alias)
+        if errors:
+            raise _Fallback
+        return jsonable_encoder(validated)
+
+    return convert
+
+
+def _scalar_converter(field: ModelField):
+    type_ = field.type_
+    encode = SCALARS[type_]
+    slow = _validating_converter(field)
+
+    def convert(value):
+        if type(value) is type_:
+            return encode(value) if encode else value
+        return slow(value)
+
+    return convert
+
+
+def _model_converter(field: ModelField, schema):
+    def convert(value):
+        if value is None:
+            return _none(field)
+        if isinstance(value, (dict, BaseModel)):
+            raise _Fallback
+        return mapper(schema)(value)
+
+    return convert
+
+
+def _list_converter(field: ModelField):
+    item = _converter(field.sub_fields[0])
+
+    def convert(value):
+        if value is None:
+            return _none(field)
+        if not isinstance(value, list):
+            raise _Fallback
+        return [item(v) for v in value]
+
+    return convert
+
+
+def _converter(field: ModelField):
+    if field.shape == SHAPE_LIST:
+        return _list_converter(field)
+    if field.shape != SHAPE_SINGLETON:
+        return _validating_converter(field)
+    type_ = field.type_
+    if field.sub_fields:
+        # Union: pydantic keeps the first member that validates, try that one
+        type_ = field.sub_fields[0].type_
+    if type_ is Any:
+        # nothing to validate, e.g. an untyped List
+        return jsonable_encoder
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        if type_.__config__.orm_mode:
+            return _model_converter(field, type_)
+    elif type_ in SCALARS and not field.sub_fields:
+        return _scalar_converter(field)
+    return _validating_converter(field)
+
+
+def _compile(schema):
+    fields = [(f.alias, f, _converter(f)) for f in schema.__fields__.values()]
+
+    def map_row(obj) -> dict:
+        out = {}
+        for name, field, convert in fields:
+            value = getattr(obj, name, _MISSING)
+            if value is _MISSING:
+                if field.required:
+                    raise _Fallback
+                # like from_orm: the default as is, not validated
+                out[name] = jsonable_encoder(field.get_default())
+            else:
+                out[name] = convert(value)
+        return out
+
+    return map_row
+
+
+def mapper(schema):
+    """The compiled row-to-dict mapper of `schema`, built on first use."""
+    map_row = _mappers.get(schema)
+    if map_row is None:
+        map_row = _mappers[schema] = _compile(schema)
+    return map_row
+
+
+def dump_with_pydantic(schema, row):
+    return jsonable_encoder(schema.validate(row))
+
+
+def dump(schema, row):
+    if enabled and not isinstance(row, (dict, BaseModel)):
+        try:
+            return mapper(schema)(row)
+        except _Fallback:
+            pass
+    return dump_with_pydantic(schema, row)
+
+
+def dump_many(schema, rows) -> list:
+    return [dump(schema, row) for row in rows]
+
+
+def respond(schema, rows, response: Response = None) -> ORJSONResponse:
+    """
+    Render `rows` as a JSON list of `schema`. Pass the endpoint's `response`
+    when dependencies set headers on it (ETag): FastAPI only copies those into
+    responses it builds itself.
+    """
+    result = ORJSONResponse(dump_many(schema, rows))
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
+    return result
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
 from app import schemas
 from app.models import BatchProcess
+from app.services import cost_rollup_service
+from app.unit_of_work import commit
 
 
 def get_batch_process(batch_process_id: int, db: Session):
@@ -28,7 +30,9 @@ def get_batch_processes_by_status(status: str, db: Session):
 def create_batch_process(batch_process: schemas.BatchProcessCreate, db: Session):
     new_batch_process = BatchProcess(**batch_process.dict())
     db.add(new_batch_process)
-    db.commit()
+    db.flush()
+    cost_rollup_service.invalidate_batch_rollups([new_batch_process.batch_id], db)
+    commit(db)
     db.refresh(new_batch_process)
     return new_batch_process
 
@@ -40,10 +44,19 @@ def update_batch_process(batch_process: schemas.BatchProcess, db: Session):
     json_work = json_bp.pop("work", None)
     json_wr = json_bp.pop("warehouse_record", None)
     updated_batch_process = BatchProcess(**json_bp)
+    # the process may have moved to another batch, refresh both
+    previous_batch_id = (
+        db.query(BatchProcess.batch_id)
+        .filter(BatchProcess.id == updated_batch_process.id)
+        .scalar()
+    )
     db.query(BatchProcess).filter(BatchProcess.id == updated_batch_process.id).update(
         jsonable_encoder(updated_batch_process)
     )
-    db.commit()
+    cost_rollup_service.invalidate_batch_rollups(
+        [previous_batch_id, updated_batch_process.batch_id], db
+    )
+    commit(db)
     return (
         db.query(BatchProcess)
         .filter(BatchProcess.id == updated_batch_process.id)
@@ -55,5 +68,6 @@ def delete_batch_process(batch_process: schemas.BatchProcess, db: Session):
     db.query(BatchProcess).filter(BatchProcess.id == batch_process.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    cost_rollup_service.invalidate_batch_rollups([batch_process.batch_id], db)
+    commit(db)
     return
@@ -1,21 +1,60 @@
-from sqlalchemy.orm import Session
+from typing import List
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from fastapi.encoders import jsonable_encoder
 
-from app.models import Batch, Product
+from app.models import (
+    Batch,
+    BatchCostRollup,
+    BatchProcess,
+    Component,
+    Process,
+    ProcessComponent,
+    Specification,
+    Work,
+)
 
-from datetime import datetime
+from datetime import date, datetime
 
 from app import schemas
-from app.services import product_service
+from app.services import cost_rollup_service, sequence_service
+from app.unit_of_work import commit
+
+# loading strategies for batch reads
+SUMMARY = "summary"  # batch columns only, one query, no relationships
+DETAIL = "detail"  # everything schemas.Batch serializes, through selectin loads
+
 
+def query_batches(db: Session, view: str = None):
+    if view == SUMMARY:
+        return db.query(*batch_summary_columns())
+    if view == DETAIL:
+        return db.query(Batch).options(*batch_detail_options())
+    return db.query(Batch)
 
-def get_batch(batch_id: int, db: Session):
-    batch = db.query(Batch).filter(Batch.id == batch_id).first()
-    batch.product_name = str(
-        db.query(Product.name).filter(Product.id == batch.product_id).first()[0]
+
+def batch_summary_columns():
+    return (
+        Batch.id,
+        Batch.status,
+        Batch.product_id,
+        Batch.plan_amount,
+        Batch.actual_amount,
+        Batch.create,
+        Batch.start,
+        Batch.end,
+        Batch.ship,
+        Batch.notice,
+        Batch.product_name,
     )
-    return batch
+
+
+def get_batch(batch_id: int, db: Session, view: str = None):
+    # product_name comes with the row through its column_property
+    return query_batches(db, view).filter(Batch.id == batch_id).first()
 
 
 def get_batch_meta_info(batch_id: int, db: Session):
@@ -37,8 +76,8 @@ def get_batch_meta_info(batch_id: int, db: Session):
     )
 
 
-def get_batches(db: Session):
-    return db.query(Batch).all()
+def get_batches(db: Session, view: str = None):
+    return query_batches(db, view).all()
 
 
 def get_batches_in_month(year: int, month: int, db: Session):
@@ -47,6 +86,24 @@ def get_batches_in_month(year: int, month: int, db: Session):
     return db.query(Batch).filter(Batch.id > lower_bound, Batch.id < upper_bound).all()
 
 
+def allocate_batch_id(start: date, db: Session) -> int:
+    """Next free id of a batch starting on `start`: YYMM followed by a two-digit count."""
+    lower_bound = ((start.year - 2000) * 100 + start.month) * 100
+
+    def highest_in_use():
+        highest = db.execute(
+            select(func.max(Batch.id)).where(
+                Batch.id > lower_bound, Batch.id < lower_bound + 100
+            )
+        ).scalar()
+        return highest - lower_bound if highest else 0
+
+    (count,) = sequence_service.allocate(
+        f"batch:{lower_bound // 100}", highest_in_use, db
+    )
+    return lower_bound + count
+
+
 def get_batches_meta_info(db: Session):
     return db.query(
         Batch.id,
@@ -62,13 +119,49 @@ def get_batches_meta_info(db: Session):
     ).all()
 
 
-def get_batches_by_status(status: str, db: Session):
-    batches = db.query(Batch).filter(Batch.status == status).all()
-    for b in batches:
-        b.product_name = product_service.get_product_name(
-            product_id=b.product_id, db=db
-        )
-    return batches
+def get_batches_by_status(status: str, db: Session, view: str = None):
+    return query_batches(db, view).filter(Batch.status == status).all()
+
+
+def _status_order(statuses: List[str]):
+    # keep batches grouped in the order the statuses were asked for
+    return case({s: i for i, s in enumerate(statuses)}, value=Batch.status)
+
+
+def get_batches_by_statuses(statuses: List[str], db: Session, view: str = None):
+    return (
+        query_batches(db, view)
+        .filter(Batch.status.in_(statuses))
+        .order_by(_status_order(statuses), Batch.id)
+        .all()
+    )
+
+
+def batch_detail_options():
+    # everything schemas.Batch serializes, loaded up front: async sessions cannot lazy load
+    return (
+        selectinload(Batch.batch_process).options(
+            selectinload(BatchProcess.warehouse_record),
+            selectinload(BatchProcess.work).selectinload(Work.work_specification),
+            selectinload(BatchProcess.process)
+            .selectinload(Process.process_component)
+            .selectinload(ProcessComponent.component)
+            .selectinload(Component.specification)
+            # joined into the specification query: a 7th query level would be
+            # too deep for SQLAlchemy's statement cache
+            .joinedload(Specification.vendor),
+        ),
+    )
+
+
+async def get_batches_by_statuses_async(statuses: List[str], db: AsyncSession):
+    result = await db.execute(
+        select(Batch)
+        .where(Batch.status.in_(statuses))
+        .order_by(_status_order(statuses), Batch.id)
+        .options(*batch_detail_options())
+    )
+    return result.unique().scalars().all()
 
 
 def get_batches_by_product_id(product_id: str, db: Session):
@@ -111,8 +204,8 @@ def get_batches_start_before(date: datetime, db: Session):
     return db.query(Batch).filter(Batch.start <= date).all()
 
 
-def get_batches_end_after(date: datetime, db: Session):
-    return db.query(Batch).filter(Batch.end >= date).all()
+def get_batches_end_after(date: datetime, db: Session, view: str = None):
+    return query_batches(db, view).filter(Batch.end >= date).all()
 
 
 def get_batches_ship_after(date: datetime, db: Session):
@@ -135,11 +228,16 @@ def update_batch(batch: schemas.Batch, db: Session):
     db.query(Batch).filter(Batch.id == updated_batch.id).update(
         jsonable_encoder(updated_batch)
     )
-    db.commit()
+    # plan and actual amounts feed the completion rate and unit costs
+    cost_rollup_service.invalidate_batch_rollups([updated_batch.id], db)
+    commit(db)
     return db.query(Batch).filter(Batch.id == updated_batch.id).first()
 
 
 def delete_batch(batch: schemas.Batch, db: Session):
+    db.query(BatchCostRollup).filter(BatchCostRollup.batch_id == batch.id).delete(
+        synchronize_session=False
+    )
     db.query(Batch).filter(Batch.id == batch.id).delete(synchronize_session="fetch")
-    db.commit()
+    commit(db)
     return
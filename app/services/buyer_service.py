@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
+from app.unit_of_work import commit
 
 
 def get_buyer(buyer_id: int, db: Session):
@@ -23,7 +24,7 @@ def get_buyer_by_name(name: str, db: Session):
 def create_buyer(buyer: schemas.BuyerCreate, db: Session):
     new_buyer = models.Buyer(**buyer.dict())
     db.add(new_buyer)
-    db.commit()
+    commit(db)
     db.refresh(new_buyer)
     return new_buyer
 
@@ -33,7 +34,7 @@ def update_buyer(buyer: schemas.Buyer, db: Session):
     db.query(models.Buyer).filter(models.Buyer.id == updated_buyer.id).update(
         jsonable_encoder(updated_buyer)
     )
-    db.commit()
+    commit(db)
     return db.query(models.Buyer).filter(models.Buyer.id == updated_buyer.id).first()
 
 
@@ -41,5 +42,5 @@ def delete_buyer(buyer: schemas.Buyer, db: Session):
     db.query(models.Buyer).filter(models.Buyer.id == buyer.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
     return
@@ -1,10 +1,13 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from fastapi.encoders import jsonable_encoder
 
 from app import schemas, models
 
-from app.services import specification_service
+from app.services import reference_data_service, specification_service
+from app.unit_of_work import commit
 
 
 def get_component(component_id: str, db: Session):
@@ -17,6 +20,19 @@ def get_components(db: Session):
     return db.query(models.Component).filter(models.Component.hide == False).all()
 
 
+async def get_components_async(db: AsyncSession):
+    result = await db.execute(
+        select(models.Component)
+        .where(models.Component.hide == False)
+        .options(
+            selectinload(models.Component.specification).selectinload(
+                models.Specification.vendor
+            )
+        )
+    )
+    return result.scalars().all()
+
+
 def get_hidden_components(db: Session):
     return db.query(models.Component).filter(models.Component.hide == True).all()
 
@@ -43,7 +59,8 @@ def if_component_low_stock(component_id: str, db: Session):
 def create_component(component: schemas.ComponentCreate, db: Session):
     new_component = models.Component(**component.dict())
     db.add(new_component)
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     db.refresh(new_component)
     return new_component
 
@@ -55,7 +72,8 @@ def update_component(component: schemas.Component, db: Session):
     db.query(models.Component).filter(
         models.Component.id == updated_component.id
     ).update(jsonable_encoder(updated_component))
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     return (
         db.query(models.Component)
         .filter(models.Component.id == updated_component.id)
@@ -67,7 +85,8 @@ def delete_component(component: schemas.Component, db: Session):
     db.query(models.Component).filter(models.Component.id == component.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     return
 
 
@@ -0,0 +1,112 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, List
+
+import pandas as pd
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import BatchCostRollup, BatchProcess, Work
+from app.services import cost_summary_service
+from app.services.cost_summary_service import SUMMARY_COLUMNS, SUMMARY_KEYS
+
+
+def refresh_batch_rollups(batch_ids: Iterable[int], db: Session):
+    """
+    Recompute the stored cost rollup of `batch_ids` from the raw tables. Writes
+    only invalidate it, this runs when a batch completes and from the rebuild
+    script.
+
+    Runs inside the caller's transaction (pending changes are flushed first so
+    they are part of the figures), the caller commits.
+    """
+    batch_ids = sorted({batch_id for batch_id in batch_ids if batch_id is not None})
+    if not batch_ids:
+        return
+    db.flush()
+    summary = cost_summary_service.get_cost_summary(batch_ids, db)
+    db.execute(delete(BatchCostRollup).where(BatchCostRollup.batch_id.in_(batch_ids)))
+    refreshed_at = datetime.now()
+    positions = defaultdict(int)
+    rows = []
+    for record in cost_summary_service.summary_as_records(summary):
+        batch_id = record["batch_id"]
+        rows.append(
+            dict(
+                record,
+                batch_id=int(batch_id),
+                position=positions[batch_id],
+                refreshed_at=refreshed_at,
+            )
+        )
+        positions[batch_id] += 1
+    if rows:
+        db.execute(insert(BatchCostRollup), rows)
+
+
+def invalidate_batch_rollups(batch_ids: Iterable[int], db: Session):
+    """
+    Drop the stored rollup of `batch_ids` after a write to their figures.
+
+    A single DELETE, so writes stay cheap: until the rollup is refreshed again
+    (when the batch completes, or by app.scripts.rebuild_cost_rollup) readers
+    compute these batches on the fly, see `get_rollup_summary`.
+    """
+    batch_ids = {batch_id for batch_id in batch_ids if batch_id is not None}
+    if batch_ids:
+        _delete_rollups(batch_ids, db)
+
+
+def invalidate_batch_process_rollups(batch_process_ids: Iterable[int], db: Session):
+    batch_process_ids = {i for i in batch_process_ids if i is not None}
+    if batch_process_ids:
+        _delete_rollups(
+            select(BatchProcess.batch_id).where(BatchProcess.id.in_(batch_process_ids)),
+            db,
+        )
+
+
+def invalidate_work_rollups(work_ids: Iterable[int], db: Session):
+    work_ids = {i for i in work_ids if i is not None}
+    if work_ids:
+        _delete_rollups(
+            select(BatchProcess.batch_id)
+            .join(Work, Work.batch_process_id == BatchProcess.id)
+            .where(Work.id.in_(work_ids)),
+            db,
+        )
+
+
+def _delete_rollups(batch_ids, db: Session):
+    # `batch_ids` may be a subquery, so the lookup and the delete are one statement
+    db.execute(
+        delete(BatchCostRollup)
+        .where(BatchCostRollup.batch_id.in_(batch_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def get_rollup_summary(batch_ids: List[int], db: Session) -> pd.DataFrame:
+    """
+    Cost summary of `batch_ids` read from the rollup table. Batches that have no
+    rollup (changed since it was last refreshed, or created before the table was
+    backfilled) are computed on the fly.
+    """
+    rows = db.execute(
+        select(*[getattr(BatchCostRollup, column) for column in SUMMARY_COLUMNS])
+        .where(BatchCostRollup.batch_id.in_(batch_ids))
+        .order_by(BatchCostRollup.batch_id, BatchCostRollup.position)
+    ).all()
+    summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+    for column in ("batch_process_id", "planned", "completed"):
+        summary[column] = summary[column].astype("Int64")
+    for column in SUMMARY_KEYS:
+        if column not in ("planned", "completed"):
+            summary[column] = summary[column].astype(float)
+
+    missing = sorted(set(batch_ids) - set(summary["batch_id"]))
+    if missing:
+        computed = cost_summary_service.get_cost_summary(missing, db)
+        summary = pd.concat([summary, computed], ignore_index=True)
+        summary = summary.sort_values("batch_id", kind="stable")
+    return summary.reset_index(drop=True)
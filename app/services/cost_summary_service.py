@@ -0,0 +1,265 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Batch,
+    BatchProcess,
+    Process,
+    WarehouseRecord,
+    Work,
+    WorkSpecification,
+)
+
+# (key in the JSON summary, header in the CSV export)
+SUMMARY_FIELDS = [
+    ("planned", "排产"),
+    ("completed", "达产"),
+    ("completion_rate", "交付率"),
+    ("component_cost_total_standard", "总计配件成本（标准）"),
+    ("component_cost_total_actual", "总计配件成本（实际）"),
+    ("labor_cost_total_standard", "总计人力成本（标准）"),
+    ("labor_cost_total_actual", "总计人力成本（实际）"),
+    ("component_cost_unit_standard", "单位配件成本（标准）"),
+    ("component_cost_unit_actual", "单位配件成本（实际）"),
+    ("labor_cost_unit_standard", "单位人力成本（标准）"),
+    ("labor_cost_unit_actual", "单位人力成本（实际）"),
+]
+SUMMARY_KEYS = [key for key, _ in SUMMARY_FIELDS]
+SUMMARY_COLUMNS = ["batch_id", "batch_process_id", "item"] + SUMMARY_KEYS
+
+
+def month_batch_id_bounds(year: int, month: int):
+    # batch ids are YYMMNN, see create_batch
+    lower_bound = ((year - 2000) * 100 + month) * 100
+    return lower_bound, lower_bound + 100
+
+
+def get_batch_ids_in_month(year: int, month: int, db: Session) -> List[int]:
+    lower_bound, upper_bound = month_batch_id_bounds(year, month)
+    return list(
+        db.execute(
+            select(Batch.id)
+            .where(Batch.id > lower_bound, Batch.id < upper_bound)
+            .order_by(Batch.id)
+        ).scalars()
+    )
+
+
+def _frame(db: Session, statement, columns: List[str]) -> pd.DataFrame:
+    return pd.DataFrame(db.execute(statement).all(), columns=columns)
+
+
+def load_cost_frames(batch_ids: List[int], db: Session) -> Dict[str, pd.DataFrame]:
+    """
+    Load everything the summary needs for `batch_ids` in five set-based queries:
+    batches, batch processes (with their process), warehouse records, works
+    and work specifications (keyed by the batch process of their work).
+    """
+    batches = _frame(
+        db,
+        select(Batch.id, Batch.plan_amount, Batch.actual_amount).where(
+            Batch.id.in_(batch_ids)
+        ),
+        ["batch_id", "plan_amount", "actual_amount"],
+    )
+    batch_processes = _frame(
+        db,
+        select(
+            BatchProcess.id,
+            BatchProcess.batch_id,
+            BatchProcess.start_amount,
+            BatchProcess.end_amount,
+            BatchProcess.unit_pay,
+            Process.process_order,
+            Process.process_name,
+        )
+        .join(Process, Process.id == BatchProcess.process_id)
+        .where(BatchProcess.batch_id.in_(batch_ids)),
+        [
+            "batch_process_id",
+            "batch_id",
+            "start_amount",
+            "end_amount",
+            "unit_pay",
+            "process_order",
+            "process_name",
+        ],
+    )
+    bp_ids = select(BatchProcess.id).where(BatchProcess.batch_id.in_(batch_ids))
+    warehouse_records = _frame(
+        db,
+        select(
+            WarehouseRecord.batch_process_id,
+            func.coalesce(WarehouseRecord.specification_gross_price, 0)
+            * func.coalesce(WarehouseRecord.consumption, 0),
+        ).where(WarehouseRecord.batch_process_id.in_(bp_ids)),
+        ["batch_process_id", "standard_unit_cost"],
+    )
+    works = _frame(
+        db,
+        select(
+            Work.batch_process_id,
+            Work.complete_hour,
+            Work.hour_pay,
+            Work.complete_unit,
+            Work.unit_pay,
+        ).where(Work.batch_process_id.in_(bp_ids)),
+        ["batch_process_id", "complete_hour", "hour_pay", "complete_unit", "unit_pay"],
+    )
+    work_specifications = _frame(
+        db,
+        select(
+            Work.batch_process_id,
+            WorkSpecification.specification_gross_price,
+            WorkSpecification.actual_amount,
+        )
+        .join(Work, Work.id == WorkSpecification.work_id)
+        .where(Work.batch_process_id.in_(bp_ids)),
+        ["batch_process_id", "specification_gross_price", "actual_amount"],
+    )
+    return {
+        "batches": batches,
+        "batch_processes": batch_processes,
+        "warehouse_records": warehouse_records,
+        "works": works,
+        "work_specifications": work_specifications,
+    }
+
+
+def _sum_by_batch_process(df: pd.DataFrame, values: pd.Series) -> pd.Series:
+    return values.groupby(df["batch_process_id"]).sum()
+
+
+def _divide(numerator, denominator):
+    # unfinished processes have no end amount yet, report their unit cost as empty
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (numerator / denominator).replace([np.inf, -np.inf], np.nan)
+
+
+def compute_cost_summary(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Standard and actual component/labor cost per batch process, followed by a
+    total row per batch. The formulas are the ones the per-batch CSV used:
+
+    * standard unit component cost: sum of warehouse record gross price * consumption
+    * actual component cost: sum of work specification gross price * actual amount
+    * actual labor cost: sum of complete hours * hour pay + complete units * unit pay
+    * standard totals scale the unit figures by the start amount, actual unit
+      figures divide the totals by the end amount
+    """
+    bps = frames["batch_processes"].set_index("batch_process_id")
+    wr = frames["warehouse_records"]
+    ws = frames["work_specifications"]
+    works = frames["works"].fillna(0)
+
+    spec_ui = _sum_by_batch_process(wr, wr["standard_unit_cost"].astype(float))
+    spec_ta = _sum_by_batch_process(
+        ws,
+        ws["specification_gross_price"].astype(float)
+        * ws["actual_amount"].astype(float),
+    )
+    emp_ta = _sum_by_batch_process(
+        works,
+        works["complete_hour"] * works["hour_pay"]
+        + works["complete_unit"] * works["unit_pay"],
+    )
+
+    start = bps["start_amount"].astype(float)
+    end = bps["end_amount"].astype(float)
+    unit_pay = bps["unit_pay"].astype(float)
+    spec_ui = spec_ui.reindex(bps.index, fill_value=0.0)
+    spec_ta = spec_ta.reindex(bps.index, fill_value=0.0)
+    emp_ta = emp_ta.reindex(bps.index, fill_value=0.0)
+
+    per_process = pd.DataFrame(
+        {
+            "batch_id": bps["batch_id"],
+            "batch_process_id": bps.index,
+            "item": bps["process_order"].astype(str) + " - " + bps["process_name"],
+            "planned": bps["start_amount"].astype("Int64"),
+            "completed": bps["end_amount"].astype("Int64"),
+            "completion_rate": _divide(end, start),
+            "component_cost_total_standard": spec_ui * start,
+            "component_cost_total_actual": spec_ta,
+            "labor_cost_total_standard": start * unit_pay,
+            "labor_cost_total_actual": emp_ta,
+            "component_cost_unit_standard": spec_ui,
+            "component_cost_unit_actual": _divide(spec_ta, end),
+            "labor_cost_unit_standard": unit_pay,
+            "labor_cost_unit_actual": _divide(emp_ta, end),
+        },
+        index=bps.index,
+    ).sort_index()
+
+    totals = (
+        per_process.groupby("batch_id")[
+            [
+                "component_cost_total_standard",
+                "component_cost_total_actual",
+                "labor_cost_total_standard",
+                "labor_cost_total_actual",
+            ]
+        ]
+        .sum()
+        .reindex(frames["batches"]["batch_id"], fill_value=0.0)
+    )
+    batches = frames["batches"].set_index("batch_id")
+    plan = batches["plan_amount"].astype(float)
+    actual = batches["actual_amount"].astype(float)
+    per_batch = pd.DataFrame(
+        {
+            "batch_id": batches.index,
+            "batch_process_id": None,
+            "item": ["批次" + str(batch_id) + "总计" for batch_id in batches.index],
+            "planned": batches["plan_amount"].astype("Int64"),
+            "completed": batches["actual_amount"].astype("Int64"),
+            "completion_rate": _divide(actual, plan),
+            "component_cost_total_standard": totals["component_cost_total_standard"],
+            "component_cost_total_actual": totals["component_cost_total_actual"],
+            "labor_cost_total_standard": totals["labor_cost_total_standard"],
+            "labor_cost_total_actual": totals["labor_cost_total_actual"],
+            "component_cost_unit_standard": _divide(
+                totals["component_cost_total_standard"], plan
+            ),
+            "component_cost_unit_actual": _divide(
+                totals["component_cost_total_actual"], actual
+            ),
+            "labor_cost_unit_standard": _divide(
+                totals["labor_cost_total_standard"], plan
+            ),
+            "labor_cost_unit_actual": _divide(
+                totals["labor_cost_total_actual"], actual
+            ),
+        }
+    )
+
+    # each batch's processes in id order, followed by its total row
+    per_process["_order"] = 0
+    per_batch["_order"] = 1
+    summary = pd.concat([per_process, per_batch], ignore_index=True)
+    summary = summary.sort_values(["batch_id", "_order"], kind="stable")
+    summary["batch_process_id"] = summary["batch_process_id"].astype("Int64")
+    return summary.drop(columns="_order").reset_index(drop=True)
+
+
+def get_cost_summary(batch_ids: List[int], db: Session) -> pd.DataFrame:
+    if not batch_ids:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    return compute_cost_summary(load_cost_frames(batch_ids, db))
+
+
+def summary_as_records(summary: pd.DataFrame) -> List[dict]:
+    # NaN (e.g. unit cost of an unfinished process) is not valid JSON
+    cleaned = summary.astype(object).where(summary.notna(), None)
+    return cleaned.to_dict(orient="records")
+
+
+def summary_as_csv(summary: pd.DataFrame) -> str:
+    df = summary.set_index("item")[SUMMARY_KEYS]
+    df.columns = [header for _, header in SUMMARY_FIELDS]
+    df.index.name = "index"
+    return "\ufeff" + df.reset_index().to_csv(index=False)
@@ -1,25 +1,26 @@
 from datetime import datetime
-from typing import List
 
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import schemas
 from app.models import DayInvoice, Batch
+from app.unit_of_work import commit
 
 
-def filter_out_day_invoice_in_cancelled_batch(
-    day_invoices: List[DayInvoice], db: Session
-):
-    valid_DI = []
-    # filter out cancelled batches
-    for d in day_invoices:
-        batch_status = db.query(Batch.status).filter(Batch.id == d.batch_id).first()
-        if batch_status == "cancelled":
-            continue
-        else:
-            valid_DI.append(d)
-    return valid_DI
+def not_in_cancelled_batch():
+    return ~exists().where(Batch.id == DayInvoice.batch_id, Batch.status == "cancelled")
+
+
+async def get_valid_day_invoices_by_check_status_async(check: bool, db: AsyncSession):
+    result = await db.execute(
+        select(DayInvoice).where(
+            DayInvoice.check_status == check, not_in_cancelled_batch()
+        )
+    )
+    return result.scalars().all()
 
 
 def get_day_invoice(day_invoice_id: int, db: Session):
@@ -42,55 +43,68 @@ def get_day_invoices_by_batch_process_id(batch_process_id: int, db: Session):
     )
 
 
-def get_day_invoices_by_employee_id(employee_id: int, db: Session):
-    return db.query(DayInvoice).filter(DayInvoice.employee_id == employee_id).all()
+def _valid_only(query, exclude_cancelled_batch: bool):
+    return query.filter(not_in_cancelled_batch()) if exclude_cancelled_batch else query
 
 
-def get_day_invoices_in_work_date_range(after: datetime, before: datetime, db: Session):
-    return (
-        db.query(DayInvoice)
-        .filter(DayInvoice.work_date >= after, DayInvoice.work_date <= before)
-        .all()
+def get_day_invoices_by_employee_id(
+    employee_id: int, db: Session, exclude_cancelled_batch: bool = False
+):
+    query = db.query(DayInvoice).filter(DayInvoice.employee_id == employee_id)
+    return _valid_only(query, exclude_cancelled_batch).all()
+
+
+def get_day_invoices_in_work_date_range(
+    after: datetime, before: datetime, db: Session, exclude_cancelled_batch: bool = False
+):
+    query = db.query(DayInvoice).filter(
+        DayInvoice.work_date >= after, DayInvoice.work_date <= before
     )
+    return _valid_only(query, exclude_cancelled_batch).all()
 
 
 def get_day_invoices_by_employee_id_and_work_date_range(
-    employee_id: int, after: datetime, before: datetime, db: Session
+    employee_id: int,
+    after: datetime,
+    before: datetime,
+    db: Session,
+    exclude_cancelled_batch: bool = False,
 ):
-    return (
-        db.query(DayInvoice)
-        .filter(
-            DayInvoice.employee_id == employee_id,
-            DayInvoice.work_date >= after,
-            DayInvoice.work_date <= before,
-        )
-        .all()
+    query = db.query(DayInvoice).filter(
+        DayInvoice.employee_id == employee_id,
+        DayInvoice.work_date >= after,
+        DayInvoice.work_date <= before,
     )
+    return _valid_only(query, exclude_cancelled_batch).all()
 
 
 def get_unchecked_day_invoices_by_employee_id_and_work_date_range(
-    employee_id: int, after: datetime, before: datetime, db: Session
+    employee_id: int,
+    after: datetime,
+    before: datetime,
+    db: Session,
+    exclude_cancelled_batch: bool = False,
 ):
-    return (
-        db.query(DayInvoice)
-        .filter(
-            DayInvoice.employee_id == employee_id,
-            DayInvoice.work_date >= after,
-            DayInvoice.work_date <= before,
-            DayInvoice.check_status == False,
-        )
-        .all()
+    query = db.query(DayInvoice).filter(
+        DayInvoice.employee_id == employee_id,
+        DayInvoice.work_date >= after,
+        DayInvoice.work_date <= before,
+        DayInvoice.check_status == False,
     )
+    return _valid_only(query, exclude_cancelled_batch).all()
 
 
-def get_day_invoices_by_check_status(check: bool, db: Session):
-    return db.query(DayInvoice).filter(DayInvoice.check == check).all()
+def get_day_invoices_by_check_status(
+    check: bool, db: Session, exclude_cancelled_batch: bool = False
+):
+    query = db.query(DayInvoice).filter(DayInvoice.check_status == check)
+    return _valid_only(query, exclude_cancelled_batch).all()
 
 
 def create_day_invoice(day_invoice: schemas.DayInvoiceCreate, db: Session):
     new_day_invoice = DayInvoice(**day_invoice.dict())
     db.add(new_day_invoice)
-    db.commit()
+    commit(db)
     db.refresh(new_day_invoice)
     return new_day_invoice
 
@@ -102,7 +116,7 @@ def update_day_invoice(day_invoice: schemas.DayInvoice, db: Session):
     db.query(DayInvoice).filter(DayInvoice.id == db_day_invoice.id).update(
         json_day_invoice
     )
-    db.commit()
+    commit(db)
     return db.query(DayInvoice).filter(DayInvoice.id == db_day_invoice.id).first()
 
 
@@ -110,7 +124,7 @@ def delete_day_invoice(day_invoice: schemas.DayInvoice, db: Session):
     db.query(DayInvoice).filter(DayInvoice.id == day_invoice.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
     return
 
 
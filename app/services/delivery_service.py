@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
+from app.unit_of_work import commit
 
 from datetime import datetime
 
@@ -117,7 +118,7 @@ def get_deliveries_in_time_range(after: datetime, before: datetime, db: Session)
 def create_delivery(delivery: schemas.DeliveryCreate, db: Session):
     new_delivery = models.Delivery(**delivery.dict())
     db.add(new_delivery)
-    db.commit()
+    commit(db)
     db.refresh(new_delivery)
     return new_delivery
 
@@ -129,7 +130,7 @@ def update_delivery(delivery: Union[dict, schemas.Delivery], db: Session):
     delivery.pop("buyer")
     delivery.pop("product_name")
     db.query(models.Delivery).filter(models.Delivery.id == target_id).update(delivery)
-    db.commit()
+    commit(db)
     return db.query(models.Delivery).filter(models.Delivery.id == target_id).first()
 
 
@@ -137,5 +138,5 @@ def delete_delivery(delivery_id: int, db: Session):
     db.query(models.Delivery).filter(models.Delivery.id == delivery_id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
     return {"success": True}
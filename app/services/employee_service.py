@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
+from app.unit_of_work import commit
 
 from datetime import datetime
 
@@ -65,7 +66,7 @@ def update_employee(employee: schemas.Employee, db: Session):
     db.query(models.Employee).filter(models.Employee.id == updated_employee.id).update(
         jsonable_encoder(updated_employee)
     )
-    db.commit()
+    commit(db)
     return (
         db.query(models.Employee)
         .filter(models.Employee.id == updated_employee.id)
@@ -77,5 +78,5 @@ def delete_employee(employee: schemas.Employee, db: Session):
     db.query(models.Employee).filter(models.Employee.id == employee.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
     return
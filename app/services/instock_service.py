@@ -0,0 +1,275 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from sqlalchemy import Integer, cast, func, insert, select
+from sqlalchemy.orm import Session, joinedload, lazyload
+
+from app import schemas, models
+from app.services import sequence_service
+
+# keep IN (...) lists well below MySQL's packet limits on long date ranges
+IN_CLAUSE_CHUNK = 1000
+# records enriched per round-trip when exporting long date ranges
+EXPORT_PAGE_SIZE = 500
+# instock_item columns a new item is inserted with
+NEW_ITEM_COLUMNS = [
+    c.key for c in models.InstockItem.__table__.columns if c.key != "instock_item_id"
+]
+
+
+def _chunked(values: Iterable, size: int = IN_CLAUSE_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+def _as_dict(obj):
+    if isinstance(obj, (models.InstockItem, models.InstockRecord)):
+        return obj.__dict__
+    if isinstance(obj, (schemas.InstockItem, schemas.InstockRecord)):
+        return obj.dict()
+    return obj
+
+
+def display_form_id(create_time: datetime, vendor_id: int, number: int) -> str:
+    """YYYYMMDD-VVV-NNNN: creation date, vendor and the vendor's count within the year."""
+    return f"{create_time.strftime('%Y%m%d')}-{str(vendor_id).rjust(3, '0')}-{str(number).rjust(4, '0')}"
+
+
+def allocate_form_numbers(
+    vendor_id: int, year: int, db: Session, count: int = 1
+) -> range:
+    """Reserve the next `count` purchase order numbers of `vendor_id` in `year`."""
+    form = models.InstockForm
+
+    def highest_in_use():
+        return (
+            db.execute(
+                select(
+                    func.max(cast(func.substr(form.display_form_id, -4), Integer))
+                ).where(
+                    form.vendor_id == vendor_id,
+                    form.create_time >= datetime(year, 1, 1),
+                    form.create_time < datetime(year + 1, 1, 1),
+                )
+            ).scalar()
+            or 0
+        )
+
+    return sequence_service.allocate(
+        f"instock_form:{vendor_id}:{year}", highest_in_use, db, count=count
+    )
+
+
+def get_specification_notices(spec_ids: Iterable[str], db: Session) -> Dict[str, str]:
+    notices = {}
+    for chunk in _chunked(set(spec_ids)):
+        notices.update(
+            db.execute(
+                select(models.Specification.id, models.Specification.notice).where(
+                    models.Specification.id.in_(chunk)
+                )
+            ).all()
+        )
+    return notices
+
+
+def create_forms(
+    forms: List[schemas.InstockFormCreate], notices: Dict[str, str], db: Session
+) -> List[int]:
+    """
+    Insert purchase orders and their items, returning the new form ids in the
+    order of `forms`. Numbers are reserved once per vendor and year, forms and
+    items each go in with one executemany INSERT. `notices` maps every
+    referenced specification to its notice, which the items copy. Does not
+    commit.
+    """
+    by_vendor_year = defaultdict(list)
+    for form in forms:
+        by_vendor_year[(form.vendor_id, form.create_time.year)].append(form)
+    display_ids = {}
+    for (vendor_id, year), group in by_vendor_year.items():
+        numbers = allocate_form_numbers(vendor_id, year, db, count=len(group))
+        for form, number in zip(group, numbers):
+            display_ids[id(form)] = display_form_id(form.create_time, vendor_id, number)
+
+    form_rows = [
+        dict(form.dict(exclude={"instock_item"}), display_form_id=display_ids[id(form)])
+        for form in forms
+    ]
+    db.execute(insert(models.InstockForm), form_rows)
+    # display ids are unique (numbers only grow within a vendor-year), so they
+    # find the generated keys without a round-trip per form
+    form_ids = {}
+    for chunk in _chunked(display_ids.values()):
+        form_ids.update(
+            db.execute(
+                select(
+                    models.InstockForm.display_form_id, models.InstockForm.form_id
+                ).where(models.InstockForm.display_form_id.in_(chunk))
+            ).all()
+        )
+
+    item_rows = []
+    for form in forms:
+        for item in form.instock_item or []:
+            row = {column: item.get(column) for column in NEW_ITEM_COLUMNS}
+            row["form_id"] = form_ids[display_ids[id(form)]]
+            row["last_time"] = datetime.strptime(item["last_time"][:10], "%Y-%m-%d")
+            row["notice"] = notices[item["specification_id"]]
+            item_rows.append(row)
+    if item_rows:
+        db.execute(insert(models.InstockItem), item_rows)
+    return [form_ids[row["display_form_id"]] for row in form_rows]
+
+
+def get_forms_by_ids(
+    form_ids: Iterable[int], db: Session
+) -> Dict[int, models.InstockForm]:
+    forms = {}
+    for chunk in _chunked(set(form_ids)):
+        # vendor is joined in the same statement, the form's own items are not needed
+        for f in (
+            db.query(models.InstockForm)
+            .options(lazyload(models.InstockForm.instock_item))
+            .filter(models.InstockForm.form_id.in_(chunk))
+        ):
+            forms[f.form_id] = f
+    return forms
+
+
+def get_items_by_ids(
+    item_ids: Iterable[int], db: Session
+) -> Dict[int, models.InstockItem]:
+    items = {}
+    for chunk in _chunked(set(item_ids)):
+        for item in (
+            db.query(models.InstockItem)
+            .options(
+                joinedload(models.InstockItem.instock_form).options(
+                    joinedload(models.InstockForm.vendor),
+                    lazyload(models.InstockForm.instock_item),
+                )
+            )
+            .filter(models.InstockItem.instock_item_id.in_(chunk))
+        ):
+            items[item.instock_item_id] = item
+    return items
+
+
+def get_specifications_with_components(
+    spec_ids: Iterable[str], db: Session
+) -> Dict[str, Tuple[models.Specification, models.Component]]:
+    result = {}
+    for chunk in _chunked(set(spec_ids)):
+        rows = (
+            db.query(models.Specification, models.Component)
+            .join(
+                models.Component,
+                models.Component.id == models.Specification.component_id,
+            )
+            .filter(models.Specification.id.in_(chunk))
+        )
+        for spec, compo in rows:
+            result[spec.id] = (spec, compo)
+    return result
+
+
+def instock_item_display(instock_form: models.InstockForm, compo: models.Component):
+    return {
+        "form_id": instock_form.display_form_id,
+        "company": instock_form.vendor.company,
+        "create_time": instock_form.create_time,
+        "component_name": compo.name,
+        "model": compo.model,
+        "as_unit": compo.as_unit,
+    }
+
+
+def enrich_instock_items(
+    instock_items: List[Union[models.InstockItem, schemas.InstockItem, dict]],
+    db: Session,
+    forms: Dict[int, models.InstockForm] = None,
+    specifications: Dict[str, Tuple[models.Specification, models.Component]] = None,
+) -> List[dict]:
+    """
+    Attach the `display` payload to every item using a fixed number of queries:
+    one for the forms (with vendors) not already at hand, one for specifications
+    joined with their components.
+    """
+    forms = dict(forms or {})
+    for item in instock_items:
+        # forms that were eagerly loaded with the item need no extra query
+        loaded_form = getattr(item, "__dict__", {}).get("instock_form")
+        if isinstance(item, models.InstockItem) and loaded_form is not None:
+            forms.setdefault(item.form_id, loaded_form)
+    item_dicts = [_as_dict(item) for item in instock_items]
+    missing_form_ids = {d["form_id"] for d in item_dicts if d["form_id"] not in forms}
+    if missing_form_ids:
+        forms.update(get_forms_by_ids(missing_form_ids, db))
+    if specifications is None:
+        specifications = get_specifications_with_components(
+            [d["specification_id"] for d in item_dicts], db
+        )
+    for d in item_dicts:
+        _, compo = specifications[d["specification_id"]]
+        d["display"] = instock_item_display(forms[d["form_id"]], compo)
+    return item_dicts
+
+
+def enrich_instock_records(
+    instock_records: List[Union[models.InstockRecord, schemas.InstockRecord, dict]],
+    db: Session,
+) -> List[dict]:
+    record_dicts = [_as_dict(r) for r in instock_records]
+    items = get_items_by_ids([r["instock_item_id"] for r in record_dicts], db)
+    specifications = get_specifications_with_components(
+        [item.specification_id for item in items.values()], db
+    )
+    forms = {item.form_id: item.instock_form for item in items.values()}
+    enriched_items = {
+        d["instock_item_id"]: d
+        for d in enrich_instock_items(
+            list(items.values()), db, forms=forms, specifications=specifications
+        )
+    }
+    for r in record_dicts:
+        enriched_item = enriched_items[r["instock_item_id"]]
+        spec, _ = specifications[enriched_item["specification_id"]]
+        r["display"] = {
+            "company": enriched_item["display"]["company"],
+            "specification_id": enriched_item["specification_id"],
+            "component_name": enriched_item["display"]["component_name"],
+            "model": enriched_item["display"]["model"],
+            "form_id": enriched_item["display"]["form_id"],
+            "total_value": (enriched_item["unit_cost"] or 0) * r["amount_in"],
+            "notice": enriched_item["notice"],
+            "paid": forms[enriched_item["form_id"]].paid,
+            "use_net": spec.use_net,
+        }
+    return record_dicts
+
+
+def iter_enriched_records_in_range(
+    start: date, end: date, db: Session, page_size: int = EXPORT_PAGE_SIZE
+) -> Iterator[List[dict]]:
+    """
+    Yield enriched instock records recorded between `start` and `end`, one page
+    at a time, paging by primary key so each page is an index range scan.
+    """
+    last_id = None
+    while True:
+        query = db.query(models.InstockRecord).filter(
+            models.InstockRecord.record_time.between(start, end)
+        )
+        if last_id is not None:
+            query = query.filter(models.InstockRecord.id > last_id)
+        records = query.order_by(models.InstockRecord.id).limit(page_size).all()
+        if not records:
+            return
+        last_id = records[-1].id
+        page = enrich_instock_records(records, db)
+        yield page
+        # drop the page's records, items, forms and specs from the identity map
+        db.expunge_all()
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Mapping, Tuple, Union
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy.orm.util import identity_key
+
+from app.models import Product, Specification, StockMovement
+from app.services import reference_data_service
+
+PRODUCT = "product"
+SPECIFICATION = "specification"
+
+# why stock moved, recorded on each StockMovement
+REASON_ADJUSTMENT = "adjustment"
+REASON_DELIVERY = "delivery"
+REASON_BATCH_COMPLETE = "batch_complete"
+REASON_CONSUMPTION = "consumption"
+REASON_INSTOCK = "instock"
+REASON_WAREHOUSE_RECORD = "warehouse_record"
+REASON_EDIT = "edit"
+
+Deltas = Union[Mapping[str, int], Iterable[Tuple[str, int]]]
+
+
+def _aggregate(deltas: Deltas) -> Dict[str, int]:
+    items = deltas.items() if isinstance(deltas, Mapping) else deltas
+    totals = defaultdict(int)
+    for key, delta in items:
+        totals[key] += delta
+    return {key: delta for key, delta in totals.items() if delta}
+
+
+def _apply_deltas(
+    item_type: str,
+    model,
+    column,
+    deltas: Deltas,
+    db: Session,
+    reason: str,
+    reference: str = None,
+) -> Dict[str, int]:
+    """
+    Add every delta to `column` in a single UPDATE evaluated by the database,
+    so concurrent adjustments cannot overwrite each other, then read the new
+    values back with one SELECT and append the movements to the stock ledger.
+    Rows that do not exist are missing from the result. Does not commit.
+    """
+    deltas = _aggregate(deltas)
+    if not deltas:
+        return {}
+    ids = list(deltas)
+    db.execute(
+        update(model)
+        .where(model.id.in_(ids))
+        .values(
+            {column: func.coalesce(column, 0) + case(deltas, value=model.id, else_=0)}
+        )
+        .execution_options(synchronize_session=False)
+    )
+    new_values = dict(
+        db.execute(select(model.id, column).where(model.id.in_(ids))).all()
+    )
+    # objects already loaded in this session would otherwise keep the stale value
+    for pk, value in new_values.items():
+        obj = db.identity_map.get(identity_key(model, pk))
+        if obj is not None:
+            attributes.set_committed_value(obj, column.key, value)
+    if new_values:
+        created_at = datetime.now()
+        db.execute(
+            insert(StockMovement),
+            [
+                {
+                    "item_type": item_type,
+                    "item_id": pk,
+                    "delta": deltas[pk],
+                    "balance": value,
+                    "reason": reason,
+                    "reference": reference,
+                    "created_at": created_at,
+                }
+                for pk, value in new_values.items()
+            ],
+        )
+    return new_values
+
+
+def _deltas_to(model, column, values: Mapping[str, int], db: Session) -> Dict[str, int]:
+    """Differences between the stored values (locked until commit) and `values`."""
+    values = {pk: value for pk, value in values.items() if value is not None}
+    if not values:
+        return {}
+    stored = db.execute(
+        select(model.id, column).where(model.id.in_(list(values))).with_for_update()
+    ).all()
+    return {pk: values[pk] - (current or 0) for pk, current in stored}
+
+
+def adjust_product_inventory(
+    deltas: Deltas,
+    db: Session,
+    reason: str = REASON_ADJUSTMENT,
+    reference: str = None,
+) -> Dict[str, int]:
+    """`deltas` maps product id to the change in inventory; returns the new inventories."""
+    return _apply_deltas(
+        PRODUCT, Product, Product.inventory, deltas, db, reason, reference
+    )
+
+
+def adjust_specification_stock(
+    deltas: Deltas,
+    db: Session,
+    reason: str = REASON_ADJUSTMENT,
+    reference: str = None,
+) -> Dict[str, int]:
+    """`deltas` maps specification id to the change in stock; returns the new stock."""
+    new_stock = _apply_deltas(
+        SPECIFICATION, Specification, Specification.stock, deltas, db, reason, reference
+    )
+    if new_stock:
+        # cached specification/component snapshots carry the stock
+        reference_data_service.invalidate_specification_stock(new_stock, db)
+    return new_stock
+
+
+def set_product_inventory(
+    values: Mapping[str, int],
+    db: Session,
+    reason: str = REASON_EDIT,
+    reference: str = None,
+) -> Dict[str, int]:
+    """Overwrite inventories, recording the difference as a movement. `None` keeps the stored value."""
+    return adjust_product_inventory(
+        _deltas_to(Product, Product.inventory, values, db), db, reason, reference
+    )
+
+
+def set_specification_stock(
+    values: Mapping[str, int],
+    db: Session,
+    reason: str = REASON_EDIT,
+    reference: str = None,
+) -> Dict[str, int]:
+    """Overwrite stock, recording the difference as a movement. `None` keeps the stored value."""
+    return adjust_specification_stock(
+        _deltas_to(Specification, Specification.stock, values, db), db, reason, reference
+    )
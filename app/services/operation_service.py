@@ -4,8 +4,10 @@ from dateutil.relativedelta import relativedelta
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
-from app import schemas, models
+from app import schemas, models, operation_log, unit_of_work
+from app.database import has_pending_writes
 from app.security import token_service
+from app.unit_of_work import commit
 
 
 def get_operation(operation_id: int, db: Session):
@@ -42,19 +44,26 @@ def extract_user_from_authentication(authentication: str):
 
 def log_operation_with_authentication_token(token: str, content: str, db: Session):
     user = extract_user_from_authentication(token)
-    new_operation = create_operation(
-        operation=schemas.OperationCreate(
-            content=content, operator=user, execute_time=datetime.now()
-        ),
-        db=db,
+    operation = schemas.OperationCreate(
+        content=content, operator=user, execute_time=datetime.now()
     )
-    return new_operation
+    if operation_log.sink.mode == operation_log.SYNC:
+        return create_operation(operation=operation, db=db)
+    if unit_of_work.in_unit_of_work(db):
+        # written once the request's changes have committed
+        unit_of_work.defer_operation_log(db, operation.dict())
+        return operation
+    # many endpoints rely on this call to commit the changes they made before it
+    if has_pending_writes(db):
+        db.commit()
+    operation_log.sink.submit(operation.dict())
+    return operation
 
 
 def create_operation(operation: schemas.OperationCreate, db: Session):
     new_operation = models.Operation(**operation.dict())
     db.add(new_operation)
-    db.commit()
+    commit(db)
     db.refresh(new_operation)
     return new_operation
 
@@ -64,7 +73,7 @@ def update_operation(operation: schemas.Operation, db: Session):
     db.query(models.Operation).filter(
         models.Operation.id == updated_operation.id
     ).update(jsonable_encoder(updated_operation))
-    db.commit()
+    commit(db)
     return (
         db.query(models.Operation)
             .filter(models.Operation.id == updated_operation.id)
@@ -76,7 +85,7 @@ def delete_expired_operations(db: Session):
     db.query(models.Operation).filter(
         models.Operation.execute_time < (datetime.now() + relativedelta(months=-6))
     ).delete(synchronize_session="fetch")
-    db.commit()
+    commit(db)
     return
 
 
@@ -84,5 +93,5 @@ def delete_operation(operation: schemas.Operation, db: Session):
     db.query(models.Operation).filter(models.Operation.id == operation.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
     return
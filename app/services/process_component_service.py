@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
+from app.unit_of_work import commit
 
 
 def get_process_component(process_component_id: int, db: Session):
@@ -39,7 +40,7 @@ def create_process_component(
     json_pc.pop("component")
     new_process_component = models.ProcessComponent(**json_pc)
     db.add(new_process_component)
-    db.commit()
+    commit(db)
     db.refresh(new_process_component)
     return new_process_component
 
@@ -49,7 +50,7 @@ def update_process_component(process_component: schemas.ProcessComponent, db: Se
     db.query(models.ProcessComponent).filter(
         models.ProcessComponent.id == updated_process_component.id
     ).update(jsonable_encoder(updated_process_component))
-    db.commit()
+    commit(db)
     return (
         db.query(models.ProcessComponent)
         .filter(models.ProcessComponent.id == updated_process_component.id)
@@ -61,5 +62,5 @@ def delete_process_component(process_component: schemas.ProcessComponent, db: Se
     db.query(models.ProcessComponent).filter(
         models.ProcessComponent.id == process_component.id
     ).delete(synchronize_session="fetch")
-    db.commit()
+    commit(db)
     return
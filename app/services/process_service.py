@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
+from app.unit_of_work import commit
 
 
 def get_process(process_id: str, db: Session):
@@ -25,7 +26,7 @@ def get_processes_by_product_id(product_id: str, db: Session):
 def create_process(process: schemas.ProcessCreate, db: Session):
     new_process = models.Process(**process.dict())
     db.add(new_process)
-    db.commit()
+    commit(db)
     db.refresh(new_process)
     return new_process
 
@@ -35,7 +36,7 @@ def update_process(process: schemas.Process, db: Session):
     db.query(models.Process).filter(models.Process.id == updated_process.id).update(
         jsonable_encoder(updated_process)
     )
-    db.commit()
+    commit(db)
     return (
         db.query(models.Process).filter(models.Process.id == updated_process.id).first()
     )
@@ -45,5 +46,5 @@ def delete_process(process: schemas.Process, db: Session):
     db.query(models.Process).filter(models.Process.id == process.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
     return
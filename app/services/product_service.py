@@ -3,7 +3,9 @@ from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
 
 from app import schemas
+from app.services import inventory_service, reference_data_service
 from app.models import Product
+from app.unit_of_work import commit
 
 
 def get_product(product_id: str, db: Session):
@@ -11,9 +13,9 @@ def get_product(product_id: str, db: Session):
 
 
 def get_product_name(product_id: str, db: Session):
-    prod = db.query(Product).filter(Product.id == product_id).first()
-    if prod:
-        return prod.name
+    name = reference_data_service.get_product_name(product_id, db=db)
+    if name is not None:
+        return name
     else:
         return ''
 
@@ -58,22 +60,29 @@ def create_product(product: schemas.ProductCreate, db: Session):
 def update_product(product: schemas.Product, db: Session):
     json_product = jsonable_encoder(product)
     json_product.pop("process", None)
+    # inventory only moves through the ledger
+    inventory = json_product.pop("inventory", None)
     updated_product = Product(**json_product)
     db.query(Product).filter(Product.id == updated_product.id).update(
         jsonable_encoder(updated_product)
     )
-    db.commit()
+    inventory_service.set_product_inventory({updated_product.id: inventory}, db)
+    commit(db)
+    reference_data_service.invalidate_products(db)
     return db.query(Product).filter(Product.id == updated_product.id).first()
 
 
-def change_product_inventory(product_id: str, adjust: int, db: Session):
-    original_inventory = (
-        db.query(Product).filter(Product.id == product_id).first().inventory
+def change_product_inventory(
+    product_id: str,
+    adjust: int,
+    db: Session,
+    reason: str = inventory_service.REASON_ADJUSTMENT,
+    reference: str = None,
+):
+    inventory_service.adjust_product_inventory(
+        {product_id: adjust}, db, reason=reason, reference=reference
     )
-    db.query(Product).filter(Product.id == product_id).update(
-        {"inventory": original_inventory + adjust}
-    )
-    db.commit()
+    commit(db)
     return db.query(Product).filter(Product.id == product_id).first()
 
 
@@ -81,7 +90,8 @@ def delete_product(product: schemas.Product, db: Session):
     db.query(Product).filter(Product.id == product.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_products(db)
     return {"success": True, "detail": ""}
 
 
@@ -0,0 +1,123 @@
+"""
+Cached lookups of master data (specifications, components, vendors, products)
+that enrichment code reads once per row.
+
+Entries are pydantic snapshots, not ORM objects, so they outlive the session
+that loaded them. Writes to these entities call `invalidate_*`, which drops the
+affected entries right away and once more when the writing transaction ends,
+so a value re-read from the database before the commit cannot stick around.
+Misses are loaded in a short session of their own, never from the caller's
+(possibly older) transaction snapshot.
+Stock movements, by far the most frequent write, only drop the entries of the
+specifications they touch.
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.cache import TTLCache
+from app.database import SessionLocal, _env_int
+from app.models import Component, Product, Specification
+
+TTL_SECONDS = _env_int("MMS_REFERENCE_CACHE_TTL_SECONDS", 300)
+MAX_ENTRIES = _env_int("MMS_REFERENCE_CACHE_SIZE", 10000)
+STALE_CACHES = "stale_reference_caches"
+
+specifications = TTLCache("specification", TTL_SECONDS, MAX_ENTRIES)
+components_by_specification = TTLCache(
+    "component_by_specification", TTL_SECONDS, MAX_ENTRIES
+)
+product_names = TTLCache("product_name", TTL_SECONDS, MAX_ENTRIES)
+
+
+def _cached(cache: TTLCache, key, db: Session, query):
+    """
+    `cache.get(key)`, refilled by `query(session)` in a fresh session: the
+    caller's transaction may have started before another request committed (a
+    REPEATABLE READ snapshot) and would put the old row back right after that
+    commit invalidated it. Entries this transaction invalidated itself are read
+    through `db`, which sees its own writes, and not cached.
+    """
+    stale = db.info.get(STALE_CACHES, ())
+    if (cache, key) in stale or (cache, None) in stale:
+        return query(db)
+
+    def load():
+        with SessionLocal() as session:
+            return query(session)
+
+    return cache.get(key, load)
+
+
+def get_specification(spec_id: str, db: Session) -> Optional[schemas.Specification]:
+    def query(session: Session):
+        spec = session.query(Specification).filter(Specification.id == spec_id).first()
+        return schemas.Specification.from_orm(spec) if spec else None
+
+    return _cached(specifications, spec_id, db, query)
+
+
+def get_component_by_specification(
+    spec_id: str, db: Session
+) -> Optional[schemas.Component]:
+    def query(session: Session):
+        component = (
+            session.query(Component)
+            .join(Specification, Specification.component_id == Component.id)
+            .filter(Specification.id == spec_id)
+            .first()
+        )
+        return schemas.Component.from_orm(component) if component else None
+
+    return _cached(components_by_specification, spec_id, db, query)
+
+
+def get_product_name(product_id: str, db: Session) -> Optional[str]:
+    def query(session: Session):
+        row = session.query(Product.name).filter(Product.id == product_id).first()
+        return row[0] if row else None
+
+    return _cached(product_names, product_id, db, query)
+
+
+def _invalidate(db: Session, *caches: TTLCache, keys: Iterable = (None,)):
+    """Drop `keys` (every entry by default) from `caches`, now and after the transaction."""
+    stale = {(cache, key) for cache in caches for key in keys}
+    for cache, key in stale:
+        cache.invalidate(key)
+    db.info.setdefault(STALE_CACHES, set()).update(stale)
+
+
+def invalidate_specifications(db: Session):
+    """After a write to specifications, their stock, components or vendors."""
+    # component snapshots embed their specifications, specifications their vendor
+    _invalidate(db, specifications, components_by_specification)
+
+
+def invalidate_specification_stock(spec_ids: Iterable[str], db: Session):
+    """After the stock of `spec_ids` changed and nothing else about them."""
+    spec_ids = set(spec_ids)
+    _invalidate(db, specifications, keys=spec_ids)
+    # a component snapshot embeds every specification of the component, and is
+    # cached under each of their ids
+    siblings = db.execute(
+        select(Specification.id).where(
+            Specification.component_id.in_(
+                select(Specification.component_id).where(Specification.id.in_(spec_ids))
+            )
+        )
+    ).scalars()
+    _invalidate(db, components_by_specification, keys=spec_ids.union(siblings))
+
+
+def invalidate_products(db: Session):
+    _invalidate(db, product_names)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+@event.listens_for(SessionLocal, "after_rollback")
+def _invalidate_after_transaction(session):
+    for cache, key in session.info.pop(STALE_CACHES, ()):
+        cache.invalidate(key)
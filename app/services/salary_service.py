@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
 
 from app import schemas, models
+from app.unit_of_work import commit
 
 from datetime import datetime
 
@@ -11,6 +12,17 @@ def get_salary(salary_id: int, db: Session):
     return db.query(models.Salary).filter(models.Salary.id == salary_id).first()
 
 
+def get_work_batch_ids(salary_id: int, db: Session):
+    # batch of every work on the salary in one query, works only know their batch process
+    rows = (
+        db.query(models.Work.id, models.BatchProcess.batch_id)
+        .join(models.BatchProcess, models.Work.batch_process_id == models.BatchProcess.id)
+        .filter(models.Work.salary_id == salary_id)
+        .all()
+    )
+    return dict(rows)
+
+
 def get_salaries(db: Session):
     return db.query(models.Salary).all()
 
@@ -36,7 +48,7 @@ def get_salaries_in_month_range(after: datetime, before: datetime, db: Session):
 def create_salary(salary: schemas.SalaryCreate, db: Session):
     new_salary = models.Salary(**salary.dict())
     db.add(new_salary)
-    db.commit()
+    commit(db)
     db.refresh(new_salary)
     return new_salary
 
@@ -57,7 +69,7 @@ def update_salary(salary: schemas.Salary, db: Session):
     #     for di in json_day_invoice:
     #         db_di = schemas.DayInvoice(**di)
     #         day_invoice_service.update_day_invoice(db_di, db=db)
-    db.commit()
+    commit(db)
     return db.query(models.Salary).filter(models.Salary.id == db_salary.id).first()
 
 
@@ -65,5 +77,5 @@ def delete_salary(salary: schemas.Salary, db: Session):
     db.query(models.Salary).filter(models.Salary.id == salary.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
     return
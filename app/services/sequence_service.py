@@ -0,0 +1,43 @@
+from typing import Callable
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import IdSequence
+
+
+def _advance(name: str, count: int, db: Session) -> bool:
+    advanced = db.execute(
+        update(IdSequence)
+        .where(IdSequence.name == name)
+        .values(value=IdSequence.value + count)
+        .execution_options(synchronize_session=False)
+    )
+    return advanced.rowcount > 0
+
+
+def allocate(name: str, seed: Callable[[], int], db: Session, count: int = 1) -> range:
+    """
+    Reserve the next `count` numbers of counter `name` and return them.
+
+    The counter row is advanced with a single UPDATE ... SET value = value + n,
+    which holds the row lock (like SELECT ... FOR UPDATE) until the caller's
+    transaction ends, so concurrent requests queue up instead of handing out
+    the same number. A counter that does not exist yet starts from `seed()`,
+    the highest number already in use. Does not commit: a rolled back
+    transaction gives its numbers back.
+    """
+    if not _advance(name, count, db):
+        # no savepoint around this: releasing one fires the session's
+        # after_commit hooks. A concurrent creator wins, its row is used.
+        db.execute(
+            insert(IdSequence)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite")
+            .values(name=name, value=seed())
+        )
+        _advance(name, count, db)
+    last = db.execute(
+        select(IdSequence.value).where(IdSequence.name == name)
+    ).scalar_one()
+    return range(last - count + 1, last + 1)
@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
+from app.services import inventory_service, reference_data_service
+from app.unit_of_work import commit
 
 
 def get_specification(specification_id: str, db: Session):
@@ -126,7 +128,8 @@ def get_specifications_under_price(price: int, gross: bool, db: Session):
 def create_specification(specification: schemas.SpecificationCreate, db: Session):
     new_specification = models.Specification(**specification.dict())
     db.add(new_specification)
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     db.refresh(new_specification)
     return new_specification
 
@@ -135,10 +138,14 @@ def update_specification(specification: schemas.Specification, db: Session):
     json_spec = jsonable_encoder(specification)
     for attr in ["id", "vendor", "component_name", "vendor_company", "display_vendor_id", "vendor_id", "component_id"]:
         json_spec.pop(attr, None)
+    # stock only moves through the ledger
+    stock = json_spec.pop("stock", None)
     db.query(models.Specification).filter(
         models.Specification.id == specification.id
     ).update(json_spec)
-    db.commit()
+    inventory_service.set_specification_stock({specification.id: stock}, db)
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     return (
         db.query(models.Specification)
         .filter(models.Specification.id == specification.id)
@@ -150,7 +157,8 @@ def delete_specification(specification: schemas.Specification, db: Session):
     db.query(models.Specification).filter(
         models.Specification.id == specification.id
     ).delete(synchronize_session="fetch")
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     return {"success": True, "detail": ""}
 
 
@@ -0,0 +1,131 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Product, Specification, StockMovement, StockSnapshot
+from app.services.inventory_service import PRODUCT, SPECIFICATION
+
+STOCK_COLUMNS = {
+    PRODUCT: (Product, Product.inventory),
+    SPECIFICATION: (Specification, Specification.stock),
+}
+
+
+def _stock_column(item_type: str):
+    if item_type not in STOCK_COLUMNS:
+        raise ValueError(f"Unknown stock item type {item_type!r}")
+    return STOCK_COLUMNS[item_type]
+
+
+def _movements(item_type: str, item_id: str):
+    return select(StockMovement).where(
+        StockMovement.item_type == item_type, StockMovement.item_id == item_id
+    )
+
+
+def _sum_deltas(db: Session, *criteria) -> int:
+    return db.execute(
+        select(func.coalesce(func.sum(StockMovement.delta), 0)).where(*criteria)
+    ).scalar()
+
+
+def get_current_balance(item_type: str, item_id: str, db: Session):
+    model, column = _stock_column(item_type)
+    return db.execute(select(column).where(model.id == item_id)).scalar()
+
+
+def get_latest_snapshot(item_type: str, item_id: str, at: datetime, db: Session):
+    return db.execute(
+        select(StockSnapshot)
+        .where(
+            StockSnapshot.item_type == item_type,
+            StockSnapshot.item_id == item_id,
+            StockSnapshot.taken_at <= at,
+        )
+        .order_by(StockSnapshot.taken_at.desc(), StockSnapshot.id.desc())
+        .limit(1)
+    ).scalar()
+
+
+def get_balance_at(item_type: str, item_id: str, at: datetime, db: Session):
+    """
+    Stock of one item at `at`: the latest snapshot taken before it plus the
+    movements recorded since, so only the tail of the ledger is scanned. Without
+    a snapshot, the movements after `at` are taken back off the current stock.
+    """
+    snapshot = get_latest_snapshot(item_type, item_id, at, db)
+    same_item = (
+        StockMovement.item_type == item_type,
+        StockMovement.item_id == item_id,
+    )
+    if snapshot is not None:
+        return (snapshot.balance or 0) + _sum_deltas(
+            db,
+            *same_item,
+            StockMovement.id > snapshot.last_movement_id,
+            StockMovement.created_at <= at,
+        )
+    current = get_current_balance(item_type, item_id, db)
+    if current is None:
+        return None
+    return current - _sum_deltas(db, *same_item, StockMovement.created_at > at)
+
+
+def get_movements_in_range(
+    item_type: str, item_id: str, start: datetime, end: datetime, db: Session
+) -> List[StockMovement]:
+    return list(
+        db.execute(
+            _movements(item_type, item_id)
+            .where(StockMovement.created_at > start, StockMovement.created_at <= end)
+            .order_by(StockMovement.id)
+        ).scalars()
+    )
+
+
+def get_balance_in_range(
+    item_type: str, item_id: str, start: datetime, end: datetime, db: Session
+):
+    opening = get_balance_at(item_type, item_id, start, db)
+    movements = get_movements_in_range(item_type, item_id, start, end, db)
+    closing = None
+    if opening is not None:
+        closing = opening + sum(m.delta for m in movements)
+    return {
+        "item_type": item_type,
+        "item_id": item_id,
+        "start": start,
+        "end": end,
+        "opening_balance": opening,
+        "closing_balance": closing,
+        "movements": movements,
+    }
+
+
+def take_snapshots(db: Session, taken_at: datetime = None) -> int:
+    """
+    Record the current stock of every product and specification. Each row notes
+    the last ledger entry it includes, so later balance queries only add up
+    movements after it. Does not commit; returns the number of rows written.
+    """
+    taken_at = taken_at or datetime.now()
+    last_movement_id = db.execute(
+        select(func.coalesce(func.max(StockMovement.id), 0))
+    ).scalar()
+    rows = []
+    for item_type, (model, column) in STOCK_COLUMNS.items():
+        for item_id, balance in db.execute(select(model.id, column)):
+            rows.append(
+                {
+                    "item_type": item_type,
+                    "item_id": item_id,
+                    "balance": balance,
+                    "last_movement_id": last_movement_id,
+                    "taken_at": taken_at,
+                }
+            )
+    if rows:
+        db.execute(insert(StockSnapshot), rows)
+    return len(rows)
@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
+from app.services import reference_data_service
+from app.unit_of_work import commit
 
 
 def get_vendor(vendor_id: int, db: Session):
@@ -24,6 +26,7 @@ def create_vendor(vendor: schemas.VendorCreate, db: Session):
     new_vendor = models.Vendor(**vendor.dict())
     db.add(new_vendor)
     db.flush()
+    reference_data_service.invalidate_specifications(db)
     db.refresh(new_vendor)
     return new_vendor
 
@@ -33,7 +36,8 @@ def update_vendor(vendor: schemas.Vendor, db: Session):
     db.query(models.Vendor).filter(models.Vendor.id == updated_vendor.id).update(
         jsonable_encoder(updated_vendor)
     )
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     return db.query(models.Vendor).filter(models.Vendor.id == updated_vendor.id).first()
 
 
@@ -41,5 +45,6 @@ def delete_vendor(vendor: schemas.Vendor, db: Session):
     db.query(models.Vendor).filter(models.Vendor.id == vendor.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    commit(db)
+    reference_data_service.invalidate_specifications(db)
     return
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
 from app.models import WarehouseRecord
+from app.services import cost_rollup_service
+from app.unit_of_work import commit
 
 
 def get_warehouse_record(warehouse_record_id: int, db: Session):
@@ -38,17 +40,30 @@ def create_warehouse_record(
 ):
     new_warehouse_record = WarehouseRecord(**warehouse_record.dict())
     db.add(new_warehouse_record)
-    db.commit()
+    db.flush()
+    cost_rollup_service.invalidate_batch_process_rollups(
+        [new_warehouse_record.batch_process_id], db
+    )
+    commit(db)
     db.refresh(new_warehouse_record)
     return new_warehouse_record
 
 
 def update_warehouse_record(warehouse_record: schemas.WarehouseRecord, db: Session):
     updated_warehouse_record = WarehouseRecord(**warehouse_record.dict())
+    # the record may have moved to another batch process, refresh both
+    previous_batch_process_id = (
+        db.query(WarehouseRecord.batch_process_id)
+        .filter(WarehouseRecord.id == updated_warehouse_record.id)
+        .scalar()
+    )
     db.query(WarehouseRecord).filter(
         WarehouseRecord.id == updated_warehouse_record.id
     ).update(jsonable_encoder(updated_warehouse_record))
-    db.commit()
+    cost_rollup_service.invalidate_batch_process_rollups(
+        [previous_batch_process_id, updated_warehouse_record.batch_process_id], db
+    )
+    commit(db)
     return (
         db.query(WarehouseRecord)
         .filter(WarehouseRecord.id == updated_warehouse_record.id)
@@ -60,5 +75,8 @@ def delete_warehouse_record(warehouse_record: schemas.WarehouseRecord, db: Sessi
     db.query(WarehouseRecord).filter(WarehouseRecord.id == warehouse_record.id).delete(
         synchronize_session="fetch"
     )
-    db.commit()
+    cost_rollup_service.invalidate_batch_process_rollups(
+        [warehouse_record.batch_process_id], db
+    )
+    commit(db)
     return
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
 from app.models import Work, WorkSpecification
+from app.services import cost_rollup_service
+from app.unit_of_work import commit
 
 from datetime import datetime
 
@@ -67,6 +69,9 @@ def create_work(work: schemas.WorkCreate, db: Session):
     db.add(new_work)
     db.flush()
     db.refresh(new_work)
+    cost_rollup_service.invalidate_batch_process_rollups(
+        [new_work.batch_process_id], db
+    )
     return new_work
 
 
@@ -74,6 +79,10 @@ def update_work(work: schemas.Work, db: Session):
     json_work = jsonable_encoder(work)
     json_work_specifications = json_work.pop("work_specification")
     db_work = Work(**json_work)
+    # the work may have moved to another batch process, refresh both
+    previous_batch_process_id = (
+        db.query(Work.batch_process_id).filter(Work.id == db_work.id).scalar()
+    )
     db.query(Work).filter(Work.id == db_work.id).update(json_work)
     if json_work_specifications:
         for ws in json_work_specifications:
@@ -81,11 +90,15 @@ def update_work(work: schemas.Work, db: Session):
             db.query(WorkSpecification).filter(WorkSpecification.id == db_ws.id).update(
                 ws
             )
-    db.commit()
+    cost_rollup_service.invalidate_batch_process_rollups(
+        [previous_batch_process_id, db_work.batch_process_id], db
+    )
+    commit(db)
     return db.query(Work).filter(Work.id == db_work.id).first()
 
 
 def delete_work(work: schemas.Work, db: Session):
     db.query(Work).filter(Work.id == work.id).delete(synchronize_session="fetch")
-    db.commit()
+    cost_rollup_service.invalidate_batch_process_rollups([work.batch_process_id], db)
+    commit(db)
     return
@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 
 from fastapi.encoders import jsonable_encoder
 from app import schemas, models
+from app.services import cost_rollup_service
+from app.unit_of_work import commit
 
 
 def get_work_specification(work_specification_id: int, db: Session):
@@ -48,7 +50,8 @@ def create_work_specification(
 ):
     new_work_specification = models.WorkSpecification(**work_specification.dict())
     db.add(new_work_specification)
-    db.commit()
+    cost_rollup_service.invalidate_work_rollups([new_work_specification.work_id], db)
+    commit(db)
     db.refresh(new_work_specification)
     return new_work_specification
 
@@ -60,7 +63,10 @@ def update_work_specification(
     db.query(models.WorkSpecification).filter(
         models.WorkSpecification.id == updated_work_specification.id
     ).update(jsonable_encoder(updated_work_specification))
-    db.commit()
+    cost_rollup_service.invalidate_work_rollups(
+        [updated_work_specification.work_id], db
+    )
+    commit(db)
     return (
         db.query(models.WorkSpecification)
         .filter(models.WorkSpecification.id == updated_work_specification.id)
@@ -74,5 +80,6 @@ def delete_work_specification(
     db.query(models.WorkSpecification).filter(
         models.WorkSpecification.id == work_specification.id
     ).delete(synchronize_session="fetch")
-    db.commit()
+    cost_rollup_service.invalidate_work_rollups([work_specification.work_id], db)
+    commit(db)
     return
@@ -0,0 +1,166 @@
+"""
+Per-request unit of work.
+
+Sessions handed out by `get_db` are marked as a unit of work: services call
+`commit(db)`, which only flushes, and `UnitOfWorkMiddleware` commits once just
+before the response starts. A request therefore costs a single COMMIT and
+either all of its writes land or none do (any error or 4xx/5xx response rolls
+back). Endpoints that really need intermediate commits depend on
+`get_autocommit_db` instead, where `commit(db)` commits immediately.
+
+Set MMS_DB_UNIT_OF_WORK=0 to fall back to committing inside the services.
+"""
+import threading
+
+from loguru import logger
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from app import operation_log
+from app.database import SessionLocal, _env_bool, has_pending_writes
+
+UNIT_OF_WORK = "unit_of_work"
+PENDING_OPERATIONS = "pending_operations"
+COMMIT_COUNT = "commit_count"
+
+enabled = _env_bool("MMS_DB_UNIT_OF_WORK", True)
+
+
+def begin(db, unit_of_work: bool = None):
+    db.info[UNIT_OF_WORK] = enabled if unit_of_work is None else unit_of_work
+    return db
+
+
+def in_unit_of_work(db) -> bool:
+    return bool(db.info.get(UNIT_OF_WORK))
+
+
+def commit(db):
+    """Commit, or only flush when the session belongs to a request unit of work."""
+    if in_unit_of_work(db):
+        db.flush()
+    else:
+        db.commit()
+
+
+def defer_operation_log(db, row: dict):
+    """Queue an operation log row to be written once the request has committed."""
+    db.info.setdefault(PENDING_OPERATIONS, []).append(row)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _count_commit(session):
+    session.info[COMMIT_COUNT] = session.info.get(COMMIT_COUNT, 0) + 1
+
+
+class CommitStatistics:
+    """Commits issued per request, across all requests served by this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.commits = 0
+            self.max_commits = 0
+            self.rollbacks = 0
+
+    def record(self, commits: int, rolled_back: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.commits += commits
+            self.max_commits = max(self.max_commits, commits)
+            if rolled_back:
+                self.rollbacks += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "commits": self.commits,
+                "commits_per_request": self.commits / self.requests
+                if self.requests
+                else 0.0,
+                "max_commits": self.max_commits,
+                "rollbacks": self.rollbacks,
+            }
+
+
+commit_stats = CommitStatistics()
+
+
+def _finish(db, success: bool):
+    """Commit (or roll back) the unit of work, then release its operation log rows."""
+    pending = db.info.pop(PENDING_OPERATIONS, [])
+    if not success:
+        db.rollback()
+        return False
+    # read-only requests need no COMMIT round-trip, closing the session ends them
+    if has_pending_writes(db):
+        db.commit()
+    for row in pending:
+        operation_log.sink.submit(row)
+    return True
+
+
+class UnitOfWorkMiddleware:
+    """
+    Commits the request's session right before the response is sent, so a failed
+    commit turns into a 500 instead of a success response for lost writes.
+    (FastAPI only closes yield dependencies after the response has gone out.)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        failed = False
+
+        async def send_wrapper(message):
+            nonlocal failed
+            if failed:
+                return
+            if message["type"] == "http.response.start":
+                db = scope.get("state", {}).get("db")
+                if db is not None:
+                    try:
+                        await self._complete(db, message)
+                    except Exception:
+                        logger.exception("Committing the request unit of work failed")
+                        failed = True
+                        await send(
+                            {
+                                "type": "http.response.start",
+                                "status": 500,
+                                "headers": [(b"content-type", b"application/json")],
+                            }
+                        )
+                        await send(
+                            {
+                                "type": "http.response.body",
+                                "body": b'{"detail":"Database commit failed"}',
+                            }
+                        )
+                        return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _complete(self, db, message):
+        rolled_back = False
+        if in_unit_of_work(db):
+            success = message["status"] < 400
+            await run_in_threadpool(_finish, db, success)
+            rolled_back = not success
+        commits = db.info.get(COMMIT_COUNT, 0)
+        commit_stats.record(commits, rolled_back=rolled_back)
+        message.setdefault("headers", [])
+        message["headers"] = list(message["headers"]) + [
+            (b"x-db-commit-count", str(commits).encode())
+        ]
@@ -0,0 +1,208 @@
+# coding=utf-8
+"""
+Rows fetched, queries and latency of the batch list under each loading strategy.
+
+    python -m benchmarks.batch_loading
+
+"joined (before)" reproduces the old mapper defaults (batch_process, work and
+process joined-eager), "summary" and "detail" are the batch_service views.
+Every run reads every relationship schemas.Batch serializes, as the endpoint does.
+Runs against an in-memory SQLite database unless MMS_DB_URL points elsewhere.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MMS_DB_URL", "sqlite://")
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import joinedload
+
+from app import models
+from app.database import Base, SessionLocal, mysql_engine
+from app.services import batch_service
+
+PROCESSES_PER_BATCH = 4
+WORKS_PER_PROCESS = 6
+SPECS_PER_WORK = 2
+
+
+def seed(db, n_batches: int):
+    for table in (
+        models.WorkSpecification,
+        models.Work,
+        models.BatchProcess,
+        models.Batch,
+        models.Process,
+        models.Product,
+    ):
+        db.execute(table.__table__.delete())
+    db.execute(insert(models.Product), [{"id": "P1", "name": "widget"}])
+    db.execute(
+        insert(models.Process),
+        [
+            {
+                "id": f"P1{i:02d}",
+                "product_id": "P1",
+                "process_name": f"step {i}",
+                "process_order": i,
+                "unit_pay": 1.0,
+            }
+            for i in range(PROCESSES_PER_BATCH)
+        ],
+    )
+    start = datetime(2023, 1, 1)
+    batches, processes, works, specs = [], [], [], []
+    for b in range(n_batches):
+        batch_id = 23000000 + b
+        batches.append(
+            {
+                "id": batch_id,
+                "status": "finished" if b % 3 else "ongoing",
+                "product_id": "P1",
+                "plan_amount": 100,
+                "create": start,
+                "start": start + timedelta(days=b % 300),
+            }
+        )
+        for p in range(PROCESSES_PER_BATCH):
+            bp_id = b * PROCESSES_PER_BATCH + p + 1
+            processes.append(
+                {
+                    "id": bp_id,
+                    "status": "finished",
+                    "process_id": f"P1{p:02d}",
+                    "batch_id": batch_id,
+                    "start_amount": 100,
+                    "unit_pay": 1.0,
+                }
+            )
+            for w in range(WORKS_PER_PROCESS):
+                work_id = (bp_id - 1) * WORKS_PER_PROCESS + w + 1
+                works.append(
+                    {
+                        "id": work_id,
+                        "batch_process_id": bp_id,
+                        "employee_id": w,
+                        "employee_name": f"e{w}",
+                        "work_date": start.date(),
+                        "unit_pay": 1.0,
+                        "complete_unit": 10,
+                        "hour_pay": 0.0,
+                        "complete_hour": 0,
+                        "plan_unit": 10,
+                        "check": True,
+                        "product_name": "widget",
+                        "process_name": f"step {p}",
+                    }
+                )
+                for s in range(SPECS_PER_WORK):
+                    specs.append(
+                        {
+                            "work_id": work_id,
+                            "specification_id": f"S{s}",
+                            "plan_amount": 1,
+                            "actual_amount": 1,
+                            "component_name": f"part {s}",
+                        }
+                    )
+    for model, rows in (
+        (models.Batch, batches),
+        (models.BatchProcess, processes),
+        (models.Work, works),
+        (models.WorkSpecification, specs),
+    ):
+        db.execute(insert(model), rows)
+    db.commit()
+
+
+def joined_before(db):
+    return (
+        db.query(models.Batch)
+        .options(
+            joinedload(models.Batch.batch_process).options(
+                joinedload(models.BatchProcess.work),
+                joinedload(models.BatchProcess.process),
+            )
+        )
+        .filter(models.Batch.status == "finished")
+        .all()
+    )
+
+
+def view(name):
+    return lambda db: batch_service.get_batches_by_status("finished", db=db, view=name)
+
+
+def serialize(batch):
+    # walk what schemas.Batch reads; summary rows carry the batch columns only
+    if not isinstance(batch, models.Batch):
+        return dict(batch._mapping)
+    return {
+        "id": batch.id,
+        "batch_process": [
+            {
+                "id": bp.id,
+                "process": [pc.id for pc in bp.process.process_component],
+                "warehouse_record": [r.id for r in bp.warehouse_record],
+                "work": [[ws.id for ws in work.work_specification] for work in bp.work],
+            }
+            for bp in batch.batch_process
+        ],
+    }
+
+
+def measure(db, load):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    db.expunge_all()
+    event.listen(mysql_engine, "before_cursor_execute", capture)
+    started = time.perf_counter()
+    try:
+        payload = [serialize(b) for b in load(db)]
+    finally:
+        event.remove(mysql_engine, "before_cursor_execute", capture)
+    elapsed = time.perf_counter() - started
+    # replay the captured statements to count the rows they sent back
+    with mysql_engine.connect() as conn:
+        rows = sum(
+            len(conn.exec_driver_sql(statement, parameters).fetchall())
+            for statement, parameters in statements
+        )
+    return len(payload), len(statements), rows, elapsed
+
+
+def main():
+    Base.metadata.create_all(
+        mysql_engine,
+        tables=[
+            models.Product.__table__,
+            models.Process.__table__,
+            models.Batch.__table__,
+            models.BatchProcess.__table__,
+            models.Work.__table__,
+            models.WorkSpecification.__table__,
+            models.WarehouseRecord.__table__,
+            models.ProcessComponent.__table__,
+        ],
+    )
+    db = SessionLocal()
+    strategies = (
+        ("joined (before)", joined_before),
+        ("summary", view(batch_service.SUMMARY)),
+        ("detail", view(batch_service.DETAIL)),
+    )
+    print(f"{'batches':>8} {'strategy':>16} {'queries':>8} {'rows':>8} {'ms':>9}")
+    for n in (100, 500, 1000):
+        seed(db, n)
+        for name, load in strategies:
+            returned, queries, rows, elapsed = measure(db, load)
+            print(f"{n:>8} {name:>16} {queries:>8} {rows:>8} {elapsed * 1000:>9.1f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
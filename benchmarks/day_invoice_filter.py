@@ -0,0 +1,106 @@
+# coding=utf-8
+"""
+Query count of the cancelled-batch day invoice filter as the invoice count grows.
+
+    python -m benchmarks.day_invoice_filter
+
+Runs against an in-memory SQLite database unless MMS_DB_URL points elsewhere.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MMS_DB_URL", "sqlite://")
+
+from sqlalchemy import event, insert
+
+from app import models
+from app.database import Base, SessionLocal, mysql_engine
+from app.services import day_invoice_service
+
+
+def legacy_filter(day_invoices, db):
+    # the old per-row lookup, kept here only as the "before" baseline
+    valid = []
+    for d in day_invoices:
+        status = db.query(models.Batch.status).filter(models.Batch.id == d.batch_id).first()
+        if status and status[0] == "cancelled":
+            continue
+        valid.append(d)
+    return valid
+
+
+def seed(db, n_invoices: int, n_batches: int = 50):
+    db.execute(models.DayInvoice.__table__.delete())
+    db.execute(models.Batch.__table__.delete())
+    start = datetime(2023, 10, 1)
+    db.execute(
+        insert(models.Batch),
+        [
+            {
+                "id": 23100000 + i,
+                "status": "cancelled" if i % 10 == 0 else "ongoing",
+                "product_id": "P1",
+                "plan_amount": 100,
+                "create": start,
+                "start": start,
+            }
+            for i in range(1, n_batches + 1)
+        ],
+    )
+    db.execute(
+        insert(models.DayInvoice),
+        [
+            {
+                "batch_id": 23100000 + (i % n_batches) + 1,
+                "process_name": "p",
+                "employee_id": i % 30,
+                "work_date": start + timedelta(days=i % 28),
+                "check_status": False,
+            }
+            for i in range(n_invoices)
+        ],
+    )
+    db.commit()
+
+
+def measure(fn):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(mysql_engine, "before_cursor_execute", count)
+    started = time.perf_counter()
+    try:
+        rows = fn()
+    finally:
+        event.remove(mysql_engine, "before_cursor_execute", count)
+    return len(rows), len(statements), time.perf_counter() - started
+
+
+def main():
+    Base.metadata.create_all(mysql_engine, tables=[models.Batch.__table__, models.DayInvoice.__table__])
+    db = SessionLocal()
+    print(f"{'invoices':>9} {'kept':>6} {'before: queries':>16} {'ms':>8} {'after: queries':>15} {'ms':>8}")
+    for n in (100, 1000, 5000, 20000):
+        seed(db, n)
+        db.expunge_all()
+        kept_before, q_before, t_before = measure(
+            lambda: legacy_filter(
+                day_invoice_service.get_day_invoices_by_check_status(False, db=db), db
+            )
+        )
+        db.expunge_all()
+        kept_after, q_after, t_after = measure(
+            lambda: day_invoice_service.get_day_invoices_by_check_status(
+                False, db=db, exclude_cancelled_batch=True
+            )
+        )
+        assert kept_before == kept_after
+        print(f"{n:>9} {kept_after:>6} {q_before:>16} {t_before * 1000:>8.1f} {q_after:>15} {t_after * 1000:>8.1f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
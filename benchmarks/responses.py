@@ -0,0 +1,106 @@
+# coding=utf-8
+"""
+JSON rendering and compression of the heavy list responses.
+
+    python -m benchmarks.seed           # once, to build the dataset
+    python -m benchmarks.responses [--iterations 5]
+
+For each route: time to render the (already encoded) payload with the stdlib
+json path JSONResponse used before versus orjson, the body size and
+compression time per encoding, and end-to-end latency through the app with
+and without Accept-Encoding: gzip. Uses the same MMS_DB_URL default as
+benchmarks.seed.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import timedelta
+
+os.environ.setdefault("MMS_DB_URL", "sqlite:///mms_bench.db")
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from loguru import logger
+from starlette.testclient import TestClient
+
+from app import compression
+from app.main import app
+from app.security.token_service import create_access_token
+from benchmarks.run import percentile
+
+# paged where the unpaged list would be the whole table
+ROUTES = (
+    "/batch/?limit=200",
+    "/batch/working",
+    "/work/?limit=200",
+    "/salary/?limit=200",
+    "/day_invoice/unchecked",
+    "/specifications/",
+)
+
+
+def best_of(fn, iterations: int) -> float:
+    """Fastest of `iterations` runs in ms, the least noisy figure for CPU-bound code."""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def latency(client, path: str, headers: dict, iterations: int) -> float:
+    client.get(path, headers=headers)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        client.get(path, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+    return percentile(timings, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+    logger.disable("app")
+
+    token = create_access_token(
+        data={"sub": "admin", "role": "admin"}, expires_delta=timedelta(hours=1)
+    )
+    auth = {"Authorization": f"Bearer {token}"}
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+
+    print(
+        f"{'route':<24} {'KiB':>8} {'json ms':>8} {'orjson ms':>9} "
+        + " ".join(f"{e + ' KiB':>9} {e + ' ms':>7}" for e in encodings)
+        + f" {'e2e ms':>8} {'e2e gz ms':>9}"
+    )
+    with TestClient(app) as client:
+        for path in ROUTES:
+            response = client.get(path, headers={**auth, "Accept-Encoding": "identity"})
+            content = response.json()
+            body = ORJSONResponse(content).body
+            # the old path renders the same bytes, give or take float formatting
+            assert json.loads(JSONResponse(content).body) == json.loads(body)
+            json_ms = best_of(lambda: JSONResponse(content), args.iterations)
+            orjson_ms = best_of(lambda: ORJSONResponse(content), args.iterations)
+            compressed = " ".join(
+                f"{len(compression.compress(body, e)) / 1024:>9.1f} "
+                f"{best_of(lambda: compression.compress(body, e), args.iterations):>7.2f}"
+                for e in encodings
+            )
+            plain_ms = latency(
+                client, path, {**auth, "Accept-Encoding": "identity"}, args.iterations
+            )
+            gzip_ms = latency(
+                client, path, {**auth, "Accept-Encoding": "gzip"}, args.iterations
+            )
+            print(
+                f"{path:<24} {len(body) / 1024:>8.1f} {json_ms:>8.2f} "
+                f"{orjson_ms:>9.2f} {compressed} {plain_ms:>8.1f} {gzip_ms:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
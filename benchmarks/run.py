@@ -0,0 +1,154 @@
+# coding=utf-8
+"""
+Drive the key read endpoints through the ASGI app and report latency and queries.
+
+    python -m benchmarks.seed           # once, to build the dataset
+    python -m benchmarks.run [--iterations 20] [--only batch] [--json out.json]
+
+Requests go through the whole middleware stack in-process (no network), so the
+numbers cover routing, dependencies, SQL, serialization and the unit of work.
+Query counts come from the X-DB-Query-Count header. Uses the same MMS_DB_URL
+default as benchmarks.seed.
+"""
+import argparse
+import json
+import math
+import os
+import time
+from datetime import timedelta
+
+os.environ.setdefault("MMS_DB_URL", "sqlite:///mms_bench.db")
+
+from loguru import logger
+from sqlalchemy import func
+from starlette.testclient import TestClient
+
+from app import models
+from app.database import SessionLocal
+from app.main import app
+from app.security.token_service import create_access_token
+
+
+def endpoints(db):
+    """(name, path) pairs, with ids picked from the seeded data."""
+    batch_id = (
+        db.query(models.Batch.id)
+        .filter(models.Batch.status == "finished")
+        .order_by(models.Batch.id.desc())
+        .limit(1)
+        .scalar()
+    )
+    last_record = db.query(func.max(models.InstockRecord.record_time)).scalar()
+    employee_id = (
+        db.query(models.Employee.id).order_by(models.Employee.id).limit(1).scalar()
+    )
+    spec_id = (
+        db.query(models.Specification.id)
+        .order_by(models.Specification.id)
+        .limit(1)
+        .scalar()
+    )
+    end = last_record.date()
+    start = end - timedelta(days=30)
+    year, month = (batch_id // 10000) % 100 + 2000, (batch_id // 100) % 100
+    return [
+        ("batch list", "/batch/"),
+        ("batch list summary", "/batch/?view=summary"),
+        ("batch page", "/batch/?limit=100"),
+        ("batches by status", "/batch/status/finished"),
+        ("working batches", "/batch/working"),
+        ("unfinished batches (async)", "/batch/unfinished"),
+        ("batch detail", f"/batch/{batch_id}"),
+        ("batch cost summary", f"/batch/batch-summary/{batch_id}"),
+        ("month cost summary", f"/batch/batch-summary/month/{year}/{month}"),
+        ("works page", "/work/?limit=100"),
+        ("unchecked day invoices", "/day_invoice/unchecked"),
+        (
+            "employee day invoices",
+            f"/day_invoice/employee_id_and_work_date/{employee_id}/{start}/{end}",
+        ),
+        ("salaries page", "/salary/?limit=100"),
+        ("deliveries", "/delivery/all"),
+        ("specifications", "/specifications/"),
+        ("specification by id", f"/specifications/by_id/{spec_id}"),
+        ("products", "/products/"),
+        ("instock forms", "/instock/form"),
+        ("ongoing instock items", "/instock/ongoing-item"),
+        ("instock records", f"/instock/records-in-date-range?start={start}&end={end}"),
+        ("recent operations", "/operation/recent"),
+    ]
+
+
+def percentile(values, p: float):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def measure(client, path: str, headers: dict, iterations: int, warmup: int):
+    for _ in range(warmup):
+        client.get(path, headers=headers)
+    timings, queries = [], []
+    status = size = None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        queries.append(int(response.headers.get("x-db-query-count", 0)))
+        status, size = response.status_code, len(response.content)
+    return {
+        "status": status,
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+        "queries": max(queries),
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument(
+        "--only", help="only endpoints whose name or path contains this"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument(
+        "--log", action="store_true", help="keep the app's log output (N+1 warnings)"
+    )
+    args = parser.parse_args()
+    if not args.log:
+        logger.disable("app")
+
+    token = create_access_token(
+        data={"sub": "admin", "role": "admin"}, expires_delta=timedelta(hours=1)
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    db = SessionLocal()
+    try:
+        targets = endpoints(db)
+    finally:
+        db.close()
+    if args.only:
+        targets = [(n, p) for n, p in targets if args.only in n or args.only in p]
+
+    results = {}
+    print(
+        f"{'endpoint':<28} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'queries':>8} {'KiB':>9}"
+    )
+    with TestClient(app) as client:
+        for name, path in targets:
+            result = measure(client, path, headers, args.iterations, args.warmup)
+            results[name] = {"path": path, **result}
+            print(
+                f"{name:<28} {result['status']:>6} {result['p50_ms']:>9.1f} "
+                f"{result['p95_ms']:>9.1f} {result['queries']:>8} "
+                f"{result['bytes'] / 1024:>9.1f}"
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,524 @@
+# coding=utf-8
+"""
+Fill a local SQLite/MySQL stand-in with a synthetic, production-sized dataset.
+
+    python -m benchmarks.seed [--scale 1.0] [--random-seed 42] [--reset]
+
+Writes to MMS_DB_URL (default: sqlite:///mms_bench.db in the current directory)
+and creates any missing tables first. At scale 1 that is roughly 200 vendors,
+3,000 components, 6,000 specifications, 1,500 products, 10,000 batches, 50,000
+batch processes, 100,000 works and day invoices, 12,000 instock items and
+50,000 operations, wired together the way app/models.py relates them: batch ids
+follow the YYMMnn scheme, works belong to the batch processes of their batch,
+salaries cover each employee's working months, instock items point at real
+specifications of the form's vendor, and so on. The same seed always produces
+the same data.
+"""
+import argparse
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("MMS_DB_URL", "sqlite:///mms_bench.db")
+
+from sqlalchemy import insert
+
+from app import models
+from app.database import Base, SessionLocal, mysql_engine
+
+CHUNK_SIZE = 5000
+START = datetime(2016, 1, 1)
+MONTHS = 96  # batch ids are YYMMnn, so at most 99 batches a month
+PROCESS_NAMES = ["下料", "冲压", "折弯", "焊接", "打磨", "喷涂", "组装", "包装"]
+DEPARTMENTS = ["生产一部", "生产二部", "仓库", "质检"]
+UNITS = ["个", "套", "米", "千克", "张"]
+
+# tables in dependency order; deleted in reverse on --reset
+TABLES = [
+    models.User,
+    models.Vendor,
+    models.Buyer,
+    models.CompoCategory,
+    models.ProductCategory,
+    models.Component,
+    models.Specification,
+    models.Product,
+    models.Process,
+    models.ProcessComponent,
+    models.Employee,
+    models.Batch,
+    models.BatchProcess,
+    models.Salary,
+    models.Work,
+    models.WorkSpecification,
+    models.WarehouseRecord,
+    models.DayInvoice,
+    models.Delivery,
+    models.InstockForm,
+    models.InstockItem,
+    models.InstockRecord,
+    models.Operation,
+]
+
+
+def _count(base: int, scale: float) -> int:
+    return max(1, int(base * scale))
+
+
+def _bulk(db, model, rows):
+    for i in range(0, len(rows), CHUNK_SIZE):
+        db.execute(insert(model), rows[i : i + CHUNK_SIZE])
+
+
+def _month(offset: int) -> datetime:
+    year, month = divmod(START.month - 1 + offset, 12)
+    return datetime(START.year + year, month + 1, 1)
+
+
+class Generator:
+    def __init__(self, scale: float = 1.0, random_seed: int = 42):
+        self.scale = scale
+        self.rnd = random.Random(random_seed)
+        self.rows = {}
+
+    def n(self, base: int) -> int:
+        return _count(base, self.scale)
+
+    def build(self):
+        self.reference_data()
+        self.catalogue()
+        self.production()
+        self.payroll()
+        self.sales()
+        self.purchasing()
+        self.operations()
+        return self.rows
+
+    def reference_data(self):
+        rnd = self.rnd
+        self.rows[models.User] = [
+            {"username": "admin", "hashed_pwd": "", "disabled": False, "role": "admin"}
+        ]
+        self.rows[models.Vendor] = [
+            {
+                "id": i,
+                "name": f"联系人{i}",
+                "company": f"供应商{i:03d}有限公司",
+                "payment_period": rnd.choice(["月结30天", "月结60天", "现结"]),
+                "contact": f"138{rnd.randrange(10 ** 8):08d}",
+                "address": f"工业园区{i}号",
+            }
+            for i in range(1, self.n(200) + 1)
+        ]
+        self.rows[models.Buyer] = [
+            {
+                "id": i,
+                "name": f"采购{i}",
+                "company": f"客户{i:03d}公司",
+                "payment_period": "月结30天",
+            }
+            for i in range(1, self.n(50) + 1)
+        ]
+        self.categories = [f"类别{i:02d}" for i in range(1, 21)]
+        self.rows[models.CompoCategory] = [
+            {"id": i, "category": c, "prefix": f"K{i:02d}"}
+            for i, c in enumerate(self.categories, 1)
+        ]
+        self.product_categories = [f"产品线{i}" for i in range(1, 11)]
+        self.rows[models.ProductCategory] = [
+            {"id": i, "category": c} for i, c in enumerate(self.product_categories, 1)
+        ]
+        self.rows[models.Employee] = [
+            {
+                "id": i,
+                "name": f"员工{i:03d}",
+                "gender": rnd.choice(["男", "女"]),
+                "department": rnd.choice(DEPARTMENTS),
+                "status": "working" if rnd.random() < 0.85 else "quit",
+                "onboard": START - timedelta(days=rnd.randrange(2000)),
+            }
+            for i in range(1, self.n(200) + 1)
+        ]
+
+    def catalogue(self):
+        rnd = self.rnd
+        vendor_ids = [v["id"] for v in self.rows[models.Vendor]]
+        components, specifications = [], []
+        self.specs_by_component = defaultdict(list)
+        self.specs_by_vendor = defaultdict(list)
+        for i in range(1, self.n(3000) + 1):
+            component_id = f"C{i:05d}"
+            components.append(
+                {
+                    "id": component_id,
+                    "name": f"配件{i:05d}",
+                    "category": rnd.choice(self.categories),
+                    "model": f"M{rnd.randrange(1, 100)}",
+                    "as_unit": rnd.choice(UNITS),
+                    "warn_stock": rnd.randrange(0, 200),
+                    "hide": rnd.random() < 0.05,
+                }
+            )
+            for j in range(2):
+                net = round(rnd.uniform(0.1, 200), 2)
+                spec = {
+                    "id": f"{component_id}-{j + 1}",
+                    "component_id": component_id,
+                    "vendor_id": rnd.choice(vendor_ids),
+                    "net_price": net,
+                    "gross_price": round(net * 1.13, 2),
+                    "use_net": rnd.random() < 0.7,
+                    "stock": rnd.randrange(0, 5000),
+                    "unit_amount": rnd.choice([1, 10, 50, 100]),
+                    "hide": False,
+                }
+                specifications.append(spec)
+                self.specs_by_component[component_id].append(spec)
+                self.specs_by_vendor[spec["vendor_id"]].append(spec)
+        self.rows[models.Component] = components
+        self.rows[models.Specification] = specifications
+
+        products, process_components = [], []
+        self.processes_by_product = {}
+        component_ids = [c["id"] for c in components]
+        for i in range(1, self.n(1500) + 1):
+            product_id = f"P{i:04d}"
+            products.append(
+                {
+                    "id": product_id,
+                    "name": f"产品{i:04d}",
+                    "category": rnd.choice(self.product_categories),
+                    "inventory": rnd.randrange(0, 2000),
+                    "deprecated": rnd.random() < 0.1,
+                }
+            )
+            steps = []
+            for order in range(1, 6):
+                process = {
+                    "id": f"{product_id}-{order:02d}",
+                    "product_id": product_id,
+                    "process_name": PROCESS_NAMES[(i + order) % len(PROCESS_NAMES)],
+                    "process_order": order,
+                    "unit_pay": round(rnd.uniform(0.05, 3), 2),
+                }
+                process["components"] = rnd.sample(component_ids, 2)
+                steps.append(process)
+                for component_id in process["components"]:
+                    process_components.append(
+                        {
+                            "id": len(process_components) + 1,
+                            "process_id": process["id"],
+                            "component_id": component_id,
+                            "attrition_rate": round(rnd.uniform(0, 0.05), 3),
+                            "consumption": rnd.randrange(1, 5),
+                        }
+                    )
+            self.processes_by_product[product_id] = steps
+        self.products = products
+        self.rows[models.Product] = products
+        self.rows[models.Process] = [
+            {k: v for k, v in p.items() if k != "components"}
+            for steps in self.processes_by_product.values()
+            for p in steps
+        ]
+        self.rows[models.ProcessComponent] = process_components
+
+    def production(self):
+        rnd = self.rnd
+        employees = self.rows[models.Employee]
+        n_batches = self.n(10000)
+        per_month = min(99, -(-n_batches // MONTHS))
+        # "today" is just after the last batch, so the newest ones are still open
+        now = _month(-(-n_batches // per_month)) + timedelta(days=5)
+        batches, batch_processes, works, work_specs, records, invoices = (
+            [],
+            [],
+            [],
+            [],
+            [],
+            [],
+        )
+        for b in range(n_batches):
+            month_start = _month(b // per_month)
+            batch_id = int(month_start.strftime("%y%m")) * 100 + b % per_month + 1
+            product = rnd.choice(self.products)
+            start = month_start + timedelta(days=rnd.randrange(28))
+            age = (now - start).days
+            if rnd.random() < 0.03:
+                status = "cancelled"
+            elif age > 60:
+                status = rnd.choice(["finished", "shipped"])
+            elif age > 10:
+                status = rnd.choice(["ongoing", "urgent", "finished"])
+            else:
+                status = "unstarted"
+            done = status in ("finished", "shipped")
+            plan = rnd.randrange(50, 2000, 10)
+            end = start + timedelta(days=rnd.randrange(3, 30)) if done else None
+            batches.append(
+                {
+                    "id": batch_id,
+                    "status": status,
+                    "product_id": product["id"],
+                    "plan_amount": plan,
+                    "actual_amount": int(plan * rnd.uniform(0.9, 1.0))
+                    if done
+                    else None,
+                    "create": start - timedelta(days=rnd.randrange(1, 7)),
+                    "start": start,
+                    "end": end,
+                    "ship": end + timedelta(days=rnd.randrange(1, 10))
+                    if status == "shipped"
+                    else None,
+                }
+            )
+            if status == "unstarted":
+                continue
+            for process in self.processes_by_product[product["id"]]:
+                bp_id = len(batch_processes) + 1
+                batch_processes.append(
+                    {
+                        "id": bp_id,
+                        "status": "finished" if done else "ongoing",
+                        "process_id": process["id"],
+                        "batch_id": batch_id,
+                        "start_amount": plan,
+                        "end_amount": batches[-1]["actual_amount"],
+                        "unit_pay": process["unit_pay"],
+                    }
+                )
+                for component_id in process["components"]:
+                    spec = rnd.choice(self.specs_by_component[component_id])
+                    records.append(
+                        {
+                            "id": len(records) + 1,
+                            "batch_process_id": bp_id,
+                            "component_id": component_id,
+                            "specification_id": spec["id"],
+                            "component_name": component_id,
+                            "consumption": rnd.randrange(1, 5),
+                            "specification_net_price": spec["net_price"],
+                            "specification_gross_price": spec["gross_price"],
+                        }
+                    )
+                for _ in range(2):
+                    employee = rnd.choice(employees)
+                    work_date = start + timedelta(days=rnd.randrange(0, 20))
+                    unit = rnd.randrange(0, plan // 2 + 1)
+                    work = {
+                        "id": len(works) + 1,
+                        "batch_process_id": bp_id,
+                        "employee_id": employee["id"],
+                        "employee_name": employee["name"],
+                        "work_date": work_date,
+                        "unit_pay": process["unit_pay"],
+                        "complete_unit": unit,
+                        "hour_pay": 0.0,
+                        "complete_hour": 0,
+                        "plan_unit": plan // 2,
+                        "check": done,
+                        "product_name": product["name"],
+                        "process_name": process["process_name"],
+                    }
+                    works.append(work)
+                    spec = rnd.choice(
+                        self.specs_by_component[rnd.choice(process["components"])]
+                    )
+                    work_specs.append(
+                        {
+                            "id": len(work_specs) + 1,
+                            "work_id": work["id"],
+                            "specification_id": spec["id"],
+                            "plan_amount": unit,
+                            "actual_amount": unit,
+                            "component_name": spec["component_id"],
+                            "specification_net_price": spec["net_price"],
+                            "specification_gross_price": spec["gross_price"],
+                        }
+                    )
+                    invoices.append(
+                        {
+                            "id": len(invoices) + 1,
+                            "batch_id": batch_id,
+                            "process_name": process["process_name"],
+                            "employee_id": employee["id"],
+                            "employee_name": employee["name"],
+                            "work_date": work_date,
+                            "unit_pay": process["unit_pay"],
+                            "complete_unit": unit,
+                            "hour_pay": 0.0,
+                            "complete_hour": 0,
+                            "check_status": done,
+                        }
+                    )
+        self.rows[models.Batch] = batches
+        self.rows[models.BatchProcess] = batch_processes
+        self.rows[models.Work] = works
+        self.rows[models.WorkSpecification] = work_specs
+        self.rows[models.WarehouseRecord] = records
+        self.rows[models.DayInvoice] = invoices
+
+    def payroll(self):
+        # one salary per employee and month worked; works and invoices point at it
+        salaries = {}
+        for row in self.rows[models.Work] + self.rows[models.DayInvoice]:
+            key = (row["employee_id"], row["work_date"].year, row["work_date"].month)
+            if key not in salaries:
+                employee_id, year, month = key
+                first = date(year, month, 1)
+                last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+                salaries[key] = {
+                    "id": len(salaries) + 1,
+                    "employee_id": employee_id,
+                    "employee_name": f"员工{employee_id:03d}",
+                    "start_date": first,
+                    "end_date": last,
+                    "unit_salary": 0.0,
+                    "hour_salary": 0.0,
+                    "deduction": 0.0,
+                    "bonus": round(self.rnd.uniform(0, 300), 2),
+                    "status": "checked",
+                    "check_date": datetime(year, month, 1) + timedelta(days=35),
+                }
+            row["salary_id"] = salaries[key]["id"]
+        self.rows[models.Salary] = list(salaries.values())
+
+    def sales(self):
+        rnd = self.rnd
+        buyer_ids = [b["id"] for b in self.rows[models.Buyer]]
+        deliveries = []
+        for i in range(1, self.n(8000) + 1):
+            product = rnd.choice(self.products)
+            amount = rnd.randrange(10, 1000)
+            unit_price = round(rnd.uniform(5, 500), 2)
+            deliveries.append(
+                {
+                    "id": i,
+                    "product_id": product["id"],
+                    "amount": amount,
+                    "order_id": f"SO{i:06d}",
+                    "buyer_id": rnd.choice(buyer_ids),
+                    "deliver_date": (
+                        START + timedelta(days=rnd.randrange(MONTHS * 30))
+                    ).date(),
+                    "unit_price": unit_price,
+                    "total_price": round(amount * unit_price, 2),
+                    "reconciled": rnd.random() < 0.8,
+                    "paid": rnd.random() < 0.7,
+                }
+            )
+        self.rows[models.Delivery] = deliveries
+
+    def purchasing(self):
+        rnd = self.rnd
+        vendors = [v for v in self.specs_by_vendor if self.specs_by_vendor[v]]
+        forms, items, records = [], [], []
+        counters = defaultdict(int)
+        for form_id in range(1, self.n(4000) + 1):
+            vendor_id = rnd.choice(vendors)
+            created = START + timedelta(days=rnd.randrange(MONTHS * 30))
+            counters[(vendor_id, created.year)] += 1
+            ongoing = created > _month(MONTHS - 3)
+            forms.append(
+                {
+                    "form_id": form_id,
+                    "display_form_id": f"{created:%Y%m%d}-{vendor_id:03d}"
+                    f"-{counters[(vendor_id, created.year)]:04d}",
+                    "vendor_id": vendor_id,
+                    "create_time": created,
+                    "form_status": "ongoing" if ongoing else "finished",
+                    "paid": not ongoing and rnd.random() < 0.9,
+                }
+            )
+            for spec in rnd.sample(
+                self.specs_by_vendor[vendor_id],
+                min(3, len(self.specs_by_vendor[vendor_id])),
+            ):
+                ordered = rnd.randrange(10, 1000, 10)
+                item_id = len(items) + 1
+                received = ordered if not ongoing else rnd.randrange(0, ordered)
+                items.append(
+                    {
+                        "instock_item_id": item_id,
+                        "form_id": form_id,
+                        "specification_id": spec["id"],
+                        "order_quantity": ordered,
+                        "unit_cost": spec["net_price"],
+                        "warehouse_quantity": received,
+                        "last_time": created,
+                        "instock_date": (created + timedelta(days=14)).date(),
+                    }
+                )
+                balance, remaining = 0, received
+                when = created
+                while remaining > 0:
+                    amount = min(remaining, rnd.randrange(10, ordered + 10, 10))
+                    balance += amount
+                    remaining -= amount
+                    when += timedelta(days=rnd.randrange(1, 7))
+                    records.append(
+                        {
+                            "id": len(records) + 1,
+                            "instock_item_id": item_id,
+                            "amount_in": amount,
+                            "balance": balance,
+                            "operator": "admin",
+                            "record_time": when,
+                        }
+                    )
+        self.rows[models.InstockForm] = forms
+        self.rows[models.InstockItem] = items
+        self.rows[models.InstockRecord] = records
+
+    def operations(self):
+        rnd = self.rnd
+        self.rows[models.Operation] = [
+            {
+                "id": i,
+                "content": f"更新批次 {rnd.choice(self.rows[models.Batch])['id']}",
+                "operator": "admin",
+                "execute_time": START
+                + timedelta(minutes=rnd.randrange(MONTHS * 43200)),
+            }
+            for i in range(1, self.n(50000) + 1)
+        ]
+
+
+def seed(db, scale: float = 1.0, random_seed: int = 42, reset: bool = False):
+    Base.metadata.create_all(mysql_engine)
+    if reset:
+        for model in reversed(TABLES):
+            db.execute(model.__table__.delete())
+    rows = Generator(scale, random_seed).build()
+    counts = {}
+    for model in TABLES:
+        _bulk(db, model, rows[model])
+        counts[model.__tablename__] = len(rows[model])
+    db.commit()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument(
+        "--reset", action="store_true", help="delete existing rows first"
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        counts = seed(db, args.scale, args.random_seed, args.reset)
+    finally:
+        db.close()
+    for table, count in counts.items():
+        print(f"{table:>20} {count:>8}")
+    print(f"seeded {mysql_engine.url!r} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
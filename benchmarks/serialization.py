@@ -0,0 +1,132 @@
+# coding=utf-8
+"""
+Rows per second serialized by pydantic orm_mode versus app.serializers.
+
+    python -m benchmarks.seed           # once, to build the dataset
+    python -m benchmarks.serialization [--iterations 5]
+
+For each list response: the rows are loaded once and fully serialized once
+(so every lazy relationship is already loaded and both paths only pay for
+serialization), then each path runs `--iterations` times and the best run is
+kept. The two outputs are compared byte for byte. Then the same routes are
+requested through the app with the switch on and off (not works, salaries
+and instock forms: loading their lazy relationships dominates those
+requests). Uses the same MMS_DB_URL default as benchmarks.seed.
+"""
+import argparse
+import gc
+import os
+from datetime import timedelta
+
+os.environ.setdefault("MMS_DB_URL", "sqlite:///mms_bench.db")
+
+import orjson
+from loguru import logger
+from starlette.testclient import TestClient
+
+from app import models, schemas, serializers
+from app.database import SessionLocal
+from app.main import app
+from app.security.token_service import create_access_token
+from app.services import batch_service
+from benchmarks.responses import best_of, latency
+
+CASES = (
+    (
+        "working batches",
+        schemas.Batch,
+        lambda db: batch_service.get_batches_by_statuses(
+            ["ongoing", "urgent"], db=db, view=batch_service.DETAIL
+        ),
+        "/batch/working",
+    ),
+    (
+        "batch summaries",
+        schemas.Batch,
+        lambda db: batch_service.get_batches(db=db, view=batch_service.SUMMARY),
+        "/batch/?view=summary",
+    ),
+    (
+        "works",
+        schemas.Work,
+        lambda db: db.query(models.Work).order_by(models.Work.id).limit(500).all(),
+        None,
+    ),
+    (
+        "salaries",
+        schemas.Salary,
+        lambda db: db.query(models.Salary).order_by(models.Salary.id).limit(500).all(),
+        None,
+    ),
+    (
+        "specifications",
+        schemas.Specification,
+        lambda db: db.query(models.Specification).all(),
+        "/specifications/",
+    ),
+    (
+        "instock forms",
+        schemas.InstockForm,
+        lambda db: db.query(models.InstockForm)
+        .order_by(models.InstockForm.form_id)
+        .limit(500)
+        .all(),
+        None,
+    ),
+)
+
+
+def pydantic_path(schema, rows):
+    return [serializers.dump_with_pydantic(schema, row) for row in rows]
+
+
+def compare(name: str, schema, rows, iterations: int):
+    expected = orjson.dumps(pydantic_path(schema, rows))
+    assert orjson.dumps(serializers.dump_many(schema, rows)) == expected, name
+    slow = best_of(lambda: pydantic_path(schema, rows), iterations)
+    fast = best_of(lambda: serializers.dump_many(schema, rows), iterations)
+    print(
+        f"{name:<18} {len(rows):>6} {len(rows) / slow * 1000:>16,.0f} "
+        f"{len(rows) / fast * 1000:>16,.0f} {slow / fast:>7.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+    logger.disable("app")
+
+    print(
+        f"{'response':<18} {'rows':>6} {'pydantic rows/s':>16} "
+        f"{'compiled rows/s':>16} {'speedup':>8}"
+    )
+    db = SessionLocal()
+    try:
+        for name, schema, load, _ in CASES:
+            compare(name, schema, load(db), args.iterations)
+            # free this case's rows before the next case or the app's worker
+            # threads start loading
+            db.expunge_all()
+            gc.collect()
+    finally:
+        db.close()
+
+    token = create_access_token(
+        data={"sub": "admin", "role": "admin"}, expires_delta=timedelta(hours=1)
+    )
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"}
+    print(f"\n{'route':<24} {'pydantic ms':>12} {'compiled ms':>12}")
+    with TestClient(app) as client:
+        for _, _, _, path in CASES:
+            if path is None:
+                continue
+            timings = {}
+            for enabled in (False, True):
+                serializers.enabled = enabled
+                timings[enabled] = latency(client, path, headers, args.iterations)
+            print(f"{path:<24} {timings[False]:>12.1f} {timings[True]:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
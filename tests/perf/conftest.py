@@ -0,0 +1,85 @@
+# coding=utf-8
+"""
+Fixtures for the performance budget tests.
+
+The app reads MMS_DB_URL at import time, so it is pointed at a throwaway SQLite
+file (seeded with benchmarks.seed at MMS_PERF_SCALE) before anything from app/
+is imported. Set MMS_PERF_DB_URL to run against an already seeded stand-in
+instead, e.g. a local MySQL.
+"""
+import os
+import tempfile
+from datetime import timedelta
+
+_seed = "MMS_PERF_DB_URL" not in os.environ
+if _seed:
+    _db_dir = tempfile.mkdtemp(prefix="mms-perf-")
+    os.environ["MMS_DB_URL"] = f"sqlite:///{_db_dir}/perf.db"
+else:
+    os.environ["MMS_DB_URL"] = os.environ["MMS_PERF_DB_URL"]
+
+import pytest
+from loguru import logger
+from sqlalchemy import func
+from starlette.testclient import TestClient
+
+from app import models
+from app.database import SessionLocal
+
+SCALE = float(os.getenv("MMS_PERF_SCALE", "0.05"))
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "perf: performance budget test, deselect with -m 'not perf'"
+    )
+
+
+@pytest.fixture(scope="session")
+def db():
+    session = SessionLocal()
+    if _seed:
+        from benchmarks.seed import seed
+
+        seed(session, scale=SCALE)
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def client(db):
+    from app.main import app
+
+    # N+1 warnings would drown the test output; the budgets catch them instead
+    logger.disable("app")
+    with TestClient(app) as c:
+        yield c
+    logger.enable("app")
+
+
+@pytest.fixture(scope="session")
+def finished_batch_id(db):
+    return (
+        db.query(models.Batch.id)
+        .filter(models.Batch.status == "finished")
+        .order_by(models.Batch.id.desc())
+        .limit(1)
+        .scalar()
+    )
+
+
+@pytest.fixture(scope="session")
+def busiest_salary_id(db):
+    return (
+        db.query(models.Work.salary_id)
+        .group_by(models.Work.salary_id)
+        .order_by(func.count().desc())
+        .limit(1)
+        .scalar()
+    )
+
+
+@pytest.fixture(scope="session")
+def record_range(db):
+    last = db.query(func.max(models.InstockRecord.record_time)).scalar()
+    return last.date() - timedelta(days=90), last.date()
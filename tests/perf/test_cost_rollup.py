@@ -0,0 +1,77 @@
+# coding=utf-8
+"""
+Writes to a batch's figures only drop its stored cost rollup, the summary
+endpoints recompute it on read.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.database import mysql_engine
+from app.models import BatchCostRollup, BatchProcess
+from app.services import cost_rollup_service, cost_summary_service
+
+pytestmark = pytest.mark.perf
+
+# the write itself plus the loads around it; a rollup recompute adds five more
+MAX_WRITE_QUERIES = 10
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(mysql_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(mysql_engine, "before_cursor_execute", capture)
+
+
+def _rollup_rows(batch_id, db):
+    count = db.execute(
+        select(func.count())
+        .select_from(BatchCostRollup)
+        .where(BatchCostRollup.batch_id == batch_id)
+    ).scalar_one()
+    db.commit()  # the next read must not reuse this snapshot
+    return count
+
+
+def test_batch_process_write_only_invalidates_the_rollup(
+    client, db, finished_batch_id
+):
+    batch_process_id = db.execute(
+        select(BatchProcess.id)
+        .where(BatchProcess.batch_id == finished_batch_id)
+        .limit(1)
+    ).scalar_one()
+    cost_rollup_service.refresh_batch_rollups([finished_batch_id], db)
+    db.commit()
+    assert _rollup_rows(finished_batch_id, db)
+
+    batch_process = client.get(f"/batch_process/{batch_process_id}").json()
+    with captured_statements() as statements:
+        response = client.put("/batch_process/", json=batch_process)
+    assert response.status_code == 200, response.text[:500]
+
+    queries = int(response.headers["x-db-query-count"])
+    assert queries <= MAX_WRITE_QUERIES, (
+        f"updating a batch process ran {queries} SQL statements, budget is "
+        f"{MAX_WRITE_QUERIES}: is the cost rollup recomputed on write again?"
+    )
+    rollup_statements = [s for s in statements if "batch_cost_rollup" in s]
+    assert len(rollup_statements) == 1, rollup_statements
+    assert _rollup_rows(finished_batch_id, db) == 0
+
+    summary = client.get(f"/batch/batch-summary/{finished_batch_id}")
+    assert summary.status_code == 200, summary.text[:500]
+    expected = cost_summary_service.summary_as_records(
+        cost_summary_service.get_cost_summary([finished_batch_id], db)
+    )
+    assert summary.json() == expected
+    db.commit()
@@ -0,0 +1,93 @@
+# coding=utf-8
+"""
+Query-count and latency budgets for the hot read endpoints.
+
+Query budgets are absolute: every endpoint here loads its data in a fixed number
+of statements, so a budget failure almost always means a per-row query (N+1)
+came back. Time budgets are medians over a few runs with generous headroom;
+scale them with MMS_PERF_TIME_FACTOR on slow machines.
+"""
+import os
+import statistics
+import time
+
+import pytest
+
+pytestmark = pytest.mark.perf
+
+RUNS = int(os.getenv("MMS_PERF_RUNS", "5"))
+TIME_FACTOR = float(os.getenv("MMS_PERF_TIME_FACTOR", "1.0"))
+
+
+def assert_within_budget(client, path: str, max_queries: int, max_ms: float):
+    client.get(path)  # warm statement caches and lazy imports
+    timings, queries = [], []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text[:500]
+        queries.append(int(response.headers["x-db-query-count"]))
+
+    assert max(queries) <= max_queries, (
+        f"{path} ran {max(queries)} SQL statements, budget is {max_queries}: "
+        f"is something querying per row again?"
+    )
+    median = statistics.median(timings)
+    assert median <= max_ms * TIME_FACTOR, (
+        f"{path} took {median:.1f} ms (median of {RUNS}), "
+        f"budget is {max_ms * TIME_FACTOR:.0f} ms"
+    )
+    return response
+
+
+def test_unfinished_batches(client):
+    response = assert_within_budget(
+        client, "/batch/unfinished", max_queries=12, max_ms=1500
+    )
+    assert response.json(), "the seeded data should have unfinished batches"
+
+
+def test_ongoing_instock_items(client):
+    response = assert_within_budget(
+        client, "/instock/ongoing-item", max_queries=4, max_ms=250
+    )
+    assert response.json()
+
+
+def test_instock_records_in_date_range(client, record_range):
+    start, end = record_range
+    response = assert_within_budget(
+        client,
+        f"/instock/records-in-date-range?start={start}&end={end}",
+        max_queries=5,
+        max_ms=250,
+    )
+    assert response.json()
+
+
+def test_unchecked_day_invoices(client):
+    response = assert_within_budget(
+        client, "/day_invoice/unchecked", max_queries=3, max_ms=500
+    )
+    assert response.json()
+
+
+def test_batch_summary_csv(client, finished_batch_id):
+    response = assert_within_budget(
+        client,
+        f"/batch/batch-summary/download/{finished_batch_id}.csv",
+        max_queries=8,
+        max_ms=300,
+    )
+    assert response.headers["content-type"].startswith("text/csv")
+
+
+def test_salary_summary_csv(client, busiest_salary_id):
+    response = assert_within_budget(
+        client,
+        f"/salary/salary-summary/download/{busiest_salary_id}.csv",
+        max_queries=5,
+        max_ms=250,
+    )
+    assert response.headers["content-type"].startswith("text/csv")
@@ -0,0 +1,47 @@
+# coding=utf-8
+"""
+The reference data cache must not be refilled from a transaction snapshot that
+predates the write which invalidated it.
+"""
+from sqlalchemy import select
+
+from app.database import SessionLocal, mysql_engine
+from app.models import Specification
+from app.services import inventory_service, reference_data_service
+
+
+def _stock(spec_id, session):
+    return session.execute(
+        select(Specification.stock).where(Specification.id == spec_id)
+    ).scalar_one()
+
+
+def test_miss_is_not_refilled_from_an_older_snapshot(db):
+    spec_id = db.execute(select(Specification.id).limit(1)).scalar_one()
+    if mysql_engine.dialect.name == "sqlite":
+        # lets the reader keep its snapshot while the writer commits
+        with mysql_engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    reader, writer = SessionLocal(), SessionLocal()
+    try:
+        if mysql_engine.dialect.name == "sqlite":
+            # pysqlite only opens a transaction on the first write
+            reader.connection().exec_driver_sql("BEGIN")
+        before = _stock(spec_id, reader)
+        reference_data_service.specifications.invalidate(spec_id)
+
+        inventory_service.adjust_specification_stock({spec_id: 1}, writer)
+        writer.commit()
+        assert _stock(spec_id, reader) == before, "the reader should see its snapshot"
+
+        cached = reference_data_service.get_specification(spec_id, reader)
+        assert cached.stock == (before or 0) + 1
+        reader.rollback()
+        assert reference_data_service.get_specification(spec_id, reader).stock == (
+            (before or 0) + 1
+        )
+    finally:
+        reader.close()
+        inventory_service.adjust_specification_stock({spec_id: -1}, writer)
+        writer.commit()
+        writer.close()